@@ -0,0 +1,89 @@
+"""
+Lazy stand-ins for heavy imports.
+
+``LazyModule`` is a module object that imports its target on first
+attribute access and then copies the target's namespace into itself, so
+later lookups cost the same as on the real module. ``LazyCallable`` does
+the same for a single function imported from a module.
+
+Both are bound at module level in :mod:`facure_augment.common`, so
+``from facure_augment.common import *`` stays cheap and a notebook only pays
+for the libraries it actually touches.
+"""
+
+from __future__ import annotations
+
+import importlib
+from types import ModuleType
+from typing import Any
+
+__all__ = ["LazyModule", "LazyCallable"]
+
+
+class LazyModule(ModuleType):
+    """
+    Module proxy that imports ``name`` on first use.
+
+    Parameters
+    ----------
+    name : str
+        Fully qualified module name (e.g., "statsmodels.formula.api").
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_loaded"] = False
+
+    def _load(self) -> ModuleType:
+        module = importlib.import_module(self.__name__)
+        if not self.__dict__["_lazy_loaded"]:
+            self.__dict__.update(module.__dict__)
+            self.__dict__["_lazy_loaded"] = True
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        # Only reached for names not yet copied into the proxy namespace
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        setattr(self._load(), attr, value)
+        self.__dict__[attr] = value
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_lazy_loaded"] else "not yet imported"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+class LazyCallable:
+    """
+    Proxy for ``from module import name`` that imports on first call.
+
+    Parameters
+    ----------
+    module : str
+        Module to import from.
+    name : str
+        Attribute of ``module`` to resolve.
+    """
+
+    def __init__(self, module: str, name: str):
+        self._module = module
+        self._name = name
+        self._target = None
+
+    def _load(self) -> Any:
+        if self._target is None:
+            self._target = getattr(importlib.import_module(self._module), self._name)
+        return self._target
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self._load()(*args, **kwargs)
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy {self._module}.{self._name}>"
@@ -0,0 +1,217 @@
+"""
+Columnar sidecar cache for the bundled CSV datasets.
+
+Parsing CSV is the slowest part of loading a dataset, and every notebook
+re-parses the same files. This module caches each parsed frame twice:
+
+1. On disk, as a typed Feather (Arrow IPC) sidecar keyed by the source
+   file's content hash and mtime. Later processes memory-map the sidecar
+   instead of parsing the CSV.
+2. In process, in a small LRU. Repeated calls return a copy-on-write view
+   of the cached frame (a deep copy when pandas copy-on-write is off), so
+   callers can modify their frame without touching the cache.
+
+Sidecars need ``pyarrow`` (``pip install -e ".[cache]"``). Without it only
+the in-process cache is used.
+
+Environment
+-----------
+FACURE_CACHE_DIR
+    Where sidecars are written. Defaults to ``~/.cache/facure_augment``.
+FACURE_CACHE_DISABLE
+    Set to ``1`` to always read the CSV.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+__all__ = [
+    "CACHE_DIR",
+    "read_csv_cached",
+    "sidecar_path",
+    "clear_cache",
+]
+
+CACHE_DIR = Path(os.environ.get("FACURE_CACHE_DIR", Path.home() / ".cache" / "facure_augment"))
+
+# Number of frames kept in the in-process LRU
+LRU_SIZE = 32
+
+_LRU: "OrderedDict[Tuple, pd.DataFrame]" = OrderedDict()
+
+
+# =============================================================================
+# Helpers
+# =============================================================================
+
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _cache_disabled() -> bool:
+    return os.environ.get("FACURE_CACHE_DISABLE", "0") == "1"
+
+
+def _copy_on_write() -> bool:
+    """Whether shallow copies are safe to hand out (pandas CoW semantics)."""
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    # pandas 2.x also accepts "warn", which warns but does not copy on write
+    return pd.get_option("mode.copy_on_write") is True
+
+
+def _file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of the file contents (first 16 hex chars)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def _options_key(read_kwargs: Dict) -> str:
+    """Stable suffix for non-default read options (e.g. dtype or usecols)."""
+    if not read_kwargs:
+        return ""
+    text = repr(sorted((k, repr(v)) for k, v in read_kwargs.items()))
+    return "-" + hashlib.sha256(text.encode()).hexdigest()[:8]
+
+
+def _handout(df: pd.DataFrame) -> pd.DataFrame:
+    return df.copy(deep=not _copy_on_write())
+
+
+# =============================================================================
+# Public API
+# =============================================================================
+
+
+def sidecar_path(path: Path, cache_dir: Optional[Path] = None, **read_kwargs) -> Path:
+    """
+    Location of the Feather sidecar for a CSV file.
+
+    Parameters
+    ----------
+    path : Path
+        Source CSV.
+    cache_dir : Path, optional
+        Sidecar directory. Defaults to :data:`CACHE_DIR`.
+    **read_kwargs
+        Options passed to ``pd.read_csv``; different options get different
+        sidecars.
+
+    Returns
+    -------
+    Path
+        ``<cache_dir>/<stem>-<content hash>-<mtime_ns>[-<options>].feather``
+    """
+    path = Path(path)
+    cache_dir = Path(cache_dir) if cache_dir is not None else CACHE_DIR
+    name = f"{path.stem}-{_file_digest(path)}-{path.stat().st_mtime_ns}{_options_key(read_kwargs)}"
+    return cache_dir / f"{name}.feather"
+
+
+def read_csv_cached(
+    path: Path,
+    cache: bool = True,
+    cache_dir: Optional[Path] = None,
+    **read_kwargs,
+) -> pd.DataFrame:
+    """
+    Read a CSV through the in-process LRU and the on-disk Feather sidecar.
+
+    Parameters
+    ----------
+    path : Path
+        Source CSV.
+    cache : bool
+        Set False to always parse the CSV.
+    cache_dir : Path, optional
+        Sidecar directory. Defaults to :data:`CACHE_DIR`.
+    **read_kwargs
+        Passed to ``pd.read_csv``.
+
+    Returns
+    -------
+    pd.DataFrame
+        The parsed dataset. Safe to modify; the cached copy is unaffected.
+    """
+    path = Path(path)
+    if not cache or _cache_disabled():
+        return pd.read_csv(path, **read_kwargs)
+
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size, _options_key(read_kwargs))
+    if key in _LRU:
+        _LRU.move_to_end(key)
+        return _handout(_LRU[key])
+
+    df = None
+    sidecar = None
+    if _has_pyarrow():
+        sidecar = sidecar_path(path, cache_dir, **read_kwargs)
+        if sidecar.exists():
+            df = _read_sidecar(sidecar)
+
+    if df is None:
+        df = pd.read_csv(path, **read_kwargs)
+        if sidecar is not None:
+            _write_sidecar(df, sidecar)
+
+    _LRU[key] = df
+    while len(_LRU) > LRU_SIZE:
+        _LRU.popitem(last=False)
+    return _handout(df)
+
+
+def clear_cache(disk: bool = False, cache_dir: Optional[Path] = None) -> None:
+    """
+    Empty the in-process LRU and, optionally, delete the Feather sidecars.
+
+    Parameters
+    ----------
+    disk : bool
+        Also remove ``*.feather`` files in the cache directory.
+    cache_dir : Path, optional
+        Sidecar directory. Defaults to :data:`CACHE_DIR`.
+    """
+    _LRU.clear()
+    if disk:
+        cache_dir = Path(cache_dir) if cache_dir is not None else CACHE_DIR
+        for sidecar in cache_dir.glob("*.feather"):
+            sidecar.unlink()
+
+
+def _read_sidecar(sidecar: Path) -> Optional[pd.DataFrame]:
+    """Memory-map a Feather sidecar; None if it is unreadable."""
+    from pyarrow import feather
+
+    try:
+        return feather.read_table(sidecar, memory_map=True).to_pandas()
+    except (OSError, ValueError):
+        return None
+
+
+def _write_sidecar(df: pd.DataFrame, sidecar: Path) -> None:
+    """Write a Feather sidecar atomically; caching is best-effort."""
+    from pyarrow import feather
+
+    tmp = sidecar.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        sidecar.parent.mkdir(parents=True, exist_ok=True)
+        feather.write_feather(df, tmp, compression="uncompressed")
+        os.replace(tmp, sidecar)
+    except (OSError, ValueError, TypeError):
+        tmp.unlink(missing_ok=True)
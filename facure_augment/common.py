@@ -11,7 +11,8 @@ In each notebook, start with:
     from facure_augment.common import *
 
 This imports:
-- Standard data science libraries (numpy, pandas, matplotlib, etc.)
+- Standard data science libraries (numpy, pandas, matplotlib, etc.);
+  matplotlib, seaborn, statsmodels and scipy load lazily on first use
 - Tufte styling functions
 - Data loading utilities
 - Common causal inference imports
@@ -31,8 +32,14 @@ from typing import Any, Dict, List, Optional, Tuple, Union
 # =============================================================================
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+from facure_augment._lazy import LazyCallable, LazyModule
+
+# Plotting and modelling libraries are imported on first use: the star import
+# binds lightweight proxies, so notebooks (and batch jobs that only need the
+# data loaders) skip seconds of startup for libraries they never touch.
+plt = LazyModule("matplotlib.pyplot")
+sns = LazyModule("seaborn")
 
 # Suppress common warnings in notebooks
 warnings.filterwarnings("ignore", category=FutureWarning)
@@ -41,10 +48,10 @@ warnings.filterwarnings("ignore", category=UserWarning, module="matplotlib")
 # =============================================================================
 # Statistical Libraries
 # =============================================================================
-import statsmodels.api as sm
-import statsmodels.formula.api as smf
-from scipy import stats
-from scipy.optimize import minimize
+sm = LazyModule("statsmodels.api")
+smf = LazyModule("statsmodels.formula.api")
+stats = LazyModule("scipy.stats")
+minimize = LazyCallable("scipy.optimize", "minimize")
 
 # =============================================================================
 # Tufte Styling
@@ -62,6 +69,8 @@ from facure_augment.viz.tufte import (
     range_frame,
     minimal_spines,
 )
+from facure_augment.cache import read_csv_cached, clear_cache
+from facure_augment.dtypes import dataset_dtypes
 
 # =============================================================================
 # Paths
@@ -82,14 +91,44 @@ FACURE_ORIGINAL_DATA = REPO_ROOT / "facure_original" / "causal-inference-for-the
 # =============================================================================
 
 
-def load_facure_data(filename: str) -> pd.DataFrame:
+def _read_options(
+    filename: str,
+    typed: bool,
+    usecols: Optional[List[str]],
+) -> Dict[str, Any]:
+    """``pd.read_csv`` keyword arguments for the dtype schema and projection."""
+    options: Dict[str, Any] = {}
+    if usecols is not None:
+        options["usecols"] = list(usecols)
+    if typed:
+        options["dtype"] = dataset_dtypes(filename, usecols)
+    return options
+
+
+def load_facure_data(
+    filename: str,
+    cache: bool = True,
+    typed: bool = False,
+    usecols: Optional[List[str]] = None,
+) -> pd.DataFrame:
     """
     Load a dataset from Facure's original data.
 
+    Parsed frames are cached in process and in a Feather sidecar (see
+    :mod:`facure_augment.cache`), so repeated loads skip CSV parsing.
+
     Parameters
     ----------
     filename : str
         Name of the CSV file (e.g., "online_classroom.csv").
+    cache : bool
+        Set False to always re-read the CSV.
+    typed : bool
+        Parse with the compact dtypes from ``schema/dataset_dtypes.json``
+        (categorical IDs, int8/int16 flags, float32 where precise enough).
+        See :func:`facure_augment.dtypes.memory_report` for the savings.
+    usecols : list of str, optional
+        Only parse these columns.
 
     Returns
     -------
@@ -102,13 +141,14 @@ def load_facure_data(filename: str) -> pd.DataFrame:
     >>> df.head()
     """
     # Try local copy first, then original
+    options = _read_options(filename, typed, usecols)
     local_path = FACURE_DATA_DIR / filename
     if local_path.exists():
-        return pd.read_csv(local_path)
+        return read_csv_cached(local_path, cache=cache, **options)
 
     original_path = FACURE_ORIGINAL_DATA / filename
     if original_path.exists():
-        return pd.read_csv(original_path)
+        return read_csv_cached(original_path, cache=cache, **options)
 
     raise FileNotFoundError(
         f"Dataset '{filename}' not found in:\n"
@@ -117,7 +157,12 @@ def load_facure_data(filename: str) -> pd.DataFrame:
     )
 
 
-def load_extended_data(filename: str) -> pd.DataFrame:
+def load_extended_data(
+    filename: str,
+    cache: bool = True,
+    typed: bool = False,
+    usecols: Optional[List[str]] = None,
+) -> pd.DataFrame:
     """
     Load a dataset from extended examples.
 
@@ -125,6 +170,12 @@ def load_extended_data(filename: str) -> pd.DataFrame:
     ----------
     filename : str
         Name of the CSV file.
+    cache : bool
+        Set False to always re-read the CSV.
+    typed : bool
+        Parse with the dtypes registered for this file, if any.
+    usecols : list of str, optional
+        Only parse these columns.
 
     Returns
     -------
@@ -134,7 +185,28 @@ def load_extended_data(filename: str) -> pd.DataFrame:
     path = EXTENDED_DATA_DIR / filename
     if not path.exists():
         raise FileNotFoundError(f"Extended dataset '{filename}' not found at {path}")
-    return pd.read_csv(path)
+    return read_csv_cached(path, cache=cache, **_read_options(filename, typed, usecols))
+
+
+def warm_cache() -> List[Path]:
+    """
+    Pre-convert every bundled CSV to its Feather sidecar.
+
+    Covers ``FACURE_DATA_DIR``, ``FACURE_ORIGINAL_DATA`` and
+    ``EXTENDED_DATA_DIR``. Run once after install (or in a CI setup step) so
+    no notebook pays the CSV parsing cost.
+
+    Returns
+    -------
+    list of Path
+        The CSV files that were loaded.
+    """
+    loaded = []
+    for directory in (FACURE_DATA_DIR, FACURE_ORIGINAL_DATA, EXTENDED_DATA_DIR):
+        for path in sorted(directory.glob("*.csv")):
+            read_csv_cached(path)
+            loaded.append(path)
+    return loaded
 
 
 # =============================================================================
@@ -360,6 +432,8 @@ __all__ = [
     # Data loading
     "load_facure_data",
     "load_extended_data",
+    "warm_cache",
+    "clear_cache",
     # Tufte styling
     "TUFTE_PALETTE",
     "COLORS",
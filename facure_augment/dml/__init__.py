@@ -0,0 +1,19 @@
+"""Double/debiased machine learning utilities for augmented."""
+
+from facure_augment.dml.crossfit import (
+    CrossFitter,
+    dml_plr,
+    r_learner,
+    aipw,
+)
+from facure_augment.dml.estimator import (
+    DoubleMachineLearning,
+)
+
+__all__ = [
+    "CrossFitter",
+    "dml_plr",
+    "r_learner",
+    "aipw",
+    "DoubleMachineLearning",
+]
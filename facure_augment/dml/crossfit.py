@@ -0,0 +1,453 @@
+"""
+Cross-fitting engine with cached out-of-fold nuisance predictions.
+
+``cross_fit_residuals`` (04_cross_fitting), ``DoubleMachineLearning``
+(05_dml_implementation), ``dml2_detailed`` / ``dml2_repeated``
+(22_debiased_ml), ``double_ml`` (A2_orthogonalization) and
+``estimate_nuisance_oof`` (A5_causal_metrics) each run their own K-fold
+loop and refit every nuisance model from scratch. :class:`CrossFitter` is the
+one shared loop:
+
+- Folds are ``KFold(n_folds, shuffle=True, random_state=seed)``, as in the
+  notebooks, so results match them exactly.
+- Out-of-fold predictions are cached in memory and, optionally, on disk as
+  ``.npy`` files keyed by a hash of (X, target, training subset, model class
+  and parameters, n_folds, fold seed, prediction method). DML, the
+  R-learner and AIPW therefore share any nuisance fit they have in common,
+  and re-running repeated-split DML with more repetitions only fits the new
+  seeds.
+- Every uncached (request, fold) fit in a batch goes to one process pool.
+
+Examples
+--------
+>>> fitter = CrossFitter(n_folds=5, cache_dir="~/.cache/facure_augment/oof", n_jobs=4)
+>>> dml = dml_plr(X, T, Y, GradientBoostingRegressor(), GradientBoostingRegressor(),
+...               seeds=range(50), fitter=fitter)
+>>> cate = r_learner(X, T, Y, GradientBoostingRegressor(), GradientBoostingRegressor(),
+...                  LinearRegression(), fitter=fitter)   # reuses the seed-42 fits
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from facure_augment.inference.multiplier import aipw_influence, residual_influence
+
+__all__ = [
+    "CrossFitter",
+    "dml_plr",
+    "r_learner",
+    "aipw",
+]
+
+
+# =============================================================================
+# Keys
+# =============================================================================
+
+
+def _array_digest(a: Optional[np.ndarray]) -> str:
+    """SHA-256 of an array's shape, dtype and bytes (first 16 hex chars)."""
+    if a is None:
+        return "none"
+    a = np.ascontiguousarray(a)
+    digest = hashlib.sha256(f"{a.shape}{a.dtype.str}".encode())
+    digest.update(a.view(np.uint8).reshape(-1) if a.size else b"")
+    return digest.hexdigest()[:16]
+
+
+def _model_spec(model) -> str:
+    """Class and (recursively) parameters of an unfitted estimator."""
+    params = model.get_params(deep=False)
+    items = []
+    for name in sorted(params):
+        value = params[name]
+        items.append(f"{name}={_model_spec(value) if hasattr(value, 'get_params') else repr(value)}")
+    cls = type(model)
+    return f"{cls.__module__}.{cls.__qualname__}({', '.join(items)})"
+
+
+def _fit_fold(model, X, y, train, test, method):
+    """Fit a clone of ``model`` on ``train`` rows and predict ``test`` rows."""
+    from sklearn.base import clone
+
+    fitted = clone(model).fit(X[train], y[train])
+    if method == "predict_proba":
+        return fitted.predict_proba(X[test])[:, 1]
+    return getattr(fitted, method)(X[test])
+
+
+# =============================================================================
+# Engine
+# =============================================================================
+
+
+class CrossFitter:
+    """
+    K-fold out-of-fold predictions with memory and disk caching.
+
+    Parameters
+    ----------
+    n_folds : int
+        Number of folds.
+    cache_dir : str or Path, optional
+        Directory for ``.npy`` prediction files; memory only if None.
+        Ignored when ``FACURE_CACHE_DISABLE=1``.
+    n_jobs : int
+        Worker processes for fold fits.
+
+    Attributes
+    ----------
+    stats_ : dict
+        Counters: fold_fits, memory_hits, disk_hits.
+    """
+
+    def __init__(
+        self,
+        n_folds: int = 5,
+        cache_dir: Optional[Union[str, Path]] = None,
+        n_jobs: int = 1,
+    ):
+        self.n_folds = n_folds
+        self.cache_dir = Path(cache_dir).expanduser() if cache_dir is not None else None
+        self.n_jobs = n_jobs
+        self._memory: Dict[str, np.ndarray] = {}
+        self.stats_ = {"fold_fits": 0, "memory_hits": 0, "disk_hits": 0}
+
+    def folds(self, n: int, seed: int) -> List:
+        """``(train, test)`` index pairs for a fold seed."""
+        from sklearn.model_selection import KFold
+
+        return list(KFold(self.n_folds, shuffle=True, random_state=seed).split(np.zeros(n)))
+
+    def key(self, model, X, y, seed: int = 42, method: str = "predict", subset=None) -> str:
+        """Cache key of one out-of-fold prediction vector."""
+        text = "|".join([_array_digest(X), _array_digest(y), _array_digest(subset),
+                         _model_spec(model), str(self.n_folds), str(seed), method])
+        return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+    def oof(
+        self,
+        model,
+        X: np.ndarray,
+        y: np.ndarray,
+        seed: int = 42,
+        method: str = "predict",
+        subset: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Out-of-fold predictions of ``y`` from ``X``.
+
+        Parameters
+        ----------
+        model : sklearn estimator
+            Unfitted model; cloned per fold.
+        X, y : np.ndarray
+            Features and target.
+        seed : int
+            Fold seed.
+        method : str
+            ``"predict"``, ``"predict_proba"`` (positive class) or another
+            prediction method.
+        subset : np.ndarray of bool, optional
+            Train only on these rows of each training fold (e.g. ``T == 1``
+            for a treated-outcome model); predictions cover every row.
+
+        Returns
+        -------
+        np.ndarray
+            Predictions ``(n,)``.
+        """
+        return self.oof_many([dict(model=model, X=X, y=y, seed=seed, method=method,
+                                   subset=subset)])[0]
+
+    def oof_many(self, requests: Sequence[Dict[str, Any]]) -> List[np.ndarray]:
+        """
+        Out-of-fold predictions for several requests, fitting misses together.
+
+        Parameters
+        ----------
+        requests : sequence of dict
+            Keyword arguments of :meth:`oof` (model, X, y and optionally
+            seed, method, subset).
+
+        Returns
+        -------
+        list of np.ndarray
+            One prediction vector per request.
+        """
+        requests = [{"seed": 42, "method": "predict", "subset": None, **r} for r in requests]
+        for r in requests:
+            r["X"], r["y"] = np.asarray(r["X"]), np.asarray(r["y"])
+        keys = [self.key(**r) for r in requests]
+
+        results: Dict[str, np.ndarray] = {}
+        pending: Dict[str, Dict[str, Any]] = {}
+        for key, r in zip(keys, requests):
+            cached = self._lookup(key)
+            if cached is not None:
+                results[key] = cached
+            else:
+                pending.setdefault(key, r)
+
+        tasks, slots = [], []
+        for key, r in pending.items():
+            n = len(r["y"])
+            for train, test in self.folds(n, r["seed"]):
+                if r["subset"] is not None:
+                    train = train[np.asarray(r["subset"], dtype=bool)[train]]
+                tasks.append((r["model"], r["X"], r["y"], train, test, r["method"]))
+                slots.append((key, test))
+
+        predictions = self._run(tasks)
+        self.stats_["fold_fits"] += len(tasks)
+        for (key, test), pred in zip(slots, predictions):
+            if key not in results:
+                results[key] = np.empty(len(pending[key]["y"]), dtype=float)
+            results[key][test] = pred
+        for key in pending:
+            self._store(key, results[key])
+        return [results[key] for key in keys]
+
+    def clear(self, disk: bool = False) -> None:
+        """Empty the memory cache and, optionally, the ``.npy`` files."""
+        self._memory.clear()
+        if disk and self.cache_dir is not None:
+            for path in self.cache_dir.glob("*.npy"):
+                path.unlink()
+
+    def _run(self, tasks: List) -> List[np.ndarray]:
+        if self.n_jobs == 1 or len(tasks) <= 1:
+            return [_fit_fold(*task) for task in tasks]
+        with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+            futures = [executor.submit(_fit_fold, *task) for task in tasks]
+            return [f.result() for f in futures]
+
+    def _disk(self) -> Optional[Path]:
+        if self.cache_dir is None or os.environ.get("FACURE_CACHE_DISABLE", "0") == "1":
+            return None
+        return self.cache_dir
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        if key in self._memory:
+            self.stats_["memory_hits"] += 1
+            return self._memory[key]
+        disk = self._disk()
+        if disk is not None and (disk / f"{key}.npy").exists():
+            try:
+                pred = np.load(disk / f"{key}.npy")
+            except (OSError, ValueError):
+                return None
+            self.stats_["disk_hits"] += 1
+            self._memory[key] = pred
+            return pred
+        return None
+
+    def _store(self, key: str, pred: np.ndarray) -> None:
+        """Keep in memory and write atomically to disk; disk is best-effort."""
+        self._memory[key] = pred
+        disk = self._disk()
+        if disk is None:
+            return
+        path = disk / f"{key}.npy"
+        tmp = disk / f"{key}.{os.getpid()}.tmp.npy"
+        try:
+            disk.mkdir(parents=True, exist_ok=True)
+            np.save(tmp, pred)
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+
+# =============================================================================
+# Estimators
+# =============================================================================
+
+
+def dml_plr(
+    X: np.ndarray,
+    T: np.ndarray,
+    Y: np.ndarray,
+    model_y,
+    model_t,
+    seeds: Sequence[int] = (42,),
+    fitter: Optional[CrossFitter] = None,
+    method_t: str = "predict",
+    alpha: float = 0.05,
+) -> Dict[str, Any]:
+    """
+    Partially linear DML with (repeated) cross-fitting.
+
+    Each fold seed gives the residual-on-residual estimate and influence
+    function SE of ``DoubleMachineLearning.fit``. With several seeds the
+    estimate is the median, and the SE is
+    ``sqrt(median(se_s² + (θ_s - θ)²))`` (Chernozhukov et al. 2018).
+
+    Parameters
+    ----------
+    X, T, Y : np.ndarray
+        Confounders, treatment and outcome.
+    model_y, model_t : sklearn estimators
+        Nuisance models for E[Y|X] and E[T|X].
+    seeds : sequence of int
+        Fold seeds (one per repetition).
+    fitter : CrossFitter, optional
+        Shared engine (and cache); a fresh 5-fold one if None.
+    method_t : str
+        Prediction method for the treatment model (``"predict_proba"`` for
+        a classifier on binary T).
+    alpha : float
+        Significance level.
+
+    Returns
+    -------
+    dict
+        tau, se, ci_lower, ci_upper, p_value, estimates (per-seed DataFrame),
+        Y_residual and T_residual (first seed).
+    """
+    fitter = fitter if fitter is not None else CrossFitter()
+    X, T, Y = np.asarray(X), np.asarray(T, dtype=float), np.asarray(Y, dtype=float)
+    seeds = list(seeds)
+    requests = []
+    for seed in seeds:
+        requests.append(dict(model=model_y, X=X, y=Y, seed=seed))
+        requests.append(dict(model=model_t, X=X, y=T, seed=seed, method=method_t))
+    predictions = fitter.oof_many(requests)
+
+    rows, residuals = [], []
+    n = len(Y)
+    for i, seed in enumerate(seeds):
+        Y_res, T_res = Y - predictions[2 * i], T - predictions[2 * i + 1]
+        tau, psi = residual_influence(Y_res, T_res)
+        rows.append({"seed": seed, "tau": tau, "se": np.sqrt(np.var(psi, ddof=1) / n)})
+        residuals.append((Y_res, T_res))
+    estimates = pd.DataFrame(rows)
+
+    tau = float(np.median(estimates["tau"]))
+    se = float(np.sqrt(np.median(estimates["se"] ** 2 + (estimates["tau"] - tau) ** 2)))
+    z = stats.norm.ppf(1 - alpha / 2)
+    return {
+        "tau": tau,
+        "se": se,
+        "ci_lower": tau - z * se,
+        "ci_upper": tau + z * se,
+        "p_value": float(2 * stats.norm.sf(abs(tau / se))),
+        "estimates": estimates,
+        "Y_residual": residuals[0][0],
+        "T_residual": residuals[0][1],
+    }
+
+
+def r_learner(
+    X: np.ndarray,
+    T: np.ndarray,
+    Y: np.ndarray,
+    model_y,
+    model_t,
+    final_model,
+    seed: int = 42,
+    fitter: Optional[CrossFitter] = None,
+    features: Optional[np.ndarray] = None,
+    method_t: str = "predict",
+):
+    """
+    R-learner CATE model on cross-fitted residuals.
+
+    Minimizes ``Σ (Ỹ - τ(x) T̃)²`` by regressing ``Ỹ / T̃`` on the features
+    with weights ``T̃²``. The nuisances are the DML ones, so with a shared
+    ``fitter`` they are not refit.
+
+    Parameters
+    ----------
+    X, T, Y : np.ndarray
+        Confounders, treatment and outcome.
+    model_y, model_t : sklearn estimators
+        Nuisance models.
+    final_model : sklearn estimator
+        CATE model; must accept ``sample_weight``.
+    seed : int
+        Fold seed.
+    fitter : CrossFitter, optional
+        Shared engine.
+    features : np.ndarray, optional
+        Effect modifiers for the final model (default ``X``).
+    method_t : str
+        Prediction method for the treatment model.
+
+    Returns
+    -------
+    sklearn estimator
+        Fitted clone of ``final_model``.
+    """
+    from sklearn.base import clone
+
+    fitter = fitter if fitter is not None else CrossFitter()
+    X, T, Y = np.asarray(X), np.asarray(T, dtype=float), np.asarray(Y, dtype=float)
+    m_y, m_t = fitter.oof_many([dict(model=model_y, X=X, y=Y, seed=seed),
+                                dict(model=model_t, X=X, y=T, seed=seed, method=method_t)])
+    Y_res, T_res = Y - m_y, T - m_t
+    features = X if features is None else np.asarray(features)
+    return clone(final_model).fit(features, Y_res / T_res, sample_weight=T_res ** 2)
+
+
+def aipw(
+    X: np.ndarray,
+    T: np.ndarray,
+    Y: np.ndarray,
+    model_y,
+    model_t,
+    seed: int = 42,
+    fitter: Optional[CrossFitter] = None,
+    clip: float = 0.01,
+    alpha: float = 0.05,
+) -> Dict[str, Any]:
+    """
+    Cross-fitted AIPW (doubly robust) ATE for binary treatment.
+
+    Outcome models are fit per arm (``subset=T==t``) and the propensity with
+    ``predict_proba``; all three share the fitter's folds and cache.
+
+    Parameters
+    ----------
+    X, T, Y : np.ndarray
+        Confounders, binary treatment and outcome.
+    model_y : sklearn regressor
+        Outcome model, fit separately on treated and control rows.
+    model_t : sklearn classifier
+        Propensity model.
+    seed : int
+        Fold seed.
+    fitter : CrossFitter, optional
+        Shared engine.
+    clip : float
+        Propensity clipping to ``[clip, 1 - clip]``.
+    alpha : float
+        Significance level.
+
+    Returns
+    -------
+    dict
+        ate, se, ci_lower, ci_upper, psi (influence function), ps, mu0, mu1.
+    """
+    fitter = fitter if fitter is not None else CrossFitter()
+    X, T, Y = np.asarray(X), np.asarray(T, dtype=float), np.asarray(Y, dtype=float)
+    treated = T == 1
+    mu0, mu1, ps = fitter.oof_many([
+        dict(model=model_y, X=X, y=Y, seed=seed, subset=~treated),
+        dict(model=model_y, X=X, y=Y, seed=seed, subset=treated),
+        dict(model=model_t, X=X, y=T, seed=seed, method="predict_proba"),
+    ])
+    ps = np.clip(ps, clip, 1 - clip)
+    ate, psi = aipw_influence(Y, T, ps, mu0, mu1)
+    se = float(np.sqrt(np.var(psi, ddof=1) / len(Y)))
+    z = stats.norm.ppf(1 - alpha / 2)
+    return {"ate": float(ate), "se": se, "ci_lower": ate - z * se, "ci_upper": ate + z * se,
+            "psi": psi, "ps": ps, "mu0": mu0, "mu1": mu1}
@@ -0,0 +1,179 @@
+"""
+Double machine learning for many outcomes and treatments.
+
+``DoubleMachineLearning`` in 05_dml_implementation fits one outcome against
+one treatment, so estimating m metrics against the same treatment refits the
+treatment model m times. The packaged :class:`DoubleMachineLearning`:
+
+- takes an outcome matrix ``Y (n, m)`` and treatments ``T (n, k)``;
+- cross-fits each treatment nuisance once and every outcome nuisance in the
+  same :class:`~facure_augment.dml.CrossFitter` batch (one process pool, and
+  cached across fits);
+- solves the final stage for all outcomes at once:
+  ``Θ = (T̃ᵀT̃)⁻¹ T̃ᵀỸ`` with one Cholesky factorization, and the sandwich
+  covariances ``n/(n-1) · A⁻¹ (Σᵢ eᵢⱼ² t̃ᵢt̃ᵢᵀ) A⁻¹`` as one batched product.
+
+With one outcome and one treatment the estimate and standard error equal the
+notebook class.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+from scipy import linalg, stats
+
+from facure_augment.dml.crossfit import CrossFitter
+
+__all__ = [
+    "DoubleMachineLearning",
+]
+
+
+def _as_matrix(a, prefix: str):
+    """2-D float array and column names from an array, Series or DataFrame."""
+    if isinstance(a, pd.DataFrame):
+        return a.to_numpy(dtype=float), [str(c) for c in a.columns]
+    if isinstance(a, pd.Series):
+        return a.to_numpy(dtype=float)[:, None], [str(a.name) if a.name is not None else prefix]
+    a = np.asarray(a, dtype=float)
+    if a.ndim == 1:
+        return a[:, None], [prefix]
+    return a, [f"{prefix}{j}" for j in range(a.shape[1])]
+
+
+class DoubleMachineLearning:
+    """
+    Partially linear DML for an outcome matrix and several treatments.
+
+    Model: ``Yⱼ = Tθⱼ + gⱼ(X) + εⱼ``, ``T = m(X) + v``.
+
+    Parameters
+    ----------
+    model_Y : sklearn estimator, optional
+        Model for E[Yⱼ|X], cloned per outcome and fold. Default: the
+        notebook's RandomForest.
+    model_T : sklearn estimator, optional
+        Model for E[Tₗ|X], cloned per treatment and fold.
+    n_folds : int
+        Number of cross-fitting folds.
+    random_state : int
+        Fold seed (and default forests' seed).
+    n_jobs : int
+        Worker processes for nuisance fits.
+    cache_dir : str or Path, optional
+        Disk cache for out-of-fold predictions.
+    fitter : CrossFitter, optional
+        Shared engine; overrides n_folds, n_jobs and cache_dir.
+    alpha : float
+        Significance level for intervals.
+
+    Attributes
+    ----------
+    tau_, se_, pvalue_ : pd.DataFrame
+        Coefficients, standard errors and p-values (outcomes × treatments).
+    ci_ : tuple of pd.DataFrame
+        Lower and upper interval bounds.
+    vcov_ : np.ndarray
+        Covariance of each outcome's coefficients ``(m, k, k)``.
+    Y_resid_, T_resid_ : np.ndarray
+        Cross-fitted residuals ``(n, m)`` and ``(n, k)``.
+
+    Examples
+    --------
+    >>> dml = DoubleMachineLearning(LGBMRegressor(), LGBMRegressor(), n_jobs=8)
+    >>> dml.fit(metrics_df, df[["treatment"]], df[confounders])
+    >>> dml.summary().sort_values("p_value")
+    """
+
+    def __init__(
+        self,
+        model_Y=None,
+        model_T=None,
+        n_folds: int = 5,
+        random_state: int = 42,
+        n_jobs: int = 1,
+        cache_dir: Optional[Union[str, Path]] = None,
+        fitter: Optional[CrossFitter] = None,
+        alpha: float = 0.05,
+    ):
+        from sklearn.ensemble import RandomForestRegressor
+
+        default = RandomForestRegressor(n_estimators=100, max_depth=10, min_samples_leaf=5,
+                                        random_state=random_state)
+        self.model_Y = model_Y if model_Y is not None else default
+        self.model_T = model_T if model_T is not None else default
+        self.random_state = random_state
+        self.alpha = alpha
+        self.fitter = fitter if fitter is not None else CrossFitter(n_folds, cache_dir, n_jobs)
+
+    def fit(self, Y, T, X) -> "DoubleMachineLearning":
+        """
+        Cross-fit all nuisances and solve the final stage.
+
+        Parameters
+        ----------
+        Y : array-like (n,) or (n, m)
+            Outcome(s); DataFrame columns name the outcomes.
+        T : array-like (n,) or (n, k)
+            Treatment(s), continuous or binary.
+        X : array-like (n, p)
+            Confounders.
+
+        Returns
+        -------
+        self
+        """
+        Y, outcomes = _as_matrix(Y, "Y")
+        T, treatments = _as_matrix(T, "T")
+        X = np.asarray(X)
+        n = len(Y)
+
+        seed = self.random_state
+        requests = [dict(model=self.model_T, X=X, y=T[:, l], seed=seed) for l in range(T.shape[1])]
+        requests += [dict(model=self.model_Y, X=X, y=Y[:, j], seed=seed) for j in range(Y.shape[1])]
+        predictions = np.column_stack(self.fitter.oof_many(requests))
+        T_res = T - predictions[:, : T.shape[1]]
+        Y_res = Y - predictions[:, T.shape[1]:]
+
+        A = T_res.T @ T_res
+        factor = linalg.cho_factor(A)
+        theta = linalg.cho_solve(factor, T_res.T @ Y_res)
+        A_inv = linalg.cho_solve(factor, np.eye(len(A)))
+        resid = Y_res - T_res @ theta
+        meat = np.einsum("ij,ia,ib->jab", resid ** 2, T_res, T_res, optimize=True)
+        vcov = n / (n - 1) * A_inv @ meat @ A_inv
+
+        se = np.sqrt(np.diagonal(vcov, axis1=1, axis2=2))
+        tau = theta.T
+        z = stats.norm.ppf(1 - self.alpha / 2)
+
+        def frame(values):
+            return pd.DataFrame(values, index=pd.Index(outcomes, name="outcome"),
+                                columns=pd.Index(treatments, name="treatment"))
+
+        self.tau_ = frame(tau)
+        self.se_ = frame(se)
+        self.ci_ = (frame(tau - z * se), frame(tau + z * se))
+        self.pvalue_ = frame(2 * stats.norm.sf(np.abs(tau / se)))
+        self.vcov_ = vcov
+        self.Y_resid_, self.T_resid_ = Y_res, T_res
+        return self
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Long table of estimates.
+
+        Returns
+        -------
+        pd.DataFrame
+            outcome, treatment, estimate, se, ci_lower, ci_upper, p_value.
+        """
+        if not hasattr(self, "tau_"):
+            raise ValueError("Model not fitted. Call fit() first.")
+        columns = {"estimate": self.tau_, "se": self.se_, "ci_lower": self.ci_[0],
+                   "ci_upper": self.ci_[1], "p_value": self.pvalue_}
+        return pd.DataFrame({name: df.stack() for name, df in columns.items()}).reset_index()
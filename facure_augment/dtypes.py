@@ -0,0 +1,128 @@
+"""
+Per-dataset dtype schemas for the bundled CSV files.
+
+``pd.read_csv`` infers int64/float64/object for every column, which doubles
+(or octuples, for 0/1 flags) the memory of large simulated versions of the
+datasets and slows groupbys on ID columns. The registry in
+``schema/dataset_dtypes.json`` lists explicit dtypes per column:
+
+- ``category`` for region/state/school IDs
+- ``int8``/``int16`` for flags and small counts
+- ``float32`` where values carry few significant digits
+
+Usage
+-----
+    from facure_augment.common import load_facure_data
+    from facure_augment.dtypes import memory_report
+
+    df = load_facure_data("learning_mindset.csv", typed=True)
+    memory_report(["learning_mindset.csv"])
+"""
+
+from __future__ import annotations
+
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence
+
+import pandas as pd
+
+__all__ = [
+    "DTYPE_SCHEMA_PATH",
+    "load_dtype_schema",
+    "dataset_dtypes",
+    "memory_report",
+]
+
+DTYPE_SCHEMA_PATH = Path(__file__).parent / "schema" / "dataset_dtypes.json"
+
+
+@lru_cache(maxsize=1)
+def load_dtype_schema() -> Dict[str, Dict[str, str]]:
+    """
+    Load the dtype registry.
+
+    Returns
+    -------
+    dict
+        Mapping of dataset filename to ``{column: dtype}``.
+    """
+    with open(DTYPE_SCHEMA_PATH) as f:
+        schema = json.load(f)
+    return {name: cols for name, cols in schema.items() if not name.startswith("$")}
+
+
+def dataset_dtypes(filename: str, usecols: Optional[Sequence[str]] = None) -> Dict[str, str]:
+    """
+    Column dtypes for one dataset, ready to pass to ``pd.read_csv(dtype=...)``.
+
+    Parameters
+    ----------
+    filename : str
+        Dataset name (e.g., "learning_mindset.csv").
+    usecols : sequence of str, optional
+        Restrict the mapping to these columns.
+
+    Returns
+    -------
+    dict
+        ``{column: dtype}``. Empty for datasets without a schema, which are
+        then parsed with pandas' defaults.
+    """
+    dtypes = dict(load_dtype_schema().get(filename, {}))
+    if usecols is not None:
+        keep = set(usecols)
+        dtypes = {col: dtype for col, dtype in dtypes.items() if col in keep}
+    return dtypes
+
+
+def memory_report(
+    filenames: Optional[Iterable[str]] = None,
+    usecols: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """
+    Memory of each dataset with default and schema dtypes.
+
+    Parameters
+    ----------
+    filenames : iterable of str, optional
+        Datasets to report. Defaults to every dataset in the registry that
+        can be found on disk.
+    usecols : sequence of str, optional
+        Column projection applied to both loads.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per dataset with ``rows``, ``default_mb``, ``typed_mb`` and
+        ``reduction`` (fraction of memory saved), sorted by ``default_mb``.
+    """
+    # Imported here: common pulls in the plotting stack
+    from facure_augment.common import load_facure_data
+
+    if filenames is None:
+        filenames = list(load_dtype_schema())
+
+    records = []
+    for filename in filenames:
+        try:
+            default = load_facure_data(filename, usecols=usecols, cache=False)
+        except FileNotFoundError:
+            continue
+        typed = load_facure_data(filename, usecols=usecols, typed=True, cache=False)
+        before = default.memory_usage(deep=True).sum()
+        after = typed.memory_usage(deep=True).sum()
+        records.append({
+            "dataset": filename,
+            "rows": len(default),
+            "default_mb": before / 1e6,
+            "typed_mb": after / 1e6,
+            "reduction": 1 - after / before,
+        })
+
+    return (
+        pd.DataFrame(records, columns=["dataset", "rows", "default_mb", "typed_mb", "reduction"])
+        .sort_values("default_mb", ascending=False)
+        .reset_index(drop=True)
+    )
@@ -0,0 +1,31 @@
+"""Causal model evaluation utilities for augmented."""
+
+from facure_augment.evaluation.curves import (
+    row_grid,
+    cumulative_moments,
+    cumulative_elast_curve,
+    cumulative_elast_curve_ci,
+    cumulative_gain,
+    cumulative_gain_ci,
+    cumulative_curve,
+    auuc,
+)
+from facure_augment.evaluation.streaming import (
+    StreamingGain,
+    quantile_edges,
+    gain_curve_error,
+)
+
+__all__ = [
+    "row_grid",
+    "cumulative_moments",
+    "cumulative_elast_curve",
+    "cumulative_elast_curve_ci",
+    "cumulative_gain",
+    "cumulative_gain_ci",
+    "cumulative_curve",
+    "auuc",
+    "StreamingGain",
+    "quantile_edges",
+    "gain_curve_error",
+]
@@ -0,0 +1,33 @@
+"""Resampling-based inference utilities for augmented."""
+
+from facure_augment.inference.bootstrap import (
+    iter_bootstrap_weights,
+    bootstrap_weights,
+    iptw_statistic,
+    hajek_statistic,
+    aipw_statistic,
+    residual_statistic,
+    bootstrap,
+)
+from facure_augment.inference.multiplier import (
+    multiplier_weights,
+    multiplier_bootstrap,
+    aipw_influence,
+    hajek_influence,
+    residual_influence,
+)
+
+__all__ = [
+    "iter_bootstrap_weights",
+    "bootstrap_weights",
+    "iptw_statistic",
+    "hajek_statistic",
+    "aipw_statistic",
+    "residual_statistic",
+    "bootstrap",
+    "multiplier_weights",
+    "multiplier_bootstrap",
+    "aipw_influence",
+    "hajek_influence",
+    "residual_influence",
+]
@@ -0,0 +1,29 @@
+"""Matching utilities for augmented."""
+
+from facure_augment.matching.nearest import (
+    Matcher,
+    matching_estimate,
+)
+from facure_augment.matching.cem import (
+    coarsen,
+    stratum_keys,
+    CEM,
+)
+from facure_augment.matching.balance import (
+    balance_table,
+    ess_table,
+    balance_diagnostics,
+    love_plot,
+)
+
+__all__ = [
+    "Matcher",
+    "matching_estimate",
+    "coarsen",
+    "stratum_keys",
+    "CEM",
+    "balance_table",
+    "ess_table",
+    "balance_diagnostics",
+    "love_plot",
+]
@@ -0,0 +1,359 @@
+"""
+Covariate balance for many covariates and many weightings at once.
+
+``compute_smd`` and ``ps_diagnostic_summary`` (11_propensity_score) and
+``analyze_balance`` (10_matching) loop over covariates in Python, one
+weighting per call. Here the weightings are the columns of an ``(n, k)``
+matrix ``W``, normalised within each arm, and every statistic is a matrix
+product over the ``(n, p)`` covariates:
+
+- weighted means ``W₁ᵀX`` and ``W₀ᵀX`` and variances ``W₁ᵀX² - mean²``
+  (on centred ``X``), giving SMDs and variance ratios as ``(k, p)`` arrays
+- weighted Kolmogorov-Smirnov distances from one sort per covariate shared
+  by all weightings: the running sum of ``W₁ - W₀`` along the sort order is
+  the difference of the two weighted empirical CDFs
+- Kish effective sample sizes ``(Σw)² / Σw²`` per arm
+
+Matched samples fit the same form: a control's weight is the number of
+times it was matched.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from facure_augment.viz.tufte import (
+    COLORS,
+    TUFTE_PALETTE,
+    add_subtle_grid,
+    create_tufte_figure,
+    set_tufte_labels,
+    set_tufte_title,
+)
+
+if TYPE_CHECKING:
+    from matplotlib.axes import Axes
+
+__all__ = [
+    "balance_table",
+    "ess_table",
+    "balance_diagnostics",
+    "love_plot",
+]
+
+Weights = Union[None, np.ndarray, pd.DataFrame, Dict[str, np.ndarray]]
+
+
+# =============================================================================
+# Inputs
+# =============================================================================
+
+
+def _covariates(X, names: Optional[Sequence[str]]) -> Tuple[np.ndarray, List]:
+    if names is None:
+        names = list(X.columns) if isinstance(X, pd.DataFrame) else None
+    X = np.asarray(X, dtype=np.float64)
+    X = X.reshape(len(X), -1)
+    return X, list(names) if names is not None else list(range(X.shape[1]))
+
+
+def _weight_matrix(weights: Weights, n: int, unweighted: bool) -> Tuple[List, np.ndarray]:
+    """Weighting labels and the ``(n, k)`` weight matrix."""
+    if weights is None:
+        labels, columns = [], []
+    elif isinstance(weights, dict):
+        labels, columns = list(weights), [np.asarray(w, dtype=np.float64) for w in weights.values()]
+    elif isinstance(weights, pd.DataFrame):
+        labels, columns = list(weights.columns), list(weights.to_numpy(dtype=np.float64).T)
+    else:
+        W = np.asarray(weights, dtype=np.float64)
+        W = W.reshape(n, -1)
+        labels = ["weighted"] if W.shape[1] == 1 else [f"w{j}" for j in range(W.shape[1])]
+        columns = list(W.T)
+    if unweighted or not columns:
+        labels, columns = ["unweighted"] + labels, [np.ones(n)] + columns
+    W = np.column_stack(columns)
+    if W.shape[0] != n:
+        raise ValueError("Weights must have one row per observation")
+    if np.any(W < 0):
+        raise ValueError("Weights must be non-negative")
+    return labels, W
+
+
+def _arm_weights(W: np.ndarray, T: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Weights normalised to sum to one within each arm."""
+    W1 = W * T[:, None]
+    W0 = W * ~T[:, None]
+    s1, s0 = W1.sum(axis=0), W0.sum(axis=0)
+    if np.any(s1 == 0) or np.any(s0 == 0):
+        raise ValueError("Every weighting needs positive weight in both arms")
+    return W1 / s1, W0 / s0
+
+
+def _weighted_ks(X: np.ndarray, D: np.ndarray) -> np.ndarray:
+    """KS distance of every weighting and covariate; ``D`` is ``W₁ - W₀``."""
+    ks = np.empty((D.shape[1], X.shape[1]))
+    for j in range(X.shape[1]):
+        order = np.argsort(X[:, j], kind="stable")
+        x = X[order, j]
+        last = np.r_[x[1:] != x[:-1], True]
+        ks[:, j] = np.abs(np.cumsum(D[order], axis=0)[last]).max(axis=0)
+    return ks
+
+
+# =============================================================================
+# Balance
+# =============================================================================
+
+
+def balance_table(
+    X: Union[np.ndarray, pd.DataFrame],
+    T: np.ndarray,
+    weights: Weights = None,
+    names: Optional[Sequence[str]] = None,
+    unweighted: bool = True,
+    denominator: str = "unweighted",
+    ks: bool = True,
+) -> pd.DataFrame:
+    """
+    Weighted balance of every covariate under every weighting.
+
+    Parameters
+    ----------
+    X : np.ndarray or pd.DataFrame
+        Covariates ``(n, p)``.
+    T : np.ndarray
+        Binary treatment.
+    weights : array, DataFrame or dict, optional
+        Candidate weightings: ``(n,)`` or ``(n, k)`` array, DataFrame with
+        one column per weighting, or dict from label to ``(n,)`` array.
+    names : sequence of str, optional
+        Covariate names (default: DataFrame columns or positions).
+    unweighted : bool
+        Prepend the unweighted comparison (label ``"unweighted"``).
+    denominator : str
+        SMD scale: ``"unweighted"`` pooled SD ``sqrt((s²₁ + s²₀) / 2)`` of
+        the raw arms (as ``compute_smd``, comparable across weightings) or
+        ``"weighted"`` pooled SD of each weighted sample (as
+        ``analyze_balance`` on a matched sample).
+    ks : bool
+        Compute the weighted KS distances (one sort per covariate).
+
+    Returns
+    -------
+    pd.DataFrame
+        Indexed by (weighting, covariate): mean_treated, mean_control, smd,
+        variance_ratio (weighted treated / control variance) and ks.
+
+    Examples
+    --------
+    >>> balance_table(X, T, {"ipw": T / ps + (1 - T) / (1 - ps), "overlap": T * (1 - ps) + (1 - T) * ps})
+    """
+    if denominator not in ("unweighted", "weighted"):
+        raise ValueError(f"Unknown denominator: {denominator}")
+    X, names = _covariates(X, names)
+    T = np.asarray(T).astype(bool)
+    labels, W = _weight_matrix(weights, len(T), unweighted)
+    W1, W0 = _arm_weights(W, T)
+
+    Xc = X - X.mean(axis=0)
+    Xc2 = Xc * Xc
+    m1, m0 = W1.T @ Xc, W0.T @ Xc
+    v1, v0 = W1.T @ Xc2 - m1 ** 2, W0.T @ Xc2 - m0 ** 2
+    if denominator == "unweighted":
+        scale = np.sqrt((Xc[T].var(axis=0) + Xc[~T].var(axis=0)) / 2)
+    else:
+        scale = np.sqrt((v1 + v0) / 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        smd = np.where(scale > 0, (m1 - m0) / scale, 0.0)
+        ratio = v1 / v0
+
+    shift = X.mean(axis=0)
+    table = pd.DataFrame({
+        "mean_treated": (m1 + shift).ravel(),
+        "mean_control": (m0 + shift).ravel(),
+        "smd": smd.ravel(),
+        "variance_ratio": ratio.ravel(),
+    }, index=pd.MultiIndex.from_product([labels, names], names=["weighting", "covariate"]))
+    if ks:
+        table["ks"] = _weighted_ks(X, W1 - W0).ravel()
+    return table
+
+
+def ess_table(T: np.ndarray, weights: Weights = None, unweighted: bool = True) -> pd.DataFrame:
+    """
+    Kish effective sample size of each arm under every weighting.
+
+    Parameters
+    ----------
+    T : np.ndarray
+        Binary treatment.
+    weights : array, DataFrame or dict, optional
+        Candidate weightings (see :func:`balance_table`).
+    unweighted : bool
+        Prepend the unweighted row.
+
+    Returns
+    -------
+    pd.DataFrame
+        Indexed by weighting: n_treated, n_control, ess_treated,
+        ess_control and their ratios to the arm sizes.
+    """
+    T = np.asarray(T).astype(bool)
+    labels, W = _weight_matrix(weights, len(T), unweighted)
+    W1, W0 = W * T[:, None], W * ~T[:, None]
+    ess1 = W1.sum(axis=0) ** 2 / (W1 * W1).sum(axis=0)
+    ess0 = W0.sum(axis=0) ** 2 / (W0 * W0).sum(axis=0)
+    n1, n0 = int(T.sum()), int((~T).sum())
+    return pd.DataFrame({
+        "n_treated": n1,
+        "n_control": n0,
+        "ess_treated": ess1,
+        "ess_control": ess0,
+        "ess_ratio_treated": ess1 / n1,
+        "ess_ratio_control": ess0 / n0,
+    }, index=pd.Index(labels, name="weighting"))
+
+
+def balance_diagnostics(
+    X: Union[np.ndarray, pd.DataFrame],
+    T: np.ndarray,
+    weights: Weights = None,
+    names: Optional[Sequence[str]] = None,
+    unweighted: bool = True,
+    denominator: str = "unweighted",
+    threshold: float = 0.1,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Balance table, effective sample sizes and a per-weighting summary.
+
+    Parameters
+    ----------
+    X, T, weights, names, unweighted, denominator
+        See :func:`balance_table`.
+    threshold : float
+        |SMD| above which a covariate counts as imbalanced.
+
+    Returns
+    -------
+    dict
+        table (:func:`balance_table`), ess (:func:`ess_table`) and summary,
+        indexed by weighting: max_abs_smd, mean_abs_smd, n_imbalanced,
+        max_ks, max_log_variance_ratio (largest |log ratio|), ess_treated,
+        ess_control, ess_ratio (smaller of the two arm ratios) and balanced
+        (max_abs_smd below ``threshold``).
+    """
+    table = balance_table(X, T, weights, names, unweighted, denominator)
+    ess = ess_table(T, weights, unweighted)
+    grouped = table.groupby(level="weighting", sort=False)
+    abs_smd = table["smd"].abs().groupby(level="weighting", sort=False)
+    summary = pd.DataFrame({
+        "max_abs_smd": abs_smd.max(),
+        "mean_abs_smd": abs_smd.mean(),
+        "n_imbalanced": (table["smd"].abs() > threshold).groupby(level="weighting", sort=False).sum(),
+        "max_ks": grouped["ks"].max(),
+        "max_log_variance_ratio": np.log(table["variance_ratio"]).abs()
+        .groupby(level="weighting", sort=False).max(),
+    })
+    summary["ess_treated"] = ess["ess_treated"]
+    summary["ess_control"] = ess["ess_control"]
+    summary["ess_ratio"] = ess[["ess_ratio_treated", "ess_ratio_control"]].min(axis=1)
+    summary["balanced"] = summary["max_abs_smd"] < threshold
+    return {"table": table, "ess": ess, "summary": summary}
+
+
+# =============================================================================
+# Love Plot
+# =============================================================================
+
+
+_SERIES_COLORS = ["control", "treatment", "effect", "true_value", "residual", "purple"]
+
+
+def love_plot(
+    table: pd.DataFrame,
+    stat: str = "smd",
+    absolute: bool = True,
+    threshold: Optional[float] = 0.1,
+    max_labels: int = 40,
+    ax: Optional[Axes] = None,
+    title: Optional[str] = "Covariate balance",
+) -> Axes:
+    """
+    Tufte love plot of a :func:`balance_table`.
+
+    One row per covariate, sorted by the first weighting (usually
+    ``"unweighted"``); a thin rule spans each covariate's range across
+    weightings and each weighting is a column of dots, labelled in the
+    right margin with its maximum. Covariate names are shown when there are at most
+    ``max_labels`` of them.
+
+    Parameters
+    ----------
+    table : pd.DataFrame
+        Output of :func:`balance_table`.
+    stat : str
+        Column to plot (``"smd"``, ``"ks"`` or ``"variance_ratio"``).
+    absolute : bool
+        Plot absolute values.
+    threshold : float, optional
+        Reference line (mirrored for signed SMDs).
+    max_labels : int
+        Largest number of covariate names to draw.
+    ax : matplotlib.axes.Axes, optional
+        Axes to draw on (default: a new Tufte figure).
+    title : str, optional
+        Axes title.
+
+    Returns
+    -------
+    matplotlib.axes.Axes
+        The axes.
+    """
+    values = table[stat].unstack("weighting")
+    labels = list(table.index.get_level_values("weighting").unique())
+    covariates = list(table.index.get_level_values("covariate").unique())
+    V = values.loc[covariates, labels].to_numpy(dtype=np.float64)
+    if absolute:
+        V = np.abs(V)
+    order = np.argsort(np.abs(V[:, 0]), kind="stable")
+    V = V[order]
+    y = np.arange(len(order))
+
+    if ax is None:
+        _, ax = create_tufte_figure(figsize=(7, min(0.22 * len(order) + 1.5, 12)))
+    if V.shape[1] > 1:
+        ax.hlines(y, np.nanmin(V, axis=1), np.nanmax(V, axis=1), color=TUFTE_PALETTE["grid"],
+                  linewidth=1.0, zorder=1)
+    size = 18 if len(order) <= max_labels else 6
+    for j, label in enumerate(labels):
+        color = COLORS[_SERIES_COLORS[j % len(_SERIES_COLORS)]]
+        ax.scatter(V[:, j], y, s=size, color=color, zorder=2, linewidths=0)
+        top = np.nanargmax(np.abs(V[:, j]))
+        ax.annotate(f"{label}  {np.abs(V[top, j]):.2f}", xy=(1.0, 1.0), xytext=(8, -12 * j),
+                    xycoords="axes fraction", textcoords="offset points", ha="left", va="top",
+                    fontsize=9, color=color)
+    if threshold is not None:
+        for t in ([threshold] if absolute or stat != "smd" else [-threshold, threshold]):
+            ax.axvline(t, color=TUFTE_PALETTE["tertiary"], linestyle="--", linewidth=0.8, zorder=0)
+    if stat == "smd" and not absolute:
+        ax.axvline(0, color=TUFTE_PALETTE["spine"], linewidth=0.8, zorder=0)
+
+    if len(order) <= max_labels:
+        ax.set_yticks(y)
+        ax.set_yticklabels([str(covariates[i]) for i in order], fontsize=8,
+                           color=TUFTE_PALETTE["text_secondary"])
+    else:
+        ax.set_yticks([])
+    ax.set_ylim(-1, len(order))
+    add_subtle_grid(ax, axis="x")
+    name = {"smd": "standardized mean difference", "ks": "KS distance",
+            "variance_ratio": "variance ratio"}.get(stat, stat)
+    set_tufte_labels(ax, f"|{name}|" if absolute else name,
+                     None if len(order) <= max_labels else f"{len(order)} covariates")
+    if title:
+        set_tufte_title(ax, title)
+    return ax
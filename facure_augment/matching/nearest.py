@@ -0,0 +1,508 @@
+"""
+Nearest-neighbor matching on a prebuilt index.
+
+``matching_ate``, ``knn_matching_att`` and ``bias_corrected_matching``
+(10_matching), ``ps_matching`` (11_propensity_score) and ``ps_matching_ate``
+(12_doubly_robust) compute distances pair by pair in Python, with full
+``cdist`` matrices, or with one ``kneighbors`` call per treated unit.
+:class:`Matcher` builds one index and answers every query from it:
+
+- Covariates are transformed once so that Euclidean distance equals the
+  chosen metric: ``standardized`` divides by the index rows' standard
+  deviations and ``mahalanobis`` multiplies by the Cholesky factor ``L`` of
+  ``Σ⁻¹`` (``‖(x - x')L‖² = (x - x')ᵀΣ⁻¹(x - x')``).
+- Multivariate data goes into a KD-tree (scipy, queried with ``workers``
+  threads) or a ball tree (scikit-learn, queried in chunks on a thread
+  pool; both release the GIL). One-dimensional data, such as propensity
+  scores, uses a sorted array and ``searchsorted``.
+- Calipers drop neighbors farther than the caliper. Matching without
+  replacement is greedy in query order, as in ``ps_matching``: each unit
+  takes its nearest still-unused neighbors, re-querying with a larger k
+  only when all candidates are taken.
+
+:func:`matching_estimate` turns matches into ATT, ATC or ATE estimates with
+the notebooks' standard error ``std(effects) / sqrt(n_matched)`` and the
+optional Abadie-Imbens regression bias correction.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+__all__ = [
+    "Matcher",
+    "matching_estimate",
+]
+
+
+# =============================================================================
+# Index
+# =============================================================================
+
+
+class Matcher:
+    """
+    Nearest-neighbor index over the rows to be matched to.
+
+    Parameters
+    ----------
+    metric : str
+        ``"euclidean"``, ``"standardized"`` or ``"mahalanobis"``.
+    algorithm : str
+        ``"kd_tree"``, ``"ball_tree"``, ``"sorted"`` (one-dimensional data
+        only) or ``"auto"`` (sorted for 1-D, KD-tree otherwise).
+    cov : np.ndarray, optional
+        Covariance for the Mahalanobis metric; the index rows' covariance
+        if None.
+    leaf_size : int
+        Tree leaf size.
+    n_jobs : int
+        Query threads.
+    chunk_size : int
+        Query rows per ball-tree task.
+
+    Examples
+    --------
+    >>> matcher = Matcher(metric="mahalanobis", cov=np.cov(X.T)).fit(X[T == 0])
+    >>> distances, indices = matcher.query(X[T == 1], k=2, caliper=0.2)
+    """
+
+    def __init__(
+        self,
+        metric: str = "euclidean",
+        algorithm: str = "auto",
+        cov: Optional[np.ndarray] = None,
+        leaf_size: int = 40,
+        n_jobs: int = 1,
+        chunk_size: int = 65_536,
+    ):
+        if metric not in ("euclidean", "standardized", "mahalanobis"):
+            raise ValueError(f"Unknown metric: {metric}")
+        if algorithm not in ("auto", "kd_tree", "ball_tree", "sorted"):
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+        self.metric = metric
+        self.algorithm = algorithm
+        self.cov = cov
+        self.leaf_size = leaf_size
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+
+    def fit(self, X: np.ndarray) -> "Matcher":
+        """
+        Whiten and index the rows to be matched to.
+
+        Parameters
+        ----------
+        X : np.ndarray
+            Index rows ``(n,)`` or ``(n, p)``.
+
+        Returns
+        -------
+        Matcher
+            ``self``.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        X = X.reshape(len(X), -1)
+        if self.metric == "standardized":
+            self.transform_ = np.diag(1 / X.std(axis=0))
+        elif self.metric == "mahalanobis":
+            cov = np.cov(X.T) if self.cov is None else np.asarray(self.cov, dtype=np.float64)
+            self.transform_ = np.linalg.cholesky(np.linalg.inv(np.atleast_2d(cov)))
+        else:
+            self.transform_ = None
+        Z = self._whiten(X)
+        self.Z_ = Z
+
+        algorithm = self.algorithm
+        if algorithm == "auto":
+            algorithm = "sorted" if Z.shape[1] == 1 else "kd_tree"
+        if algorithm == "sorted" and Z.shape[1] != 1:
+            raise ValueError("The sorted index needs one-dimensional data")
+        self.algorithm_ = algorithm
+        self.n_index_ = len(Z)
+
+        if algorithm == "sorted":
+            self.order_ = np.argsort(Z[:, 0], kind="stable")
+            self.order_desc_ = np.lexsort((-np.arange(len(Z)), Z[:, 0]))
+            self.sorted_ = Z[self.order_, 0]
+        elif algorithm == "kd_tree":
+            from scipy.spatial import cKDTree
+            self.tree_ = cKDTree(Z, leafsize=self.leaf_size)
+        else:
+            from sklearn.neighbors import BallTree
+            self.tree_ = BallTree(Z, leaf_size=self.leaf_size)
+        return self
+
+    def _whiten(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        X = X.reshape(len(X), -1)
+        return X if self.transform_ is None else X @ self.transform_
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def query(
+        self,
+        X: np.ndarray,
+        k: int = 1,
+        caliper: Optional[float] = None,
+        replacement: bool = True,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nearest index rows for every query row.
+
+        Parameters
+        ----------
+        X : np.ndarray
+            Query rows.
+        k : int
+            Neighbors per query row.
+        caliper : float, optional
+            Maximum distance (in metric units) of a match.
+        replacement : bool
+            If False, every index row is used at most once (greedy in query
+            order).
+
+        Returns
+        -------
+        distances : np.ndarray
+            ``(m, k)`` distances, ``inf`` where no match was found.
+        indices : np.ndarray
+            ``(m, k)`` index-row positions, ``-1`` where no match was found.
+        """
+        Z = self._whiten(X)
+        if replacement:
+            return self._knn(Z, k, caliper)
+        return self._greedy(Z, k, caliper)
+
+    def _knn(self, Z: np.ndarray, k: int, caliper: Optional[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """k nearest neighbors of every row, with replacement."""
+        k_eff = min(k, self.n_index_)
+        if self.algorithm_ == "sorted":
+            dist, idx = self._sorted_knn(Z[:, 0], k_eff)
+        else:
+            dist, idx = self._tree_knn(Z, k_eff)
+
+        if k_eff < k:
+            dist = np.hstack([dist, np.full((len(Z), k - k_eff), np.inf)])
+            idx = np.hstack([idx, np.full((len(Z), k - k_eff), -1)])
+        if caliper is not None:
+            outside = dist > caliper
+            dist, idx = np.where(outside, np.inf, dist), np.where(outside, -1, idx)
+        return dist, idx.astype(np.intp)
+
+    def _tree_query(self, Z: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Raw ``(m, k)`` tree query; ties come back in arbitrary order."""
+        if self.algorithm_ == "kd_tree":
+            dist, idx = self.tree_.query(Z, k=k, workers=self.n_jobs)
+            return dist.reshape(len(Z), k), idx.reshape(len(Z), k)
+        chunks = [Z[i:i + self.chunk_size] for i in range(0, len(Z), self.chunk_size)]
+        with ThreadPoolExecutor(max_workers=self.n_jobs) as executor:
+            parts = list(executor.map(lambda chunk: self.tree_.query(chunk, k=k), chunks))
+        dist = np.vstack([p[0] for p in parts]) if parts else np.empty((0, k))
+        idx = np.vstack([p[1] for p in parts]) if parts else np.empty((0, k), dtype=np.intp)
+        return dist, idx
+
+    def _tree_knn(self, Z: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k nearest rows from the tree, with the lowest row winning ties.
+
+        One extra neighbor is queried; rows whose last candidate still ties
+        the k-th distance are queried again with twice as many until the tie
+        run is complete, then candidates are sorted by distance and row.
+        """
+        n = self.n_index_
+        dist_out = np.empty((len(Z), k))
+        idx_out = np.empty((len(Z), k), dtype=np.intp)
+        rows = np.arange(len(Z))
+        m = min(k + 1, n)
+        dist, idx = self._tree_query(Z, m)
+        while True:
+            pick = _rowwise_lexsort(dist, idx)[:, :k]
+            dist_out[rows] = np.take_along_axis(dist, pick, axis=1)
+            idx_out[rows] = np.take_along_axis(idx, pick, axis=1)
+            if m >= n or len(rows) == 0:
+                break
+            tied = dist.max(axis=1) <= dist_out[rows, -1]
+            if not tied.any():
+                break
+            rows, m = rows[tied], min(2 * m, n)
+            dist, idx = self._tree_query(Z[rows], m)
+        return dist_out, idx_out
+
+    def _sorted_knn(self, z: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k nearest values from the k sorted positions on either side of each
+        insertion point.
+
+        Among equal distances the lowest original row wins, as ``np.argmin``
+        does. Runs of equal values are ordered by ascending row on the right
+        and descending row on the left, so the lowest rows of a run are
+        always inside the window.
+        """
+        pos = np.searchsorted(self.sorted_, z)[:, None]
+        window = np.hstack([pos - np.arange(1, k + 1), pos + np.arange(k)])
+        valid = (window >= 0) & (window < self.n_index_)
+        window = np.clip(window, 0, self.n_index_ - 1)
+        dist = np.where(valid, np.abs(self.sorted_[window] - z[:, None]), np.inf)
+        original = np.hstack([self.order_desc_[window[:, :k]], self.order_[window[:, k:]]])
+        pick = _rowwise_lexsort(dist, np.where(valid, original, self.n_index_))[:, :k]
+        rows = np.arange(len(z))[:, None]
+        return dist[rows, pick], original[rows, pick]
+
+    def _greedy(self, Z: np.ndarray, k: int, caliper: Optional[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Greedy matching without replacement, in query order.
+
+        Tree candidates come from an index over the still-unused rows. When
+        more than half of that index has been used it is rebuilt over the
+        rest, so late units do not wade through taken neighbors and the
+        total rebuild cost stays O(n log n).
+        """
+        if self.algorithm_ == "sorted":
+            return self._greedy_sorted(Z[:, 0], k, caliper)
+        dist_out = np.full((len(Z), k), np.inf)
+        idx_out = np.full((len(Z), k), -1, dtype=np.intp)
+        filled = [0] * len(Z)
+        used = bytearray(self.n_index_)
+        n_candidates = max(4 * k, 8)
+        block = 16_384
+
+        i = 0
+        while i < len(Z):
+            rows = np.flatnonzero(np.frombuffer(used, dtype=np.uint8) == 0)
+            if len(rows) == 0:
+                break
+            sub = Matcher("euclidean", self.algorithm_, leaf_size=self.leaf_size,
+                          n_jobs=self.n_jobs, chunk_size=self.chunk_size).fit(self.Z_[rows])
+            budget, rebuild = len(rows) // 2, False
+            while i < len(Z) and not rebuild:
+                dist, idx = sub._knn(Z[i:i + block], min(n_candidates, len(rows)), caliper)
+                dist, idx = dist.tolist(), np.where(idx >= 0, rows[np.maximum(idx, 0)], -1).tolist()
+                for d_i, j_i in zip(dist, idx):
+                    while True:
+                        for d, j in zip(d_i, j_i):
+                            if filled[i] == k:
+                                break
+                            if j >= 0 and not used[j]:
+                                used[j] = 1
+                                dist_out[i, filled[i]], idx_out[i, filled[i]] = d, j
+                                filled[i] += 1
+                                budget -= 1
+                        exhausted = j_i[-1] < 0 or len(j_i) >= len(rows)
+                        if filled[i] == k or exhausted:
+                            break
+                        d_i, j_i = sub._knn(Z[i:i + 1], 2 * len(j_i), caliper)
+                        d_i = d_i[0].tolist()
+                        j_i = np.where(j_i[0] >= 0, rows[np.maximum(j_i[0], 0)], -1).tolist()
+                    i += 1
+                    if budget < 0:
+                        rebuild = True
+                        break
+        return dist_out, idx_out
+
+    def _greedy_sorted(self, z: np.ndarray, k: int, caliper: Optional[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Greedy 1-D matching with "next unused position" union-find pointers.
+
+        Among equal distances the lowest original row wins, as ``np.argmin``
+        over the available controls does in ``ps_matching``.
+        """
+        n = self.n_index_
+        values = self.sorted_.tolist()
+        order = self.order_.tolist()
+        run_start = np.searchsorted(self.sorted_, self.sorted_).tolist()
+        right = list(range(n + 1))  # right[p]: p if unused, else towards the next unused
+        left = list(range(n + 1))   # left[p + 1]: same, leftwards; 0 means none
+        limit = np.inf if caliper is None else caliper
+
+        def find(parent, p):
+            root = p
+            while parent[root] != root:
+                root = parent[root]
+            while parent[p] != root:
+                parent[p], p = root, parent[p]
+            return root
+
+        dist_out = np.full((len(z), k), np.inf)
+        idx_out = np.full((len(z), k), -1, dtype=np.intp)
+        for i, (value, pos) in enumerate(zip(z.tolist(), np.searchsorted(self.sorted_, z).tolist())):
+            for slot in range(k):
+                r = find(right, pos)
+                l = find(left, pos) - 1
+                d_r = values[r] - value if r < n else np.inf
+                d_l = value - values[l] if l >= 0 else np.inf
+                if l >= 0:
+                    l = find(right, run_start[l])
+                if d_l < d_r or (d_l == d_r and l >= 0 and order[l] < order[r]):
+                    best, d = l, d_l
+                else:
+                    best, d = r, d_r
+                if d == np.inf or d > limit:
+                    break
+                right[best], left[best + 1] = best + 1, best
+                dist_out[i, slot], idx_out[i, slot] = d, order[best]
+        return dist_out, idx_out
+
+
+def _rowwise_lexsort(primary: np.ndarray, secondary: np.ndarray) -> np.ndarray:
+    """Column order sorting each row by ``primary`` and then ``secondary``."""
+    order = np.argsort(secondary, axis=1, kind="stable")
+    primary_sorted = np.take_along_axis(primary, order, axis=1)
+    return np.take_along_axis(order, np.argsort(primary_sorted, axis=1, kind="stable"), axis=1)
+
+
+# =============================================================================
+# Estimates
+# =============================================================================
+
+
+def _linear_fit(X: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """OLS coefficients with an intercept (first entry)."""
+    design = np.column_stack([np.ones(len(X)), X])
+    return np.linalg.lstsq(design, y, rcond=None)[0]
+
+
+def _linear_predict(coef: np.ndarray, X: np.ndarray) -> np.ndarray:
+    return coef[0] + X @ coef[1:]
+
+
+def _match_side(
+    X: np.ndarray,
+    Y: np.ndarray,
+    query: np.ndarray,
+    target: np.ndarray,
+    sign: float,
+    matcher: Matcher,
+    k: int,
+    caliper: Optional[float],
+    replacement: bool,
+    bias_correction: bool,
+) -> Dict[str, np.ndarray]:
+    """Effects for ``query`` rows matched to ``target`` rows."""
+    matcher.fit(X[target])
+    dist, idx = matcher.query(X[query], k, caliper, replacement)
+    found = idx >= 0
+    matched = found.any(axis=1)
+    counts = found.sum(axis=1)
+    safe = np.where(found, idx, 0)
+
+    Y_target = Y[target]
+    cf = np.where(found, Y_target[safe], 0.0).sum(axis=1)[matched] / counts[matched]
+    effects = sign * (Y[query][matched] - cf)
+    result = {"effects": effects, "distances": dist[matched], "matches": np.where(found, target[safe], -1),
+              "matched": matched}
+    if bias_correction:
+        coef = _linear_fit(X[target], Y_target)
+        mu_target = _linear_predict(coef, X[target])
+        mu_query = _linear_predict(coef, X[query][matched])
+        mu_matched = np.where(found, mu_target[safe], 0.0).sum(axis=1)[matched] / counts[matched]
+        result["corrected"] = sign * (Y[query][matched] - (cf + mu_query - mu_matched))
+    return result
+
+
+def matching_estimate(
+    X: np.ndarray,
+    T: np.ndarray,
+    Y: np.ndarray,
+    estimand: str = "att",
+    k: int = 1,
+    metric: str = "euclidean",
+    caliper: Optional[float] = None,
+    replacement: bool = True,
+    bias_correction: bool = False,
+    algorithm: str = "auto",
+    n_jobs: int = 1,
+) -> Dict[str, Any]:
+    """
+    Nearest-neighbor matching estimate of the ATT, ATC or ATE.
+
+    Parameters
+    ----------
+    X : np.ndarray
+        Covariates ``(n, p)``, or propensity scores ``(n,)`` for
+        propensity score matching (sorted index).
+    T : np.ndarray
+        Binary treatment.
+    Y : np.ndarray
+        Outcome.
+    estimand : str
+        ``"att"`` (treated matched to controls), ``"atc"`` (controls
+        matched to treated) or ``"ate"`` (both, averaged over all matched
+        units).
+    k : int
+        Matches per unit; counterfactuals average their outcomes.
+    metric : str
+        Distance metric (see :class:`Matcher`). Mahalanobis uses the pooled
+        covariance ``np.cov(X.T)``; standardized uses the matched-to
+        group's standard deviations.
+    caliper : float, optional
+        Maximum match distance; units without a match are dropped.
+    replacement : bool
+        Match with replacement.
+    bias_correction : bool
+        Abadie-Imbens correction with a linear outcome model fit on the
+        matched-to group.
+    algorithm : str
+        Index type (see :class:`Matcher`).
+    n_jobs : int
+        Query threads.
+
+    Returns
+    -------
+    dict
+        estimate, se, n_matched, n_unmatched, match_rate, mean_distance,
+        max_distance, effects and matches (matched rows of ``X`` per unit,
+        ``-1`` if none; for the ATE, treated units first). With
+        ``bias_correction``, estimate and se are corrected and
+        estimate_uncorrected, se_uncorrected are added.
+    """
+    if estimand not in ("att", "atc", "ate"):
+        raise ValueError(f"Unknown estimand: {estimand}")
+    X = np.asarray(X, dtype=np.float64)
+    X = X.reshape(len(X), -1)
+    T, Y = np.asarray(T), np.asarray(Y, dtype=np.float64)
+    treated, control = np.flatnonzero(T == 1), np.flatnonzero(T == 0)
+    cov = np.cov(X.T) if metric == "mahalanobis" else None
+    matcher = Matcher(metric, algorithm, cov=cov, n_jobs=n_jobs)
+
+    sides = []
+    if estimand in ("att", "ate"):
+        sides.append(_match_side(X, Y, treated, control, 1.0, matcher, k, caliper,
+                                 replacement, bias_correction))
+    if estimand in ("atc", "ate"):
+        sides.append(_match_side(X, Y, control, treated, -1.0, matcher, k, caliper,
+                                 replacement, bias_correction))
+
+    def combine(key):
+        return np.concatenate([side[key] for side in sides])
+
+    effects = combine("effects")
+    distances = combine("distances")
+    n_units = sum(len(side["matched"]) for side in sides)
+    n_matched = len(effects)
+    result = {
+        "estimate": effects.mean(),
+        "se": effects.std() / np.sqrt(n_matched),
+        "n_matched": n_matched,
+        "n_unmatched": n_units - n_matched,
+        "match_rate": n_matched / n_units,
+        "mean_distance": distances[np.isfinite(distances)].mean(),
+        "max_distance": distances[np.isfinite(distances)].max(),
+        "effects": effects,
+        "matches": np.vstack([side["matches"] for side in sides]),
+    }
+    if bias_correction:
+        corrected = combine("corrected")
+        result.update(
+            estimate_uncorrected=result["estimate"],
+            se_uncorrected=result["se"],
+            estimate=corrected.mean(),
+            se=corrected.std() / np.sqrt(n_matched),
+            effects=corrected,
+        )
+    return result
@@ -0,0 +1,19 @@
+"""Panel data utilities for augmented."""
+
+from facure_augment.panel.fixed_effects import (
+    group_codes,
+    demean,
+    absorbed_ols,
+    cell_dummies,
+    feols,
+)
+from facure_augment.panel.event_study import EventStudy
+
+__all__ = [
+    "group_codes",
+    "demean",
+    "absorbed_ols",
+    "cell_dummies",
+    "feols",
+    "EventStudy",
+]
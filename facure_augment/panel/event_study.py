@@ -0,0 +1,323 @@
+"""
+Batched event studies on one demeaned design.
+
+``run_event_study`` and ``pretrends_test`` in
+13_difference_in_differences/03_parallel_trends build a formula with one
+dummy per relative period and refit OLS for every specification.
+:class:`EventStudy` instead builds the sparse indicator design for every
+observed (cohort, relative time) cell once, absorbs the fixed effects with
+:func:`facure_augment.panel.fixed_effects.demean`, and keeps the Gram
+matrix ``G = ZᵀWZ``. Demeaned cell dummies are dense, and the demeaned
+design is kept for the cluster scores, so the indicators stay sparse until
+they are demeaned one block of columns at a time into that design; peak
+memory is the demeaned design plus one block.
+
+Every specification is a linear recombination of those cells: choosing an
+event window, binning the endpoints, dropping reference periods and
+pooling or separating cohorts is a 0/1 matrix ``C``. Because demeaning is
+linear, the specification's Gram matrix is ``CᵀGC``. Fitting it is a
+Cholesky solve in the number of coefficients, independent of ``n``, and the
+pre-trend Wald test reuses the same factorization. Only clustered standard
+errors touch the data again (one pass for the cluster scores).
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from scipy import linalg, sparse, stats
+
+from facure_augment.panel.fixed_effects import (
+    _absorbed_rank,
+    _independent_columns,
+    demean,
+    group_codes,
+)
+
+__all__ = [
+    "EventStudy",
+]
+
+# Indicator columns densified and demeaned together
+_BLOCK = 64
+
+
+class EventStudy:
+    """
+    Event-study regressions sharing one absorbed design.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Panel data.
+    outcome : str
+        Outcome column.
+    rel_time : str
+        Periods relative to treatment; NaN for never-treated rows.
+    fe : str or sequence
+        Absorbed fixed effects (see :func:`~facure_augment.panel.group_codes`).
+    cohort : str, optional
+        Treatment cohort column, for cohort-specific effects.
+    regressors : sequence of str
+        Additional controls, included in every specification.
+    weights : str, optional
+        Weight column.
+    cluster : str, optional
+        Cluster column for CR1 standard errors.
+    tol, max_iter
+        Demeaning tolerance and sweep cap.
+
+    Examples
+    --------
+    >>> study = EventStudy(df, "y", "rel_time", fe=["unit", "period"], cluster="unit")
+    >>> fit = study.fit(window=(-4, 4), reference=-1)
+    >>> fit["coefficients"], fit["pretrend"]["p_value"]
+    >>> coefs, pretrends = study.fit_grid(windows=[(-4, 4), (-2, 2)], references=[-1, (-1, -4)])
+    """
+
+    def __init__(
+        self,
+        data: pd.DataFrame,
+        outcome: str,
+        rel_time: str,
+        fe: Union[str, Sequence] = ("unit", "period"),
+        cohort: Optional[str] = None,
+        regressors: Sequence[str] = (),
+        weights: Optional[str] = None,
+        cluster: Optional[str] = None,
+        tol: float = 1e-8,
+        max_iter: int = 10_000,
+    ):
+        n = len(data)
+        rel = data[rel_time].to_numpy(dtype=float)
+        rows = np.flatnonzero(np.isfinite(rel))
+        cohorts = data[cohort].to_numpy()[rows] if cohort is not None else np.zeros(len(rows))
+        cells = pd.DataFrame({"cohort": cohorts, "rel_time": rel[rows].astype(int)})
+        codes = cells.groupby(["cohort", "rel_time"], sort=True).ngroup().to_numpy()
+        self.cells_ = cells.drop_duplicates().sort_values(["cohort", "rel_time"]).reset_index(drop=True)
+        self.regressors = list(regressors)
+        self.by_cohort_available = cohort is not None
+
+        w = np.ones(n) if weights is None else data[weights].to_numpy(dtype=float)
+        D = sparse.csc_matrix((np.ones(len(rows)), (rows, codes)), shape=(n, len(self.cells_)))
+        dense = np.column_stack([data[outcome].to_numpy(dtype=float),
+                                 data[self.regressors].to_numpy(dtype=float)])
+        fe_codes = group_codes(data, fe)
+
+        # Outcome, cells, regressors; the cells are densified block by block
+        k = D.shape[1]
+        Zd = np.empty((n, 1 + k + len(self.regressors)))
+        Zd[:, [0, *range(1 + k, Zd.shape[1])]], info = demean(dense, fe_codes, w, tol, max_iter)
+        for start in range(0, k, _BLOCK):
+            stop = min(start + _BLOCK, k)
+            Zd[:, 1 + start:1 + stop], block = demean(D[:, start:stop], fe_codes, w, tol, max_iter)
+            info = {"n_iter": max(info["n_iter"], block["n_iter"]),
+                    "converged": info["converged"] and block["converged"]}
+
+        self.yd_, self.Zd_, self.w_ = Zd[:, 0], Zd[:, 1:], w
+        gram = np.zeros((Zd.shape[1], Zd.shape[1]))
+        for start in range(0, n, _BLOCK * 1024):
+            chunk = slice(start, start + _BLOCK * 1024)
+            gram += Zd[chunk].T @ (Zd[chunk] * w[chunk, None])
+        self.yy_, self.b_, self.G_ = gram[0, 0], gram[1:, 0], gram[1:, 1:]
+        self.cell_counts_ = np.bincount(codes, weights=w[rows], minlength=len(self.cells_))
+        # Weighted sums of squares of the design columns before demeaning
+        self.raw_ss_ = np.concatenate([self.cell_counts_, w @ dense[:, 1:] ** 2])
+        self.nobs_ = n
+        self.absorbed_ = _absorbed_rank(fe_codes)
+        self.n_iter_ = info["n_iter"]
+
+        self.clusters_ = None
+        if cluster is not None:
+            cluster_codes, labels = pd.factorize(data[cluster])
+            self.clusters_ = sparse.csr_matrix(
+                (np.ones(n), (cluster_codes, np.arange(n))), shape=(len(labels), n))
+
+    # -------------------------------------------------------------------------
+    # Specifications
+    # -------------------------------------------------------------------------
+
+    def _combination(
+        self,
+        window: Optional[Tuple[int, int]],
+        reference: Union[int, Sequence[int]],
+        bin_endpoints: bool,
+        by_cohort: bool,
+    ) -> Tuple[np.ndarray, pd.DataFrame]:
+        """0/1 map from design cells (plus controls) to specification columns."""
+        references = {reference} if np.isscalar(reference) else set(reference)
+        rel = self.cells_["rel_time"].to_numpy()
+        lo, hi = window if window is not None else (rel.min(), rel.max())
+        target = np.clip(rel, lo, hi) if bin_endpoints else rel
+        keep = (target >= lo) & (target <= hi) & ~np.isin(target, list(references))
+
+        keys = pd.DataFrame({"cohort": self.cells_["cohort"] if by_cohort else 0,
+                             "rel_time": target})[keep]
+        labels = keys.drop_duplicates().sort_values(["cohort", "rel_time"]).reset_index(drop=True)
+        column = labels.reset_index().merge(keys.reset_index(names="cell"),
+                                            on=["cohort", "rel_time"])
+        n_cells, n_controls = len(self.cells_), len(self.regressors)
+        C = np.zeros((n_cells + n_controls, len(labels) + n_controls))
+        C[column["cell"], column["index"]] = 1.0
+        C[n_cells:, len(labels):] = np.eye(n_controls)
+        if not by_cohort:
+            labels = labels.drop(columns="cohort")
+        return C, labels
+
+    def fit(
+        self,
+        window: Optional[Tuple[int, int]] = None,
+        reference: Union[int, Sequence[int]] = -1,
+        bin_endpoints: bool = True,
+        by_cohort: bool = False,
+        alpha: float = 0.05,
+    ) -> Dict[str, Any]:
+        """
+        Fit one specification from the shared Gram matrix.
+
+        Parameters
+        ----------
+        window : tuple of int, optional
+            ``(lo, hi)`` relative periods estimated; all observed if None.
+        reference : int or sequence of int
+            Omitted relative period(s), normalized to zero.
+        bin_endpoints : bool
+            Pool periods beyond the window into the endpoints (``lo``/``hi``);
+            if False they join the reference group.
+        by_cohort : bool
+            Separate coefficients per cohort (interacted, Sun & Abraham 2021).
+        alpha : float
+            Significance level for intervals.
+
+        Returns
+        -------
+        dict
+            coefficients (rel_time[, cohort], estimate, se, ci_lower,
+            ci_upper), controls, pretrend (joint Wald test that all
+            pre-period coefficients are zero: wald, f_stat, df_num, df_denom,
+            p_value), aggregate (cohort-share weighted effects when
+            ``by_cohort``), vcov, dropped (coefficients left NaN because
+            they are collinear with the fixed effects or earlier columns,
+            e.g. without never-treated units; ``rel_time``, ``(cohort,
+            rel_time)`` or control names) and df_resid.
+        """
+        if by_cohort and not self.by_cohort_available:
+            raise ValueError("by_cohort requires a cohort column.")
+        C, labels = self._combination(window, reference, bin_endpoints, by_cohort)
+        A = C.T @ self.G_ @ C
+
+        # Columns absorbed by the fixed effects or collinear with earlier ones
+        # (e.g. no never-treated units) are dropped, as in feols
+        keep = np.diag(A) > 1e-16 * np.maximum(self.raw_ss_ @ C, 1.0)
+        if keep.any():
+            columns = np.flatnonzero(keep)
+            keep[columns[~_independent_columns(A[np.ix_(columns, columns)])]] = False
+        if not keep.any():
+            raise ValueError("Every specification column is collinear with the fixed effects; "
+                             "omit another reference period.")
+        Ck = C[:, keep]
+        A = A[np.ix_(keep, keep)]
+        rhs = Ck.T @ self.b_
+        factor = linalg.cho_factor(A)
+        beta_k = linalg.cho_solve(factor, rhs)
+        A_inv = linalg.cho_solve(factor, np.eye(len(A)))
+
+        df_resid = self.nobs_ - len(beta_k) - self.absorbed_
+        if self.clusters_ is None:
+            rss = self.yy_ - beta_k @ rhs
+            vcov_k = rss / df_resid * A_inv
+            df_denom = df_resid
+        else:
+            X = self.Zd_ @ Ck
+            resid = self.yd_ - X @ beta_k
+            scores = self.clusters_ @ (X * (self.w_ * resid)[:, None])
+            n_clusters = scores.shape[0]
+            correction = n_clusters / (n_clusters - 1) * (self.nobs_ - 1) / df_resid
+            vcov_k = correction * A_inv @ (scores.T @ scores) @ A_inv
+            df_denom = n_clusters - 1
+        beta = np.full(len(keep), np.nan)
+        beta[keep] = beta_k
+        vcov = np.full((len(keep), len(keep)), np.nan)
+        vcov[np.ix_(keep, keep)] = vcov_k
+
+        n_event = len(labels)
+        se = np.sqrt(np.diag(vcov))
+        z = stats.t.ppf(1 - alpha / 2, df_denom)
+        coefficients = labels.assign(
+            estimate=beta[:n_event],
+            se=se[:n_event],
+            ci_lower=beta[:n_event] - z * se[:n_event],
+            ci_upper=beta[:n_event] + z * se[:n_event],
+        )
+        controls = pd.DataFrame({"estimate": beta[n_event:], "se": se[n_event:]},
+                                index=pd.Index(self.regressors, name="term"))
+
+        pre = np.flatnonzero((labels["rel_time"].to_numpy() < 0) & keep[:n_event])
+        pretrend = {"wald": np.nan, "f_stat": np.nan, "df_num": len(pre),
+                    "df_denom": df_denom, "p_value": np.nan}
+        if len(pre):
+            b_pre = beta[pre]
+            wald = float(b_pre @ np.linalg.solve(vcov[np.ix_(pre, pre)], b_pre))
+            pretrend.update(wald=wald, f_stat=wald / len(pre),
+                            p_value=float(stats.f.sf(wald / len(pre), len(pre), df_denom)))
+
+        names = list(labels.itertuples(index=False, name=None)) if by_cohort \
+            else labels["rel_time"].tolist()
+        result = {
+            "coefficients": coefficients,
+            "controls": controls,
+            "pretrend": pretrend,
+            "vcov": vcov,
+            "dropped": [name for name, kept in zip(names + self.regressors, keep) if not kept],
+            "df_resid": df_resid,
+        }
+        if by_cohort:
+            result["aggregate"] = self._aggregate(C, labels, beta, vcov, z)
+        return result
+
+    def _aggregate(self, C, labels, beta, vcov, z) -> pd.DataFrame:
+        """Average cohort effects per relative period, weighted by cohort shares."""
+        n_event = len(labels)
+        shares = self.cell_counts_ @ C[: len(self.cells_), :n_event]
+        rows = []
+        for rel, group in labels.groupby("rel_time"):
+            cells = group.index.to_numpy()
+            weights = shares[cells] / shares[cells].sum()
+            estimate = weights @ beta[cells]
+            se = np.sqrt(weights @ vcov[np.ix_(cells, cells)] @ weights)
+            rows.append((rel, estimate, se, estimate - z * se, estimate + z * se))
+        return pd.DataFrame(rows, columns=["rel_time", "estimate", "se", "ci_lower", "ci_upper"])
+
+    def fit_grid(
+        self,
+        windows: Sequence[Optional[Tuple[int, int]]] = (None,),
+        references: Sequence[Union[int, Sequence[int]]] = (-1,),
+        bin_endpoints: Sequence[bool] = (True,),
+        by_cohort: Sequence[bool] = (False,),
+        alpha: float = 0.05,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Fit every combination of windows, references, binning and pooling.
+
+        Returns
+        -------
+        coefficients : pd.DataFrame
+            Long table of event-time coefficients with the specification
+            columns (window, reference, bin_endpoints, by_cohort).
+        pretrends : pd.DataFrame
+            One pre-trend Wald test per specification.
+        """
+        coefficients, pretrends = [], []
+        for window in windows:
+            for reference in references:
+                for binned in bin_endpoints:
+                    for cohort_specific in by_cohort:
+                        spec = {"window": window, "reference": reference,
+                                "bin_endpoints": binned, "by_cohort": cohort_specific}
+                        fit = self.fit(window, reference, binned, cohort_specific, alpha)
+                        coefficients.append(fit["coefficients"].assign(**{
+                            key: [value] * len(fit["coefficients"]) for key, value in spec.items()}))
+                        pretrends.append({**spec, **fit["pretrend"]})
+        return pd.concat(coefficients, ignore_index=True), pd.DataFrame(pretrends)
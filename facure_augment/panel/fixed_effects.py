@@ -0,0 +1,410 @@
+"""
+Multi-way fixed effects by alternating projections.
+
+The 14_panel_fixed_effects and 24_did_saga notebooks fit TWFE with
+``smf.ols("y ~ treat + C(unit) + C(date)")`` (one dummy column per unit and
+date) or the two-way ``demean`` helper, which is exact only for balanced
+panels. Here fixed effects are absorbed instead of estimated: every column
+of the design is swept by group means of each FE dimension in turn
+(Gauss-Seidel / method of alternating projections) until the means
+vanish, and the coefficients come from the Frisch-Waugh-Lovell regression
+of the demeaned outcome on the demeaned regressors.
+
+Group means are sparse ``(G, n)`` operators on integer codes, so memory is
+``O(n k)`` for ``k`` regressors regardless of how many units or periods are
+absorbed. Weights and cluster-robust (CR1) standard errors are supported;
+degrees of freedom match the dummy-variable regression in statsmodels.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from scipy import sparse, stats
+
+__all__ = [
+    "group_codes",
+    "demean",
+    "absorbed_ols",
+    "cell_dummies",
+    "feols",
+]
+
+
+# =============================================================================
+# Demeaning
+# =============================================================================
+
+
+def group_codes(data: pd.DataFrame, fe: Union[str, Sequence]) -> List[np.ndarray]:
+    """
+    Integer codes ``0..G-1`` for each fixed-effect dimension.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Panel data.
+    fe : str or sequence
+        FE columns. A tuple of columns is one interacted dimension
+        (e.g. ``("unit", "month")`` for unit-by-month effects).
+
+    Returns
+    -------
+    list of np.ndarray
+        One code array per dimension.
+    """
+    dims = [fe] if isinstance(fe, str) else list(fe)
+    codes = []
+    for dim in dims:
+        if isinstance(dim, str):
+            codes.append(pd.factorize(data[dim])[0])
+        else:
+            codes.append(data.groupby(list(dim), sort=False).ngroup().to_numpy())
+    return codes
+
+
+def _group_operator(codes: np.ndarray, weights: np.ndarray) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    """Sparse weighted group-sum operator and group totals of the weights."""
+    n = len(codes)
+    n_groups = codes.max() + 1
+    D = sparse.csr_matrix((weights, (codes, np.arange(n))), shape=(n_groups, n))
+    return D, np.bincount(codes, weights=weights, minlength=n_groups)
+
+
+def demean(
+    X: np.ndarray,
+    codes: Sequence[np.ndarray],
+    weights: Optional[np.ndarray] = None,
+    tol: float = 1e-8,
+    max_iter: int = 10_000,
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Sweep out any number of fixed effects from the columns of ``X``.
+
+    Parameters
+    ----------
+    X : np.ndarray or sparse matrix
+        ``(n,)`` or ``(n, k)`` columns to demean.
+    codes : sequence of np.ndarray
+        Integer group codes per FE dimension (see :func:`group_codes`).
+    weights : np.ndarray, optional
+        Observation weights (weighted group means).
+    tol : float
+        Stop once no sweep removes a group mean larger than ``tol`` times
+        the column's scale.
+    max_iter : int
+        Maximum number of sweeps over all dimensions.
+
+    Returns
+    -------
+    Xd : np.ndarray
+        Demeaned columns, same shape as ``X`` (dense).
+    info : dict
+        n_iter (sweeps) and converged.
+
+    Examples
+    --------
+    >>> codes = group_codes(df, ["unit", "date"])
+    >>> yd, info = demean(df["installs"].to_numpy(), codes)
+    """
+    Xd = X.toarray() if sparse.issparse(X) else np.array(X, dtype=float)
+    squeeze = Xd.ndim == 1
+    Xd = Xd.reshape(len(Xd), -1)
+    n = len(Xd)
+    weights = np.ones(n) if weights is None else np.asarray(weights, dtype=float)
+    operators = [_group_operator(np.asarray(c), weights) for c in codes]
+    scale = np.maximum(np.abs(Xd).max(axis=0), 1.0)
+
+    n_iter, converged = 0, False
+    while n_iter < max_iter and not converged:
+        n_iter += 1
+        largest = np.zeros(Xd.shape[1])
+        for (D, totals), c in zip(operators, codes):
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means = np.nan_to_num((D @ Xd) / totals[:, None])
+            Xd -= means[c]
+            largest = np.maximum(largest, np.abs(means).max(axis=0))
+        # One dimension is exact after a single sweep
+        converged = len(codes) <= 1 or bool(np.all(largest <= tol * scale))
+
+    return (Xd[:, 0] if squeeze else Xd), {"n_iter": n_iter, "converged": converged}
+
+
+def _absorbed_rank(codes: Sequence[np.ndarray]) -> int:
+    """
+    Parameters absorbed by the fixed effects (rank of the dummy design).
+
+    Exact for one or two dimensions (two-way: ``G1 + G2 - components``);
+    for more dimensions assumes one redundancy per extra dimension.
+    """
+    sizes = [int(np.max(c)) + 1 for c in codes]
+    if len(codes) == 2:
+        from scipy.sparse.csgraph import connected_components
+
+        a, b = codes
+        graph = sparse.coo_matrix((np.ones(len(a)), (a, b + sizes[0])),
+                                  shape=(sum(sizes), sum(sizes)))
+        n_components = connected_components(graph, directed=False)[0]
+        return sum(sizes) - n_components
+    return sum(sizes) - max(len(codes) - 1, 0)
+
+
+def _independent_columns(A: np.ndarray, tol: float = 1e-10) -> np.ndarray:
+    """
+    Mask of a maximal set of linearly independent columns of a Gram matrix.
+
+    Columns are scanned in order and one is kept if its squared residual on
+    the kept columns (after scaling to unit norm) exceeds ``tol``, so later
+    columns are the ones dropped, as in the dummy-variable regressions.
+    """
+    d = np.sqrt(np.diag(A))
+    C = A / np.outer(d, d)
+    try:
+        L = np.linalg.cholesky(C)
+        if np.all(np.diag(L) ** 2 > tol):
+            return np.ones(len(C), dtype=bool)
+    except np.linalg.LinAlgError:
+        pass
+    keep = np.zeros(len(C), dtype=bool)
+    L = np.zeros((0, 0))
+    for j in range(len(C)):
+        v = C[keep, j]
+        l = np.linalg.solve(L, v) if len(v) else v
+        r2 = C[j, j] - l @ l
+        if r2 > tol:
+            m = len(L)
+            grown = np.zeros((m + 1, m + 1))
+            grown[:m, :m] = L
+            grown[m, :m] = l
+            grown[m, m] = np.sqrt(r2)
+            L = grown
+            keep[j] = True
+    return keep
+
+
+# =============================================================================
+# Estimation
+# =============================================================================
+
+
+def absorbed_ols(
+    y: np.ndarray,
+    X: np.ndarray,
+    codes: Sequence[np.ndarray],
+    weights: Optional[np.ndarray] = None,
+    clusters: Optional[np.ndarray] = None,
+    names: Optional[Sequence[str]] = None,
+    tol: float = 1e-8,
+    max_iter: int = 10_000,
+) -> Dict[str, Any]:
+    """
+    (Weighted) least squares with fixed effects absorbed.
+
+    Parameters
+    ----------
+    y : np.ndarray
+        Outcome ``(n,)``.
+    X : np.ndarray or sparse matrix
+        Regressors ``(n, k)``.
+    codes : sequence of np.ndarray
+        FE group codes (see :func:`group_codes`).
+    weights : np.ndarray, optional
+        Observation weights (WLS).
+    clusters : np.ndarray, optional
+        Cluster labels for CR1 standard errors; iid if None.
+    names : sequence of str, optional
+        Regressor names.
+    tol, max_iter
+        See :func:`demean`.
+
+    Returns
+    -------
+    dict
+        params, se (Series; NaN for regressors absorbed by the fixed
+        effects or collinear with earlier regressors after absorption),
+        vcov, table (estimate, se, t, p_value), dropped (names of the NaN
+        regressors), resid (of the demeaned regression), nobs, df_resid,
+        n_iter and converged.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    X = X if sparse.issparse(X) else np.asarray(X, dtype=float).reshape(n, -1)
+    k = X.shape[1]
+    if k == 0:
+        raise ValueError("No regressors: X needs at least one column")
+    names = list(names) if names is not None else [f"x{j}" for j in range(k)]
+    w = np.ones(n) if weights is None else np.asarray(weights, dtype=float)
+
+    dense = X.toarray() if sparse.issparse(X) else X
+    Z, info = demean(np.column_stack([y, dense]), codes, w, tol, max_iter)
+    yd, Xd = Z[:, 0], Z[:, 1:]
+
+    # Regressors that the fixed effects absorb, or that are collinear with
+    # earlier ones once demeaned, are dropped (NaN), not an error
+    before = np.sqrt(np.sum(w[:, None] * dense ** 2, axis=0))
+    after = np.sqrt(np.sum(w[:, None] * Xd ** 2, axis=0))
+    keep = after > 1e-8 * np.maximum(before, 1.0)
+    if keep.any():
+        columns = np.flatnonzero(keep)
+        A = Xd[:, columns].T @ (w[:, None] * Xd[:, columns])
+        keep[columns[~_independent_columns(A)]] = False
+    if not keep.any():
+        raise ValueError("Every regressor is absorbed by the fixed effects")
+    Xk = Xd[:, keep]
+
+    A = Xk.T @ (w[:, None] * Xk)
+    A_inv = np.linalg.inv(A)
+    beta = A_inv @ (Xk.T @ (w * yd))
+    resid = yd - Xk @ beta
+
+    n_params = keep.sum() + _absorbed_rank(codes)
+    df_resid = n - n_params
+    if clusters is None:
+        sigma2 = np.sum(w * resid ** 2) / df_resid
+        vcov = sigma2 * A_inv
+    else:
+        cluster_codes, cluster_labels = pd.factorize(pd.Series(clusters))
+        n_clusters = len(cluster_labels)
+        scores = np.zeros((n_clusters, keep.sum()))
+        np.add.at(scores, cluster_codes, Xk * (w * resid)[:, None])
+        meat = scores.T @ scores
+        correction = n_clusters / (n_clusters - 1) * (n - 1) / df_resid
+        vcov = correction * A_inv @ meat @ A_inv
+
+    params = np.full(k, np.nan)
+    params[keep] = beta
+    full_vcov = np.full((k, k), np.nan)
+    full_vcov[np.ix_(keep, keep)] = vcov
+    se = np.sqrt(np.diag(full_vcov))
+    t = params / se
+    dof = (n_clusters - 1) if clusters is not None else df_resid
+    table = pd.DataFrame({
+        "estimate": params,
+        "se": se,
+        "t": t,
+        "p_value": 2 * stats.t.sf(np.abs(t), dof),
+    }, index=pd.Index(names, name="term"))
+
+    return {
+        "params": table["estimate"],
+        "se": table["se"],
+        "vcov": pd.DataFrame(full_vcov, index=names, columns=names),
+        "table": table,
+        "dropped": [name for name, kept in zip(names, keep) if not kept],
+        "resid": resid,
+        "nobs": n,
+        "df_resid": df_resid,
+        "n_iter": info["n_iter"],
+        "converged": info["converged"],
+    }
+
+
+def cell_dummies(
+    data: pd.DataFrame,
+    cols: Sequence[str],
+    where: Optional[Union[str, np.ndarray]] = None,
+) -> Tuple[sparse.csc_matrix, List[str]]:
+    """
+    Sparse indicators for every observed cell of ``cols`` (where ``where``).
+
+    ``cell_dummies(df, ["cohort", "date"], where="treat")`` is the design of
+    ``treat:C(cohort):C(date)`` in the flexible TWFE notebook, restricted to
+    the non-empty cells (which also makes ``feature_eng`` unnecessary).
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Panel data.
+    cols : sequence of str
+        Columns whose combinations define the cells.
+    where : str or np.ndarray, optional
+        Column name or boolean mask; rows outside it get no dummy.
+
+    Returns
+    -------
+    X : scipy.sparse.csc_matrix
+        ``(n, n_cells)`` indicators.
+    names : list of str
+        Patsy-style names, e.g. ``"cohort[2021-06-01]:date[2021-06-03]"``.
+    """
+    cols = list(cols)
+    mask = np.ones(len(data), dtype=bool) if where is None else (
+        data[where].to_numpy().astype(bool) if isinstance(where, str) else np.asarray(where, bool))
+    rows = np.flatnonzero(mask)
+    cells = data.loc[mask, cols]
+    codes = cells.groupby(cols, sort=True).ngroup().to_numpy()
+    labels = cells.drop_duplicates().sort_values(cols)
+    X = sparse.csc_matrix((np.ones(len(rows)), (rows, codes)), shape=(len(data), len(labels)))
+    names = [":".join(f"{c}[{v}]" for c, v in zip(cols, row))
+             for row in labels.itertuples(index=False)]
+    return X, names
+
+
+def feols(
+    data: pd.DataFrame,
+    outcome: str,
+    regressors: Sequence[str] = (),
+    fe: Union[str, Sequence] = ("unit", "date"),
+    interact: Optional[Sequence[str]] = None,
+    where: Optional[str] = None,
+    weights: Optional[str] = None,
+    cluster: Optional[str] = None,
+    tol: float = 1e-8,
+    max_iter: int = 10_000,
+) -> Dict[str, Any]:
+    """
+    Fixed-effects regression on a DataFrame without dummy matrices.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Panel data.
+    outcome : str
+        Outcome column.
+    regressors : sequence of str
+        Numeric regressor columns.
+    fe : str or sequence
+        Absorbed fixed effects (see :func:`group_codes`).
+    interact, where : optional
+        Add :func:`cell_dummies` for ``interact`` restricted to ``where``,
+        e.g. ``interact=["cohort", "date"], where="treat"`` for the
+        cohort-by-date flexible TWFE.
+    weights : str, optional
+        Weight column.
+    cluster : str, optional
+        Cluster column for CR1 standard errors.
+    tol, max_iter
+        See :func:`demean`.
+
+    Returns
+    -------
+    dict
+        As :func:`absorbed_ols`.
+
+    Examples
+    --------
+    >>> fit = feols(df, "installs", ["treat"], fe=["unit", "date"], cluster="unit")
+    >>> fit["table"]
+    """
+    if not regressors and interact is None:
+        raise ValueError("feols needs regressors or interact cells; the fixed effects are absorbed")
+    blocks = [sparse.csc_matrix(data[list(regressors)].to_numpy(dtype=float))] if regressors else []
+    names = list(regressors)
+    if interact is not None:
+        dummies, dummy_names = cell_dummies(data, interact, where)
+        blocks.append(dummies)
+        names += [f"{where}:{name}" if where else name for name in dummy_names]
+    X = sparse.hstack(blocks, format="csc")
+
+    return absorbed_ols(
+        data[outcome].to_numpy(dtype=float),
+        X,
+        group_codes(data, fe),
+        weights=None if weights is None else data[weights].to_numpy(dtype=float),
+        clusters=None if cluster is None else data[cluster].to_numpy(),
+        names=names,
+        tol=tol,
+        max_iter=max_iter,
+    )
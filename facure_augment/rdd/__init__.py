@@ -0,0 +1,29 @@
+"""Regression discontinuity utilities for augmented."""
+
+from facure_augment.rdd.local_linear import (
+    triangular_kernel,
+    uniform_kernel,
+    rdd_local_linear,
+    rdd_sweep,
+    loo_bandwidth,
+    sensitivity_plot,
+)
+from facure_augment.rdd.density import (
+    RunningHistogram,
+    density_test,
+)
+from facure_augment.rdd.fuzzy import (
+    fuzzy_rdd,
+)
+
+__all__ = [
+    "triangular_kernel",
+    "uniform_kernel",
+    "rdd_local_linear",
+    "rdd_sweep",
+    "loo_bandwidth",
+    "sensitivity_plot",
+    "RunningHistogram",
+    "density_test",
+    "fuzzy_rdd",
+]
@@ -0,0 +1,439 @@
+"""
+McCrary density tests on a streamed histogram of the running variable.
+
+``simple_density_test`` (03_fuzzy_rdd) compares raw counts within a window
+on either side of one cutoff. The McCrary (2008) test instead smooths a
+fine histogram: with bins of width ``b`` whose edges include the cutoff and
+normalized heights ``Y_j = count_j / (n b)``, a triangular-kernel local
+polynomial is fit to the heights on each side, and
+
+    θ = ln f̂₊ - ln f̂₋,    se(θ) = sqrt(C_p / (n h) · (1/f̂₊ + 1/f̂₋))
+
+where ``C_p`` is the boundary variance constant of the kernel (``24/5``
+for the local linear fit).
+
+Only the histogram is needed, so :class:`RunningHistogram` bins each chunk
+with one ``np.bincount`` and grows its count vector as new bins appear;
+columns too large for pandas can be read in pieces. One fixed-width grid
+serves any number of cutoffs, tested together, as long as every cutoff is
+one of its edges: :func:`density_test` shrinks its default bin width until
+the spacings between cutoffs are whole numbers of bins, and cutoffs that
+still fall between edges are moved to the nearest one with a warning.
+
+Usage
+-----
+    hist = RunningHistogram(bin_width=0.5)
+    for chunk in pd.read_csv(path, usecols=["score"], chunksize=1_000_000):
+        hist.update(chunk["score"])
+    hist.density_test(cutoffs=np.arange(-10, 11))
+
+    density_test(df["minscore"], cutoffs=0, bin_width=1, bandwidth=10)
+"""
+
+from __future__ import annotations
+
+import warnings
+from typing import Any, Iterable, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from facure_augment.weighting.streaming import _as_frame
+
+__all__ = [
+    "RunningHistogram",
+    "density_test",
+]
+
+# Elements of the (cutoffs, bins) working matrices materialised at once
+MAX_CHUNK_ELEMENTS = 2 ** 24
+
+# Relative tolerance for values that sit on a bin edge up to rounding
+_EDGE_TOL = 1e-9
+
+
+def _variance_constant(order: int) -> float:
+    """
+    ``e₁ᵀ Γ⁻¹ Δ Γ⁻¹ e₁`` of a boundary local polynomial with triangular kernel.
+
+    ``Γ_jk = ∫₀¹ (1-u) u^(j+k) du`` and ``Δ_jk = ∫₀¹ (1-u)² u^(j+k) du``;
+    ``order=1`` gives McCrary's ``24/5``.
+    """
+    k = np.add.outer(np.arange(order + 1), np.arange(order + 1)).astype(np.float64)
+    gamma = 1 / ((k + 1) * (k + 2))
+    delta = 2 / ((k + 1) * (k + 2) * (k + 3))
+    row = np.linalg.solve(gamma, np.eye(order + 1)[0])
+    return float(row @ delta @ row)
+
+
+def _common_step(offsets: np.ndarray) -> float:
+    """
+    Largest step of which every offset is a whole multiple, up to rounding.
+
+    Euclid's algorithm on floats; offsets without a common step end in a
+    remainder at rounding level. Returns 0 when all offsets are zero.
+    """
+    offsets = np.abs(offsets)
+    tol = _EDGE_TOL * max(float(offsets.max(initial=0.0)), 1.0)
+    step = 0.0
+    for d in offsets[offsets > tol]:
+        a, b = max(step, d), min(step, d)
+        while b > tol:
+            r = a % b
+            a, b = b, (0.0 if min(r, b - r) <= tol else r)
+        step = a
+    return step
+
+
+class RunningHistogram:
+    """
+    Fixed-width histogram of a running variable, built one chunk at a time.
+
+    Bin ``k`` covers ``[origin + k·b, origin + (k+1)·b)``; counts are kept
+    from the lowest to the highest bin seen so far, including empty bins in
+    between.
+
+    Parameters
+    ----------
+    bin_width : float
+        Bin width ``b``.
+    origin : float
+        A bin edge (typically the cutoff, or any point of the cutoff grid).
+
+    Attributes
+    ----------
+    counts_ : np.ndarray
+        (Weighted) counts of bins ``start_`` to ``start_ + len(counts_) - 1``.
+    start_ : int
+        Index of the first stored bin.
+    """
+
+    def __init__(self, bin_width: float, origin: float = 0.0):
+        if not bin_width > 0:
+            raise ValueError("bin_width must be positive")
+        self.bin_width = float(bin_width)
+        self.origin = float(origin)
+        self.counts_ = np.zeros(0)
+        self.start_ = 0
+
+    @property
+    def n_rows(self) -> float:
+        return float(self.counts_.sum())
+
+    @property
+    def centers(self) -> np.ndarray:
+        """Bin midpoints."""
+        k = self.start_ + np.arange(len(self.counts_))
+        return self.origin + (k + 0.5) * self.bin_width
+
+    @property
+    def heights(self) -> np.ndarray:
+        """Normalized heights ``count / (n b)``, integrating to one."""
+        return self.counts_ / (self.n_rows * self.bin_width)
+
+    def _add(self, counts: np.ndarray, start: int) -> None:
+        """Add a count vector whose first bin is ``start``."""
+        if len(self.counts_) == 0:
+            self.counts_, self.start_ = counts.astype(np.float64), int(start)
+            return
+        lo = min(self.start_, start)
+        hi = max(self.start_ + len(self.counts_), start + len(counts))
+        if lo != self.start_ or hi != self.start_ + len(self.counts_):
+            grown = np.zeros(hi - lo)
+            grown[self.start_ - lo:self.start_ - lo + len(self.counts_)] = self.counts_
+            self.counts_, self.start_ = grown, lo
+        self.counts_[start - lo:start - lo + len(counts)] += counts
+
+    def update(self, x, weights=None) -> "RunningHistogram":
+        """
+        Add one chunk.
+
+        Parameters
+        ----------
+        x : array-like (b,)
+            Running variable; non-finite values are skipped.
+        weights : array-like (b,), optional
+            Frequency weights (e.g. person-years).
+
+        Returns
+        -------
+        RunningHistogram
+            ``self`` (for chaining).
+        """
+        x = np.asarray(x, dtype=np.float64)
+        keep = np.isfinite(x)
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)[keep]
+        u = (x[keep] - self.origin) / self.bin_width
+        if len(u) == 0:
+            return self
+        k = np.floor(u + _EDGE_TOL * np.maximum(1, np.abs(u))).astype(np.int64)
+        lo = int(k.min())
+        self._add(np.bincount(k - lo, weights=weights), lo)
+        return self
+
+    def merge(self, other: "RunningHistogram") -> "RunningHistogram":
+        """
+        Combine with the histogram of another shard (same grid).
+
+        Returns
+        -------
+        RunningHistogram
+            A new histogram holding the counts of both.
+        """
+        if other.bin_width != self.bin_width or other.origin != self.origin:
+            raise ValueError("Cannot merge histograms on different bin grids")
+        merged = RunningHistogram(self.bin_width, self.origin)
+        for part in (self, other):
+            if len(part.counts_):
+                merged._add(part.counts_, part.start_)
+        return merged
+
+    @classmethod
+    def from_chunks(
+        cls,
+        chunks: Iterable[Any],
+        bin_width: float,
+        origin: float = 0.0,
+        column: Optional[str] = None,
+        weights: Optional[str] = None,
+    ) -> "RunningHistogram":
+        """
+        Build a histogram in a single pass over chunks.
+
+        Parameters
+        ----------
+        chunks : iterable
+            Arrays of the running variable, or DataFrames (or Arrow tables)
+            when ``column`` is given, e.g. ``pd.read_csv(..., chunksize=...)``.
+        bin_width, origin : float
+            Bin grid.
+        column : str, optional
+            Running-variable column of frame chunks.
+        weights : str, optional
+            Frequency-weight column of frame chunks.
+
+        Returns
+        -------
+        RunningHistogram
+            The populated histogram.
+        """
+        hist = cls(bin_width, origin)
+        for chunk in chunks:
+            if column is None:
+                hist.update(chunk)
+                continue
+            df = _as_frame(chunk)
+            hist.update(df[column], df[weights] if weights is not None else None)
+        return hist
+
+    # -------------------------------------------------------------------------
+    # Testing
+    # -------------------------------------------------------------------------
+
+    def _edges(self, cutoffs: np.ndarray) -> np.ndarray:
+        """Index of the bin edge nearest to each cutoff."""
+        return np.round((cutoffs - self.origin) / self.bin_width).astype(np.int64)
+
+    def _side_bins(self, edge: np.ndarray, m: int, sign: int) -> np.ndarray:
+        """
+        Stored-bin positions of the ``m`` bins stepping away from each edge
+        (``-1`` outside the histogram), shape ``(cutoffs, m)``.
+        """
+        step = np.arange(m)
+        k = edge[:, None] + step if sign > 0 else edge[:, None] - 1 - step
+        pos = k - self.start_
+        return np.where((pos >= 0) & (pos < len(self.counts_)), pos, -1)
+
+    def rule_of_thumb_bandwidth(self, cutoffs: Union[float, Sequence[float]]) -> np.ndarray:
+        """
+        McCrary's bandwidth for each cutoff.
+
+        A quartic is fit to the heights on each side; each side gives
+        ``3.348 (σ̃² (range) / Σ f̃''(X_j)²)^(1/5)`` and the two are averaged.
+
+        Parameters
+        ----------
+        cutoffs : float or sequence of float
+            Cutoffs (rounded to the nearest bin edge).
+
+        Returns
+        -------
+        np.ndarray
+            Bandwidth per cutoff (NaN with fewer than six bins on a side).
+        """
+        edges = self._edges(np.atleast_1d(np.asarray(cutoffs, dtype=np.float64)))
+        centers, heights = self.centers, self.heights
+        out = np.full(len(edges), np.nan)
+        for i, edge in enumerate(edges):
+            split = edge - self.start_
+            sides = []
+            cutoff = self.origin + edge * self.bin_width
+            for rows, far in ((slice(0, max(split, 0)), centers[0]),
+                              (slice(max(split, 0), None), centers[-1])):
+                x, y = centers[rows], heights[rows]
+                if len(x) < 6:
+                    break
+                coef = np.polyfit(x - cutoff, y, 4)
+                resid = y - np.polyval(coef, x - cutoff)
+                curvature = np.polyval(np.polyder(coef, 2), x - cutoff)
+                mse = resid @ resid / (len(x) - 5)
+                sides.append(3.348 * (mse * abs(far - cutoff) / (curvature @ curvature)) ** 0.2)
+            if len(sides) == 2:
+                out[i] = 0.5 * (sides[0] + sides[1])
+        return out
+
+    def density_test(
+        self,
+        cutoffs: Union[float, Sequence[float]] = 0.0,
+        bandwidth: Optional[Union[float, Sequence[float]]] = None,
+        order: int = 1,
+        alpha: float = 0.05,
+    ) -> pd.DataFrame:
+        """
+        McCrary test of a density discontinuity at every cutoff.
+
+        Parameters
+        ----------
+        cutoffs : float or sequence of float
+            Candidate cutoffs, each rounded to the nearest bin edge (with a
+            warning when that moves it).
+        bandwidth : float or sequence of float, optional
+            Kernel bandwidth, shared or per cutoff (default:
+            :meth:`rule_of_thumb_bandwidth`).
+        order : int
+            Order of the local polynomials (1 is McCrary's local linear).
+        alpha : float
+            Significance level of the interval for ``θ``.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per cutoff: cutoff, edge (the bin edge used), bandwidth,
+            n_below and n_above (counts in the bins within the bandwidth),
+            f_below, f_above, ratio (``f̂₊ / f̂₋``), theta (log difference),
+            se, ci_lower, ci_upper, z and pvalue.
+        """
+        cutoffs = np.atleast_1d(np.asarray(cutoffs, dtype=np.float64))
+        edges = self._edges(cutoffs)
+        b = self.bin_width
+        grid = self.origin + edges * b
+        moved = np.abs(grid - cutoffs) > 1e-6 * b
+        if moved.any():
+            warnings.warn(
+                f"Cutoffs {cutoffs[moved].tolist()} are not bin edges and are tested at the "
+                f"nearest bin edge {grid[moved].tolist()}; choose a bin width and origin "
+                "that put every cutoff on an edge",
+                UserWarning,
+                stacklevel=2,
+            )
+        if bandwidth is None:
+            h = self.rule_of_thumb_bandwidth(cutoffs)
+        else:
+            h = np.broadcast_to(np.asarray(bandwidth, dtype=np.float64), cutoffs.shape).copy()
+            if np.any(h <= 0):
+                raise ValueError("Bandwidths must be positive")
+        n = self.n_rows
+        heights = np.append(self.heights, 0.0)          # position -1 reads a zero
+        counts = np.append(self.counts_, 0.0)
+        finite = np.isfinite(h)
+        m_max = int(np.ceil(np.max(h[finite], initial=b) / b - 0.5))
+        step = (np.arange(m_max) + 0.5) * b
+        powers = np.arange(order + 1)
+
+        f = np.full((2, len(cutoffs)), np.nan)
+        in_window = np.zeros((2, len(cutoffs)))
+        block = max(1, MAX_CHUNK_ELEMENTS // max(m_max * (order + 1) ** 2, 1))
+        for start in range(0, len(cutoffs), block):
+            rows = slice(start, start + block)
+            u = step / np.where(finite[rows], h[rows], b)[:, None]
+            kernel = np.where(finite[rows, None], np.maximum(1 - u, 0), 0.0)
+            z = u[:, :, None] ** powers                                        # (c, m, p+1)
+            for s, sign in enumerate((-1, 1)):
+                pos = self._side_bins(edges[rows], m_max, sign)
+                K = np.where(pos >= 0, kernel, 0.0)
+                in_window[s, rows] = np.sum(np.where(kernel > 0, counts[pos], 0.0), axis=1)
+                G = np.einsum("cm,cmj,cmk->cjk", K, z, z)
+                g = np.einsum("cm,cmj,cm->cj", K, z, heights[pos])
+                # Sides with no more bins than coefficients cannot be fit
+                ok = np.sum(K > 0, axis=1) > order
+                G[~ok] = np.eye(order + 1)
+                f[s, rows] = np.where(ok, np.linalg.solve(G, g[:, :, None])[:, 0, 0], np.nan)
+
+        f_below, f_above = f
+        with np.errstate(divide="ignore", invalid="ignore"):
+            theta = np.log(f_above) - np.log(f_below)
+            se = np.sqrt(_variance_constant(order) / (n * h) * (1 / f_above + 1 / f_below))
+            zstat = theta / se
+        z_crit = stats.norm.ppf(1 - alpha / 2)
+        return pd.DataFrame({
+            "cutoff": cutoffs,
+            "edge": grid,
+            "bandwidth": h,
+            "n_below": in_window[0],
+            "n_above": in_window[1],
+            "f_below": f_below,
+            "f_above": f_above,
+            "ratio": f_above / f_below,
+            "theta": theta,
+            "se": se,
+            "ci_lower": theta - z_crit * se,
+            "ci_upper": theta + z_crit * se,
+            "z": zstat,
+            "pvalue": 2 * stats.norm.sf(np.abs(zstat)),
+        })
+
+
+def density_test(
+    x: np.ndarray,
+    cutoffs: Union[float, Sequence[float]] = 0.0,
+    bin_width: Optional[float] = None,
+    bandwidth: Optional[Union[float, Sequence[float]]] = None,
+    order: int = 1,
+    weights: Optional[np.ndarray] = None,
+    alpha: float = 0.05,
+) -> pd.DataFrame:
+    """
+    McCrary density test of an in-memory running variable.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Running variable.
+    cutoffs : float or sequence of float
+        Candidate cutoffs; the bin grid has an edge at the first one.
+    bin_width : float, optional
+        Bin width (default: McCrary's ``2 σ̂ n^(-1/2)``, shrunk to the
+        largest width that puts every cutoff on a bin edge). Cutoffs off
+        the grid of an explicit width are moved to the nearest edge.
+    bandwidth : float or sequence of float, optional
+        Kernel bandwidth, shared or per cutoff (default: rule of thumb).
+    order : int
+        Order of the local polynomials.
+    weights : np.ndarray, optional
+        Frequency weights.
+    alpha : float
+        Significance level.
+
+    Returns
+    -------
+    pd.DataFrame
+        See :meth:`RunningHistogram.density_test`.
+
+    Examples
+    --------
+    >>> density_test(sheepskin["minscore"], cutoffs=0, bin_width=1, bandwidth=10)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    points = np.atleast_1d(np.asarray(cutoffs, dtype=np.float64))
+    origin = float(points[0])
+    if bin_width is None:
+        finite = x[np.isfinite(x)]
+        bin_width = 2 * finite.std(ddof=1) / np.sqrt(len(finite))
+        # Cutoffs without a common step (beyond 100 bins) keep the default grid
+        step = _common_step(points - origin)
+        if step > bin_width / 100:
+            bin_width = step / np.ceil(step / bin_width)
+    hist = RunningHistogram(bin_width, origin).update(x, weights)
+    return hist.density_test(cutoffs, bandwidth, order, alpha)
@@ -0,0 +1,186 @@
+"""
+Fuzzy RDD Wald estimates for many outcomes, cutoffs and bandwidths.
+
+The 03_fuzzy_rdd notebook fits the first stage ``D ~ R * above`` and the
+reduced form ``Y ~ R * above`` as separate regressions and combines the two
+jumps into the Wald ratio ``τ = RF / FS``. Both are local lines on each
+side of the cutoff with the same kernel weights, so stacking the take-up
+and every outcome as columns ``[D, Y₁, …, Y_m]`` gives all jumps from one
+set of kernel-weighted moments per (cutoff, bandwidth), built from the
+prefix sums of :mod:`facure_augment.rdd.local_linear`. The delta-method
+variance
+
+    Var(τ) ≈ (Var(RF) - 2τ Cov(RF, FS) + τ² Var(FS)) / FS²
+
+uses the classical WLS variances of the two jumps and their covariance
+from the residual cross products ``Σ w e_Y e_D``. The notebook's version
+drops the covariance term.
+
+Cutoffs are independent: each worker receives only the units within the
+largest bandwidth of its cutoff.
+
+Usage
+-----
+    fuzzy_rdd(df["minscore"], df[["avgearnings", "employed"]], df["receivehsd"],
+              cutoffs=[0, 10], bandwidths=np.linspace(5, 20, 16), n_jobs=2)
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from facure_augment.rdd.local_linear import _fit_grid
+
+__all__ = [
+    "fuzzy_rdd",
+]
+
+
+# =============================================================================
+# Per-Cutoff Moments
+# =============================================================================
+
+
+def _cutoff_jumps(
+    x: np.ndarray,
+    Z: np.ndarray,
+    cutoff: float,
+    bandwidths: np.ndarray,
+    kernel: str,
+) -> Dict[str, np.ndarray]:
+    """
+    Jumps of every column of ``Z = [D, Y₁, …]`` at one cutoff, per bandwidth.
+
+    Returns jump ``(H, 1 + m)``, var ``(H, 1 + m)``, cov ``(H, 1 + m)``
+    (with the first column) and n ``(H,)``.
+    """
+    (below, above), _, _, _ = _fit_grid(x, Z, bandwidths, cutoff, kernel, cross=True)
+    n = below["n"] + above["n"]
+    jump = above["intercept"] - below["intercept"]
+    factor = (below["inv"][0] + above["inv"][0])[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dof = np.where(n > 4, n - 4, np.nan)[:, None]
+        var = (below["ssr"] + above["ssr"]) / dof * factor
+        cov = (below["scp"] + above["scp"]) / dof * factor
+    return {"jump": jump, "var": var, "cov": cov, "n": n}
+
+
+def _window(x: np.ndarray, cutoff: float, reach: float) -> np.ndarray:
+    """Units that can receive positive weight at some bandwidth ``≤ reach``."""
+    return np.flatnonzero(np.abs(x - cutoff) <= reach)
+
+
+# =============================================================================
+# Estimation
+# =============================================================================
+
+
+def fuzzy_rdd(
+    x: np.ndarray,
+    Y: Union[np.ndarray, pd.Series, pd.DataFrame],
+    D: np.ndarray,
+    cutoffs: Union[float, Sequence[float]] = 0.0,
+    bandwidths: Union[float, Sequence[float]] = np.inf,
+    kernel: str = "triangular",
+    alpha: float = 0.05,
+    n_jobs: int = 1,
+) -> pd.DataFrame:
+    """
+    Fuzzy RDD (Wald) estimates for every outcome, cutoff and bandwidth.
+
+    At each cutoff ``c`` and bandwidth ``h`` the first stage is the jump in
+    take-up ``D`` and the reduced form the jump in each outcome, both from
+    kernel-weighted lines ``~ (x - c) * 1[x ≥ c]`` as in
+    :func:`~facure_augment.rdd.rdd_sweep`. With ``kernel='uniform'`` and an
+    infinite bandwidth these are the notebook's OLS fits on all units.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Running variable.
+    Y : np.ndarray, pd.Series or pd.DataFrame
+        Outcomes ``(n,)`` or ``(n, m)``.
+    D : np.ndarray
+        Treatment take-up (binary or a dose).
+    cutoffs : float or sequence of float
+        Cutoffs, each analysed on its own.
+    bandwidths : float or sequence of float
+        Bandwidths shared by all cutoffs (default: all units).
+    kernel : {'triangular', 'uniform'}
+        Kernel of the weights.
+    alpha : float
+        Significance level of the intervals.
+    n_jobs : int
+        Worker processes; cutoffs are distributed across them.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per (cutoff, bandwidth, outcome): cutoff, bandwidth,
+        outcome, estimate (Wald ratio), se (delta method), ci_lower,
+        ci_upper, first_stage, first_stage_se, first_stage_f,
+        reduced_form, reduced_form_se and n_effective.
+
+    Examples
+    --------
+    >>> fuzzy_rdd(sheepskin["minscore"], sheepskin["avgearnings"],
+    ...           sheepskin["receivehsd"], kernel="uniform")
+    """
+    if isinstance(Y, pd.DataFrame):
+        names = [str(c) for c in Y.columns]
+    elif isinstance(Y, pd.Series) and Y.name is not None:
+        names = [str(Y.name)]
+    else:
+        names = [f"y{j}" for j in range(np.asarray(Y).reshape(len(Y), -1).shape[1])]
+    x = np.asarray(x, dtype=np.float64)
+    Z = np.column_stack([np.asarray(D, dtype=np.float64),
+                         np.asarray(Y, dtype=np.float64).reshape(len(x), -1)])
+    cutoffs = np.atleast_1d(np.asarray(cutoffs, dtype=np.float64))
+    h = np.atleast_1d(np.asarray(bandwidths, dtype=np.float64))
+    reach = h.max()
+
+    tasks = []
+    for c in cutoffs:
+        units = _window(x, c, reach)
+        tasks.append((x[units], Z[units], c, h, kernel))
+    if n_jobs == 1 or len(tasks) <= 1:
+        results = [_cutoff_jumps(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [executor.submit(_cutoff_jumps, *task) for task in tasks]
+            results = [f.result() for f in futures]
+
+    z = stats.norm.ppf(1 - alpha / 2)
+    frames: List[pd.DataFrame] = []
+    for c, r in zip(cutoffs, results):
+        fs, rf = r["jump"][:, :1], r["jump"][:, 1:]
+        var_fs, var_rf, cov = r["var"][:, :1], r["var"][:, 1:], r["cov"][:, 1:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            estimate = rf / fs
+            var = (var_rf - 2 * estimate * cov + estimate ** 2 * var_fs) / fs ** 2
+            se = np.sqrt(np.maximum(var, 0))
+            fs_se = np.sqrt(var_fs)
+        shape = estimate.shape
+        frames.append(pd.DataFrame({
+            "cutoff": c,
+            "bandwidth": np.repeat(h, len(names)),
+            "outcome": np.tile(names, len(h)),
+            "estimate": estimate.ravel(),
+            "se": se.ravel(),
+            "ci_lower": (estimate - z * se).ravel(),
+            "ci_upper": (estimate + z * se).ravel(),
+            "first_stage": np.broadcast_to(fs, shape).ravel(),
+            "first_stage_se": np.broadcast_to(fs_se, shape).ravel(),
+            "first_stage_f": np.broadcast_to((fs / fs_se) ** 2, shape).ravel(),
+            "reduced_form": rf.ravel(),
+            "reduced_form_se": np.sqrt(var_rf).ravel(),
+            "n_effective": np.repeat(r["n"], len(names)).astype(np.int64),
+        }))
+    table = pd.concat(frames, ignore_index=True)
+    table.attrs["kernel"] = kernel
+    return table
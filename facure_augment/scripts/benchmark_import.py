@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Benchmark cold-start import time of facure_augment.common.
+
+Each measurement runs in a fresh interpreter so nothing is cached in
+``sys.modules``. Compares:
+
+- eager:  the libraries ``common`` used to import at module load
+- common: ``from facure_augment.common import *`` (lazy proxies)
+- loaders: ``from facure_augment.common import load_facure_data`` plus one load
+- first plot: star import followed by creating a Tufte figure
+
+Usage:
+    python facure_augment/scripts/benchmark_import.py
+    python facure_augment/scripts/benchmark_import.py --repeats 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+SCENARIOS = {
+    "eager (previous common.py)": (
+        "import numpy, pandas, matplotlib.pyplot, seaborn, statsmodels.api, "
+        "statsmodels.formula.api; from scipy import stats; "
+        "from scipy.optimize import minimize; import facure_augment.viz.tufte"
+    ),
+    "from common import *": "from facure_augment.common import *",
+    "data loaders only": (
+        "from facure_augment.common import load_facure_data; "
+        "load_facure_data('online_classroom.csv')"
+    ),
+    "star import + first figure": (
+        "from facure_augment.common import *; "
+        "import matplotlib; matplotlib.use('Agg'); create_tufte_figure()"
+    ),
+}
+
+
+def time_snippet(code: str) -> float:
+    """
+    Wall-clock seconds to run ``code`` in a fresh interpreter.
+
+    Parameters
+    ----------
+    code : str
+        Python source passed to ``python -c``.
+
+    Returns
+    -------
+    float
+        Elapsed seconds, including interpreter startup.
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True)
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    """
+    Main entry point.
+
+    Returns
+    -------
+    int
+        Exit code.
+    """
+    parser = argparse.ArgumentParser(description="Cold-start import benchmark.")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per scenario (default: 5)")
+    args = parser.parse_args()
+
+    baseline = time_snippet("pass")
+    print(f"Interpreter startup: {baseline:.3f}s (subtracted below)\n")
+    print(f"{'Scenario':<32} {'median':>8} {'min':>8}")
+    print("-" * 50)
+    for name, code in SCENARIOS.items():
+        timings = [time_snippet(code) - baseline for _ in range(args.repeats)]
+        print(f"{name:<32} {statistics.median(timings):>7.3f}s {min(timings):>7.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Benchmark the matching engine against the notebook matching functions.
+
+Simulates ``--n`` treated and ``--n`` control units with ``--dims``
+covariates and a logistic propensity score, and times:
+
+- ``ps_matching`` (11_propensity_score): Python loop over treated units,
+  one full distance vector each (timed on ``--notebook-n`` units)
+- ``knn_matching_att`` (10_matching): scikit-learn ``NearestNeighbors``
+  (timed on ``--notebook-n`` units)
+- ``matching_estimate``: sorted propensity index and KD-tree (Euclidean and
+  Mahalanobis), with and without replacement, on all units
+
+On the ``--notebook-n`` subsample the estimates are also compared.
+
+Usage:
+    python facure_augment/scripts/benchmark_matching.py
+    python facure_augment/scripts/benchmark_matching.py --n 100000 --n-jobs 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+
+from facure_augment.matching import matching_estimate
+
+
+def ps_matching(ps, T, Y):
+    """``ps_matching`` from 11_propensity_score (with replacement, no caliper)."""
+    treated_idx, control_idx = np.where(T == 1)[0], np.where(T == 0)[0]
+    ps_control, Y_control = ps[control_idx], Y[control_idx]
+    matched_effects = []
+    for ps_t, y_t in zip(ps[treated_idx], Y[treated_idx]):
+        best_idx = np.argmin(np.abs(ps_control - ps_t))
+        matched_effects.append(y_t - Y_control[best_idx])
+    return np.mean(matched_effects)
+
+
+def knn_matching_att(X_treated, X_control, Y_treated, Y_control, K=1):
+    """``knn_matching_att`` from 10_matching."""
+    nn = NearestNeighbors(n_neighbors=K, metric="euclidean").fit(X_control)
+    _, indices = nn.kneighbors(X_treated)
+    return (Y_treated - Y_control[indices].mean(axis=1)).mean()
+
+
+def main() -> int:
+    """
+    Main entry point.
+
+    Returns
+    -------
+    int
+        Exit code.
+    """
+    parser = argparse.ArgumentParser(description="Matching engine benchmark.")
+    parser.add_argument("--n", type=int, default=1_000_000, help="Units per arm (default: 1000000)")
+    parser.add_argument("--dims", type=int, default=4, help="Covariates (default: 4)")
+    parser.add_argument("--notebook-n", type=int, default=20_000,
+                        help="Units per arm for the notebook functions (default: 20000)")
+    parser.add_argument("--n-jobs", type=int, default=1, help="Query threads (default: 1)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    X = rng.normal(size=(2 * args.n, args.dims))
+    T = np.repeat([1, 0], args.n)
+    ps = 1 / (1 + np.exp(-0.3 * X[:, 0]))
+    Y = X.sum(axis=1) + 2.0 * T + rng.normal(size=2 * args.n)
+    print(f"Data: {args.n:,} treated x {args.n:,} controls, {args.dims} covariates\n")
+
+    sub = np.r_[:args.notebook_n, args.n:args.n + args.notebook_n]
+    print(f"{'Notebook (' + format(args.notebook_n, ',') + ' per arm)':<36} {'time':>9} "
+          f"{'engine':>9} {'|diff|':>9}")
+    print("-" * 66)
+    for name, notebook, engine in [
+        ("ps_matching", lambda: ps_matching(ps[sub], T[sub], Y[sub]),
+         lambda: matching_estimate(ps[sub], T[sub], Y[sub])),
+        ("knn_matching_att", lambda: knn_matching_att(X[sub][T[sub] == 1], X[sub][T[sub] == 0],
+                                                      Y[sub][T[sub] == 1], Y[sub][T[sub] == 0]),
+         lambda: matching_estimate(X[sub], T[sub], Y[sub], n_jobs=args.n_jobs)),
+    ]:
+        start = time.perf_counter()
+        expected = notebook()
+        notebook_time = time.perf_counter() - start
+        start = time.perf_counter()
+        result = engine()
+        engine_time = time.perf_counter() - start
+        print(f"{name:<36} {notebook_time:>8.2f}s {engine_time:>8.3f}s "
+              f"{abs(result['estimate'] - expected):>9.1e}")
+
+    print(f"\n{'Engine (all units)':<36} {'time':>9} {'ATT':>9}")
+    print("-" * 56)
+    for name, kwargs in [
+        ("propensity, sorted index", dict(X=ps)),
+        ("propensity, caliper 1e-4", dict(X=ps, caliper=1e-4)),
+        ("propensity, no replacement", dict(X=ps, replacement=False)),
+        ("euclidean, KD-tree", dict(X=X)),
+        ("mahalanobis, KD-tree", dict(X=X, metric="mahalanobis")),
+        ("euclidean, KD-tree, k=4", dict(X=X, k=4)),
+        ("euclidean, no replacement", dict(X=X, replacement=False)),
+    ]:
+        start = time.perf_counter()
+        result = matching_estimate(T=T, Y=Y, n_jobs=args.n_jobs, **kwargs)
+        print(f"{name:<36} {time.perf_counter() - start:>8.2f}s {result['estimate']:>9.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""
+Benchmark the RDD bandwidth sweep and fuzzy RDD against the notebook estimators.
+
+Simulates ``--n`` units with a running variable on [-1, 1] and a jump of
+0.5 at zero, and times:
+
+- ``rdd_local_linear`` (02_rdd_estimation): one statsmodels WLS fit per
+  bandwidth (timed on ``--notebook-n`` units and a few bandwidths)
+- ``rdd_sweep``: one sort per side and prefix sums, ``--bandwidths``
+  bandwidths on all units, for both kernels
+- ``loo_bandwidth``: hat-matrix leave-one-out criterion
+- the fuzzy RDD of 03_fuzzy_rdd (first stage and reduced form as separate
+  OLS fits per outcome) against ``fuzzy_rdd`` with ``--outcomes`` outcomes,
+  and ``fuzzy_rdd`` at three cutoffs on all units
+
+On the ``--notebook-n`` subsample the estimates are also compared.
+
+Usage:
+    python facure_augment/scripts/benchmark_rdd.py
+    python facure_augment/scripts/benchmark_rdd.py --n 1000000 --bandwidths 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import statsmodels.formula.api as smf
+
+from facure_augment.rdd import (
+    fuzzy_rdd,
+    loo_bandwidth,
+    rdd_sweep,
+    triangular_kernel,
+    uniform_kernel,
+)
+
+
+def rdd_local_linear(data, outcome, bandwidth, kernel="triangular"):
+    """``rdd_local_linear`` from 02_rdd_estimation (estimate only)."""
+    if kernel == "triangular":
+        weights = triangular_kernel(data["age_centered"], bandwidth)
+    else:
+        weights = uniform_kernel(data["age_centered"], bandwidth)
+    in_bandwidth = weights > 0
+    model = smf.wls(f"{outcome} ~ age_centered * above_21", data=data[in_bandwidth],
+                    weights=weights[in_bandwidth]).fit()
+    return model.params["above_21"]
+
+
+def notebook_fuzzy_rdd(data, outcome):
+    """Wald ratio of the first stage and reduced form fits in 03_fuzzy_rdd."""
+    first_stage = smf.ols("d ~ age_centered * above_21", data=data).fit()
+    reduced_form = smf.ols(f"{outcome} ~ age_centered * above_21", data=data).fit()
+    return reduced_form.params["above_21"] / first_stage.params["above_21"]
+
+
+def main() -> int:
+    """
+    Main entry point.
+
+    Returns
+    -------
+    int
+        Exit code.
+    """
+    parser = argparse.ArgumentParser(description="RDD bandwidth sweep and fuzzy RDD benchmark.")
+    parser.add_argument("--n", type=int, default=10_000_000, help="Units (default: 10000000)")
+    parser.add_argument("--bandwidths", type=int, default=200,
+                        help="Bandwidths in the sweep (default: 200)")
+    parser.add_argument("--notebook-n", type=int, default=1_000_000,
+                        help="Units for the notebook function (default: 1000000)")
+    parser.add_argument("--outcomes", type=int, default=5, help="Fuzzy RDD outcomes (default: 5)")
+    parser.add_argument("--n-jobs", type=int, default=1, help="Fuzzy RDD workers (default: 1)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    x = rng.uniform(-1, 1, args.n)
+    y = np.sin(2 * x) + 0.5 * (x >= 0) + rng.normal(size=args.n)
+    d = (rng.uniform(size=args.n) < 0.2 + 0.5 * (x >= 0)).astype(float)
+    Y = (d[:, None] * np.arange(1, args.outcomes + 1) + x[:, None]
+         + rng.normal(size=(args.n, args.outcomes)))
+    grid = np.linspace(0.02, 1.0, args.bandwidths)
+    print(f"Data: {args.n:,} units, {args.bandwidths} bandwidths\n")
+
+    sub = slice(0, args.notebook_n)
+    data = pd.DataFrame({"age_centered": x[sub], "above_21": (x[sub] >= 0).astype(int),
+                         "y": y[sub], "d": d[sub]})
+    outcomes = [f"y{j}" for j in range(args.outcomes)]
+    data[outcomes] = Y[sub]
+    few = grid[:: max(1, len(grid) // 5)]
+    header = f"Notebook ({args.notebook_n:,} units, {len(few)} bandwidths)"
+    print(f"{header:<44} {'time':>9} {'engine':>9} {'|diff|':>9}")
+    print("-" * 74)
+    for kernel in ("triangular", "uniform"):
+        start = time.perf_counter()
+        expected = np.array([rdd_local_linear(data, "y", h, kernel) for h in few])
+        notebook_time = time.perf_counter() - start
+        start = time.perf_counter()
+        result = rdd_sweep(x[sub], y[sub], few, kernel=kernel)["estimate"].to_numpy()
+        engine_time = time.perf_counter() - start
+        print(f"{'rdd_local_linear, ' + kernel:<44} {notebook_time:>8.2f}s {engine_time:>8.3f}s "
+              f"{np.abs(result - expected).max():>9.1e}")
+    start = time.perf_counter()
+    expected = np.array([notebook_fuzzy_rdd(data, outcome) for outcome in outcomes])
+    notebook_time = time.perf_counter() - start
+    start = time.perf_counter()
+    result = fuzzy_rdd(x[sub], Y[sub], d[sub], kernel="uniform")["estimate"].to_numpy()
+    engine_time = time.perf_counter() - start
+    print(f"{'fuzzy RDD, ' + str(args.outcomes) + ' outcomes':<44} {notebook_time:>8.2f}s "
+          f"{engine_time:>8.3f}s {np.abs(result - expected).max():>9.1e}")
+
+    print(f"\n{'Engine (all units)':<44} {'time':>9} {'estimate':>9}")
+    print("-" * 64)
+    for name, run in [
+        (f"rdd_sweep, triangular, {len(grid)} bandwidths",
+         lambda: rdd_sweep(x, y, grid)["estimate"].iloc[len(grid) // 2]),
+        (f"rdd_sweep, uniform, {len(grid)} bandwidths",
+         lambda: rdd_sweep(x, y, grid, kernel="uniform")["estimate"].iloc[len(grid) // 2]),
+        ("loo_bandwidth, 50 bandwidths, window 0.02",
+         lambda: loo_bandwidth(x, y, np.linspace(0.02, 1.0, 50))["bandwidth"]),
+        (f"fuzzy_rdd, 3 cutoffs x {len(grid)} bw x {args.outcomes} out",
+         lambda: fuzzy_rdd(x, Y, d, cutoffs=[-0.5, 0.0, 0.5], bandwidths=grid / 2,
+                           n_jobs=args.n_jobs)["estimate"].iloc[0]),
+    ]:
+        start = time.perf_counter()
+        value = run()
+        print(f"{name:<44} {time.perf_counter() - start:>8.2f}s {value:>9.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Benchmark synthetic difference-in-differences against the cvxpy notebook code.
+
+Simulates a 1000-unit x 100-period panel (appendix A1 DGP, one treated unit)
+and compares:
+
+- cvxpy (notebook):  ``sdid_estimate_full`` from 25_synthetic_did, one
+                     ``cp.Problem`` per weight problem (OSQP)
+- Frank-Wolfe:       ``sdid_estimate`` (pairwise Frank-Wolfe)
+- active set:        ``sdid_estimate(method="active-set")``
+
+for the point estimate, and cvxpy against batched Frank-Wolfe for placebo
+variance. The cvxpy placebo loop is timed on ``--cvxpy-placebos`` controls
+and extrapolated to all of them; ``SyntheticDiD.variance("placebo")`` solves
+every placebo in one batched call (split over ``--n-jobs`` processes).
+
+Usage:
+    python facure_augment/scripts/benchmark_sdid.py
+    python facure_augment/scripts/benchmark_sdid.py --units 200 --cvxpy-placebos 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import warnings
+
+import numpy as np
+
+from facure_augment.simulation import panel_batch
+from facure_augment.synthetic import SyntheticDiD, sdid_estimate
+
+
+def sdid_cvxpy(Y_co: np.ndarray, y_tr: np.ndarray, n_pre: int, zeta: float) -> float:
+    """``sdid_estimate_full`` from the 25_synthetic_did notebooks."""
+    import cvxpy as cp
+
+    Y_co_pre, Y_co_post = Y_co[:, :n_pre], Y_co[:, n_pre:]
+    w, w0 = cp.Variable(Y_co.shape[0]), cp.Variable()
+    objective = cp.sum_squares(w0 + Y_co_pre.T @ w - y_tr[:n_pre]) + \
+        zeta ** 2 * n_pre * cp.sum_squares(w)
+    cp.Problem(cp.Minimize(objective), [cp.sum(w) == 1, w >= 0]).solve(solver=cp.OSQP)
+
+    lam, lam0 = cp.Variable(n_pre), cp.Variable()
+    objective = cp.sum_squares(lam0 + Y_co_pre @ lam - Y_co_post.mean(axis=1))
+    cp.Problem(cp.Minimize(objective), [cp.sum(lam) == 1, lam >= 0]).solve(solver=cp.OSQP)
+
+    w_hat, lam_hat = w.value, lam.value
+    return (y_tr[n_pre:].mean() - (Y_co_post.T @ w_hat).mean()) - \
+        (y_tr[:n_pre] @ lam_hat - (Y_co_pre.T @ w_hat) @ lam_hat)
+
+
+def main() -> int:
+    """
+    Main entry point.
+
+    Returns
+    -------
+    int
+        Exit code.
+    """
+    parser = argparse.ArgumentParser(description="SDID solver benchmark.")
+    parser.add_argument("--units", type=int, default=1000, help="Units (default: 1000)")
+    parser.add_argument("--periods", type=int, default=100, help="Periods (default: 100)")
+    parser.add_argument("--n-post", type=int, default=20, help="Post periods (default: 20)")
+    parser.add_argument("--cvxpy-placebos", type=int, default=10,
+                        help="Placebos timed for cvxpy (default: 10)")
+    parser.add_argument("--n-jobs", type=int, default=1, help="Worker processes (default: 1)")
+    args = parser.parse_args()
+
+    n_pre = args.periods - args.n_post
+    panel = panel_batch(1, n_units=args.units, n_pre=n_pre, n_post=args.n_post)
+    Y = panel["Y"][0]
+    treated = panel["treated"][:, -1]
+    Y_co, y_tr = Y[~treated], Y[treated].mean(axis=0)
+    print(f"Panel: {args.units} units x {args.periods} periods "
+          f"({n_pre} pre), true effect {panel['true_effect']}\n")
+
+    print(f"{'Point estimate':<24} {'time':>9} {'tau':>10}")
+    print("-" * 45)
+    results = {}
+    for name, method in [("Frank-Wolfe", "frank-wolfe"), ("active set", "active-set")]:
+        start = time.perf_counter()
+        results[name] = sdid_estimate(Y, treated, n_pre, method=method)
+        print(f"{name:<24} {time.perf_counter() - start:>8.3f}s {results[name]['tau']:>10.4f}")
+    zeta = results["Frank-Wolfe"]["zeta"]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        start = time.perf_counter()
+        tau_cvxpy = sdid_cvxpy(Y_co, y_tr, n_pre, zeta)
+        cvxpy_fit = time.perf_counter() - start
+    print(f"{'cvxpy (notebook)':<24} {cvxpy_fit:>8.3f}s {tau_cvxpy:>10.4f}")
+
+    n_placebos = Y_co.shape[0]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        start = time.perf_counter()
+        for j in range(args.cvxpy_placebos):
+            sdid_cvxpy(np.delete(Y_co, j, axis=0), Y_co[j], n_pre, zeta)
+        per_placebo = (time.perf_counter() - start) / args.cvxpy_placebos
+
+    print(f"\n{'Placebo variance':<24} {'time':>9} {'se':>10}")
+    print("-" * 45)
+    print(f"{'cvxpy (extrapolated)':<24} {per_placebo * n_placebos:>8.1f}s {'':>10}")
+    model = SyntheticDiD(n_jobs=args.n_jobs).fit(Y, treated, n_pre)
+    start = time.perf_counter()
+    se = model.variance("placebo")
+    print(f"{'Frank-Wolfe (batched)':<24} {time.perf_counter() - start:>8.1f}s {se:>10.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""Monte-Carlo simulation utilities for augmented."""
+
+from facure_augment.simulation.dgp import (
+    replicate_rngs,
+    stack_replicates,
+    rct_batch,
+    confounded_batch,
+    nonlinear_confounding_batch,
+    dml_batch,
+    neyman_batch,
+    panel_batch,
+    quadratic_response_batch,
+    assignment_batch,
+    residual_on_residual,
+)
+from facure_augment.simulation.runner import (
+    iter_simulation,
+    run_simulation,
+    summarize_simulation,
+)
+
+__all__ = [
+    "replicate_rngs",
+    "stack_replicates",
+    "rct_batch",
+    "confounded_batch",
+    "nonlinear_confounding_batch",
+    "dml_batch",
+    "neyman_batch",
+    "panel_batch",
+    "quadratic_response_batch",
+    "assignment_batch",
+    "residual_on_residual",
+    "iter_simulation",
+    "run_simulation",
+    "summarize_simulation",
+]
@@ -0,0 +1,404 @@
+"""
+Batched, seeded data-generating processes for Monte-Carlo studies.
+
+``generate_rct_data`` and ``generate_confounded_data`` in ``common.py`` reseed
+the global ``np.random`` state and return one dataset per call, and the
+notebooks copy further DGPs between chapters. The generators here return a
+whole stack of replicates in one call:
+
+- every array has a leading ``n_sims`` axis, e.g. ``(n_sims, n)`` outcomes or
+  ``(n_sims, n, p)`` covariates;
+- replicate ``i`` draws from its own ``np.random.Generator`` seeded with
+  ``SeedSequence(seed, spawn_key=(i,))`` (the i-th child of
+  ``SeedSequence(seed).spawn``), so a replicate's data does not depend on how
+  many replicates are generated or in which batch, and studies can be split
+  across processes without changing results (see ``start``).
+
+Estimators that are closed-form in the data (difference in means, partialling
+out with known nuisances) then run over the stack with :func:`residual_on_residual`
+and similar axis-aware NumPy code instead of a Python loop.
+
+DGPs
+----
+rct_batch                     common.generate_rct_data
+confounded_batch              common.generate_confounded_data
+nonlinear_confounding_batch   A2 generate_nonlinear_confounding / generate_dml_data
+dml_batch                     05b/04 coverage_simulation
+neyman_batch                  05b/02 run_simulation
+panel_batch                   A1 generate_panel_data
+quadratic_response_batch      A4 generate_quadratic_response / generate_random_treatment
+assignment_batch              20/03 run_f_learner_simulation (re-randomised T)
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+__all__ = [
+    "replicate_rngs",
+    "stack_replicates",
+    "rct_batch",
+    "confounded_batch",
+    "nonlinear_confounding_batch",
+    "dml_batch",
+    "neyman_batch",
+    "panel_batch",
+    "quadratic_response_batch",
+    "assignment_batch",
+    "residual_on_residual",
+]
+
+
+# =============================================================================
+# Seed Streams
+# =============================================================================
+
+
+def replicate_rngs(n_sims: int, seed: int = 42, start: int = 0) -> List[np.random.Generator]:
+    """
+    Independent generators for replicates ``start, ..., start + n_sims - 1``.
+
+    Parameters
+    ----------
+    n_sims : int
+        Number of replicates.
+    seed : int
+        Root entropy of the study.
+    start : int
+        Index of the first replicate. Generating replicates 0-99 at once or
+        as 0-49 and ``start=50`` gives identical streams.
+
+    Returns
+    -------
+    list of np.random.Generator
+        One PCG64 generator per replicate.
+    """
+    return [
+        np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(i,)))
+        for i in range(start, start + n_sims)
+    ]
+
+
+def stack_replicates(
+    draw: Callable[[np.random.Generator], Dict[str, np.ndarray]],
+    n_sims: int,
+    seed: int = 42,
+    start: int = 0,
+) -> Dict[str, np.ndarray]:
+    """
+    Call ``draw`` once per replicate generator and stack the results.
+
+    Parameters
+    ----------
+    draw : callable
+        Maps a generator to a dict of arrays for one replicate.
+    n_sims, seed, start
+        See :func:`replicate_rngs`.
+
+    Returns
+    -------
+    dict
+        Same keys as ``draw``; each value has a leading ``n_sims`` axis.
+    """
+    draws = [draw(rng) for rng in replicate_rngs(n_sims, seed, start)]
+    return {key: np.stack([d[key] for d in draws]) for key in draws[0]}
+
+
+# =============================================================================
+# Cross-Sectional DGPs
+# =============================================================================
+
+
+def rct_batch(
+    n_sims: int,
+    n: int = 1000,
+    ate: float = 2.0,
+    seed: int = 42,
+    start: int = 0,
+) -> Dict[str, Any]:
+    """
+    Stack of simple RCTs (same DGP as ``generate_rct_data``).
+
+    Returns
+    -------
+    dict
+        ``Y`` and ``T`` of shape ``(n_sims, n)`` and the true ``ate``.
+    """
+    def draw(rng):
+        T = rng.binomial(1, 0.5, n)
+        Y0 = rng.normal(10, 2, n)
+        Y1 = Y0 + ate + rng.normal(0, 0.5, n)
+        return {"Y": np.where(T == 1, Y1, Y0), "T": T}
+
+    return {**stack_replicates(draw, n_sims, seed, start), "ate": ate}
+
+
+def confounded_batch(
+    n_sims: int,
+    n: int = 1000,
+    ate: float = 2.0,
+    confounding_strength: float = 1.0,
+    seed: int = 42,
+    start: int = 0,
+) -> Dict[str, Any]:
+    """
+    Stack of confounded observational datasets (``generate_confounded_data``).
+
+    Returns
+    -------
+    dict
+        ``Y``, ``T`` and ``X`` of shape ``(n_sims, n)`` and the true ``ate``.
+    """
+    def draw(rng):
+        X = rng.normal(0, 1, n)
+        T = rng.binomial(1, 1 / (1 + np.exp(-confounding_strength * X)))
+        Y = 5 + ate * T + confounding_strength * X + rng.normal(0, 1, n)
+        return {"Y": Y, "T": T, "X": X}
+
+    return {**stack_replicates(draw, n_sims, seed, start), "ate": ate}
+
+
+def nonlinear_confounding_batch(
+    n_sims: int,
+    n: int = 5000,
+    tau: float = -2.0,
+    seed: int = 42,
+    start: int = 0,
+) -> Dict[str, Any]:
+    """
+    Partially linear model with nonlinear confounding (appendix A2).
+
+    DGP::
+
+        X1 ~ U(0, 10), X2 ~ U(0, 5)
+        m(X) = 5 + 2 sin(X1) + 0.5 X2²        T = m(X) + N(0, 1)
+        g(X) = 10 + 3 cos(X1) + X1 X2         Y = τ T + g(X) + N(0, 2)
+
+    Returns
+    -------
+    dict
+        ``X`` ``(n_sims, n, 2)``; ``T``, ``Y`` and the true nuisances ``m``
+        and ``g`` ``(n_sims, n)``; and ``tau``.
+    """
+    def draw(rng):
+        X1 = rng.uniform(0, 10, n)
+        X2 = rng.uniform(0, 5, n)
+        m = 5 + 2 * np.sin(X1) + 0.5 * X2 ** 2
+        T = m + rng.normal(0, 1, n)
+        g = 10 + 3 * np.cos(X1) + X1 * X2
+        Y = tau * T + g + rng.normal(0, 2, n)
+        return {"X": np.column_stack([X1, X2]), "T": T, "Y": Y, "m": m, "g": g}
+
+    return {**stack_replicates(draw, n_sims, seed, start), "tau": tau}
+
+
+def dml_batch(
+    n_sims: int,
+    n: int = 500,
+    n_features: int = 10,
+    tau: float = 2.5,
+    seed: int = 42,
+    start: int = 0,
+) -> Dict[str, Any]:
+    """
+    DML coverage design from the cross-fitting notebook.
+
+    DGP::
+
+        X ~ N(0, I_p)
+        m(X) = X0² + X1           T = m(X) + N(0, 1)
+        g(X) = sin(π X0)          Y = τ T + g(X) + N(0, 1)
+
+    Returns
+    -------
+    dict
+        ``X`` ``(n_sims, n, n_features)``; ``T``, ``Y``, ``m``, ``g``
+        ``(n_sims, n)``; and ``tau``.
+    """
+    def draw(rng):
+        X = rng.standard_normal((n, n_features))
+        m = X[:, 0] ** 2 + X[:, 1]
+        g = np.sin(X[:, 0] * np.pi)
+        T = m + rng.normal(0, 1, n)
+        Y = tau * T + g + rng.normal(0, 1, n)
+        return {"X": X, "T": T, "Y": Y, "m": m, "g": g}
+
+    return {**stack_replicates(draw, n_sims, seed, start), "tau": tau}
+
+
+def neyman_batch(
+    n_sims: int,
+    n: int = 1000,
+    tau: float = 2.5,
+    seed: int = 42,
+    start: int = 0,
+) -> Dict[str, Any]:
+    """
+    Design from the Neyman orthogonality notebook.
+
+    DGP::
+
+        X ~ U(-2, 2)³
+        m(X) = X0² + 0.5 X1            T = m(X) + N(0, 0.5)
+        g(X) = sin(π X0) + X2²         Y = τ T + g(X) + N(0, 0.5)
+        ℓ(X) = E[Y|X] = τ m(X) + g(X)
+
+    Returns
+    -------
+    dict
+        ``X`` ``(n_sims, n, 3)``; ``T``, ``Y``, ``m``, ``g``, ``l``
+        ``(n_sims, n)``; and ``tau``.
+    """
+    def draw(rng):
+        X = rng.uniform(-2, 2, (n, 3))
+        m = X[:, 0] ** 2 + 0.5 * X[:, 1]
+        g = np.sin(X[:, 0] * np.pi) + X[:, 2] ** 2
+        T = m + rng.normal(0, 0.5, n)
+        Y = tau * T + g + rng.normal(0, 0.5, n)
+        return {"X": X, "T": T, "Y": Y, "m": m, "g": g, "l": tau * m + g}
+
+    return {**stack_replicates(draw, n_sims, seed, start), "tau": tau}
+
+
+def quadratic_response_batch(
+    n_sims: int,
+    n: int = 5000,
+    confounded: bool = True,
+    seed: int = 42,
+    start: int = 0,
+) -> Dict[str, Any]:
+    """
+    Quadratic dose-response from appendix A4.
+
+    DGP::
+
+        X ~ N(0, 1)
+        T = clip(5 + 2X + N(0, 2), 0, 15)    (confounded)
+        T ~ U(0, 15)                          (confounded=False)
+        Y = 100 + 20T - 1.5T² + 5X + N(0, 10)
+
+    Returns
+    -------
+    dict
+        ``X``, ``T``, ``Y`` ``(n_sims, n)`` and the true ``optimal_T``.
+    """
+    def draw(rng):
+        X = rng.normal(0, 1, n)
+        if confounded:
+            T = np.clip(5 + 2 * X + rng.normal(0, 2, n), 0, 15)
+        else:
+            T = rng.uniform(0, 15, n)
+        Y = 100 + 20 * T - 1.5 * T ** 2 + 5 * X + rng.normal(0, 10, n)
+        return {"X": X, "T": T, "Y": Y}
+
+    return {**stack_replicates(draw, n_sims, seed, start), "optimal_T": 20 / (2 * 1.5)}
+
+
+def assignment_batch(
+    n_sims: int,
+    propensity: Any,
+    n: int,
+    seed: int = 42,
+    start: int = 0,
+) -> np.ndarray:
+    """
+    Re-randomised Bernoulli treatment for fixed potential outcomes.
+
+    Parameters
+    ----------
+    n_sims : int
+        Number of replicates.
+    propensity : float or array of shape (n,)
+        Treatment probability per unit.
+    n : int
+        Number of units.
+    seed, start
+        See :func:`replicate_rngs`.
+
+    Returns
+    -------
+    np.ndarray
+        Treatment stack of shape ``(n_sims, n)``.
+    """
+    return stack_replicates(
+        lambda rng: {"T": rng.binomial(1, propensity, n)}, n_sims, seed, start
+    )["T"]
+
+
+# =============================================================================
+# Panel DGPs
+# =============================================================================
+
+
+def panel_batch(
+    n_sims: int,
+    n_units: int = 10,
+    n_pre: int = 20,
+    n_post: int = 10,
+    true_effect: float = 5.0,
+    seed: int = 42,
+    start: int = 0,
+) -> Dict[str, Any]:
+    """
+    Synthetic-control panel from appendix A1 (unit 0 treated after ``n_pre``).
+
+    DGP::
+
+        Y_jt = 50 + α_j + λ_t + N(0, 1.5) + effect · 1[j = 0, t ≥ n_pre]
+        α_j ~ N(0, 2²),   λ_t = cumsum(N(0, 0.3²))
+
+    Returns
+    -------
+    dict
+        ``Y`` of shape ``(n_sims, n_units, n_periods)``, the boolean
+        ``treated`` mask ``(n_units, n_periods)`` and ``true_effect``.
+    """
+    n_periods = n_pre + n_post
+    treated = np.zeros((n_units, n_periods), dtype=bool)
+    treated[0, n_pre:] = True
+
+    def draw(rng):
+        unit_effects = rng.standard_normal(n_units) * 2
+        time_trend = np.cumsum(rng.standard_normal(n_periods) * 0.3)
+        noise = rng.standard_normal((n_units, n_periods)) * 1.5
+        Y = 50 + unit_effects[:, None] + time_trend[None, :] + noise
+        return {"Y": Y + true_effect * treated}
+
+    return {**stack_replicates(draw, n_sims, seed, start), "treated": treated,
+            "true_effect": true_effect}
+
+
+# =============================================================================
+# Batched Estimators
+# =============================================================================
+
+
+def residual_on_residual(Y_resid: np.ndarray, T_resid: np.ndarray, axis: int = -1):
+    """
+    Partialling-out estimate and influence-function SE along ``axis``.
+
+    Batched version of the final stage of ``dml_ate``:
+    ``τ = Σ T̃ Ỹ / Σ T̃²`` with ``ψ = T̃ (Ỹ - τ T̃) / mean(T̃²)``.
+
+    Parameters
+    ----------
+    Y_resid, T_resid : np.ndarray
+        Residual stacks, e.g. ``(n_sims, n)``.
+    axis : int
+        Observation axis.
+
+    Returns
+    -------
+    tau : np.ndarray
+        Estimates with ``axis`` removed.
+    se : np.ndarray
+        Standard errors.
+    """
+    n = Y_resid.shape[axis]
+    tt = np.sum(T_resid * T_resid, axis=axis, keepdims=True)
+    tau = np.sum(T_resid * Y_resid, axis=axis, keepdims=True) / tt
+    psi = T_resid * (Y_resid - tau * T_resid) / (tt / n)
+    se = np.sqrt(np.var(psi, axis=axis) / n)
+    return np.squeeze(tau, axis=axis), se
@@ -0,0 +1,45 @@
+"""Synthetic control utilities for augmented."""
+
+from facure_augment.synthetic.solver import (
+    simplex_least_squares,
+    placebo_weights,
+    CvxpySimplexLS,
+    SyntheticControl,
+)
+from facure_augment.synthetic.inference import (
+    panel_matrix,
+    placebo_gaps,
+    placebo_test,
+    placebo_ci,
+    block_statistics,
+    conformal_pvalues,
+    conformal_ci,
+)
+from facure_augment.synthetic.sdid import (
+    frank_wolfe_simplex,
+    sdid_zeta,
+    sdid_weights,
+    sdid_estimate,
+    SyntheticDiD,
+    sdid_staggered,
+)
+
+__all__ = [
+    "simplex_least_squares",
+    "placebo_weights",
+    "CvxpySimplexLS",
+    "SyntheticControl",
+    "panel_matrix",
+    "placebo_gaps",
+    "placebo_test",
+    "placebo_ci",
+    "block_statistics",
+    "conformal_pvalues",
+    "conformal_ci",
+    "frank_wolfe_simplex",
+    "sdid_zeta",
+    "sdid_weights",
+    "sdid_estimate",
+    "SyntheticDiD",
+    "sdid_staggered",
+]
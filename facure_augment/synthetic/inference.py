@@ -0,0 +1,416 @@
+"""
+Placebo and conformal inference for synthetic control.
+
+Two families of tests, both working on a ``(T, J)`` outcome matrix with one
+column per unit (see :func:`panel_matrix`):
+
+Placebo in space (Abadie et al. 2010; A1 notebook 2)
+    Every unit is treated as a placebo and fitted from the others. All fits
+    share the pre-period Gram matrix and are solved in one batched call
+    (:func:`placebo_gaps`), optionally split across processes. P-values,
+    per-period p-values and test-inversion CIs are then array operations on
+    the gap matrix (:func:`placebo_test`, :func:`placebo_ci`).
+
+Conformal inference (Chernozhukov, Wüthrich & Zhu 2021; A1 notebook 1)
+    Under ``H0: θ = θ0`` the treated post-period outcomes are adjusted by
+    ``θ0`` and the synthetic control is refitted on *all* periods. The
+    statistic of the post-period residuals is compared with the statistic of
+    every moving-block (cyclic shift) permutation of the residuals; all
+    ``T`` block statistics come from one cumulative sum over the doubled
+    residual series. A grid of nulls shares the donor Gram matrix, so it is
+    solved as one batch with each grid point warm-started from its
+    neighbour (:func:`conformal_pvalues`). :func:`conformal_ci` inverts the
+    test for a constant effect or per post-period, splitting the grid or
+    the periods across a process pool.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from facure_augment.synthetic.solver import placebo_weights, simplex_least_squares
+
+__all__ = [
+    "panel_matrix",
+    "placebo_gaps",
+    "placebo_test",
+    "placebo_ci",
+    "block_statistics",
+    "conformal_pvalues",
+    "conformal_ci",
+]
+
+
+# =============================================================================
+# Data
+# =============================================================================
+
+
+def panel_matrix(
+    data: pd.DataFrame, unit_col: str, time_col: str, outcome_col: str
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pivot a long panel into a ``(T, J)`` outcome matrix.
+
+    Returns
+    -------
+    Y : np.ndarray
+        Outcomes, rows sorted by time and columns by unit.
+    units : np.ndarray
+        Unit labels of the columns.
+    times : np.ndarray
+        Time labels of the rows.
+    """
+    wide = data.pivot(index=time_col, columns=unit_col, values=outcome_col).sort_index()
+    wide = wide.sort_index(axis=1)
+    return wide.to_numpy(dtype=float), wide.columns.to_numpy(), wide.index.to_numpy()
+
+
+# =============================================================================
+# Placebo in Space
+# =============================================================================
+
+
+def placebo_gaps(
+    Y: np.ndarray,
+    n_pre: int,
+    units: Optional[np.ndarray] = None,
+    n_jobs: int = 1,
+    **solver_kwargs: Any,
+) -> Dict[str, Any]:
+    """
+    Synthetic control gaps with every unit as a placebo.
+
+    Parameters
+    ----------
+    Y : np.ndarray
+        Outcomes of shape ``(T, J)``.
+    n_pre : int
+        Number of pre-treatment periods (the first rows of ``Y``).
+    units : array-like of int, optional
+        Columns to fit (default: all).
+    n_jobs : int
+        Worker processes; units are split into contiguous chunks.
+    **solver_kwargs
+        Passed to :func:`~facure_augment.synthetic.solver.simplex_least_squares`.
+
+    Returns
+    -------
+    dict
+        gaps ``(T, k)`` actual minus synthetic, weights ``(J, k)``, pre_rmse
+        ``(k,)``, units and solve_time (summed over workers).
+    """
+    Y = np.asarray(Y, dtype=float)
+    units = np.arange(Y.shape[1]) if units is None else np.asarray(units)
+    Y_pre = Y[:n_pre]
+
+    if n_jobs == 1:
+        W, info = placebo_weights(Y_pre, units, **solver_kwargs)
+        solve_time = info["solve_time"]
+    else:
+        chunks = np.array_split(units, n_jobs)
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [executor.submit(placebo_weights, Y_pre, chunk, **solver_kwargs)
+                       for chunk in chunks]
+            results = [f.result() for f in futures]
+        W = np.hstack([r[0] for r in results])
+        solve_time = sum(r[1]["solve_time"] for r in results)
+
+    gaps = Y[:, units] - Y @ W
+    return {
+        "gaps": gaps,
+        "weights": W,
+        "pre_rmse": np.sqrt(np.mean(gaps[:n_pre] ** 2, axis=0)),
+        "units": units,
+        "solve_time": solve_time,
+    }
+
+
+def _lq(gaps: np.ndarray, q: float) -> np.ndarray:
+    if q == np.inf:
+        return np.max(np.abs(gaps), axis=0)
+    return np.sum(np.abs(gaps) ** q, axis=0) ** (1 / q)
+
+
+def placebo_test(
+    gaps: np.ndarray,
+    n_pre: int,
+    treated: int,
+    q: float = 2,
+    pre_rmse: Optional[np.ndarray] = None,
+    rmse_threshold: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Aggregate and per-period placebo p-values.
+
+    Parameters
+    ----------
+    gaps : np.ndarray
+        ``(T, k)`` gaps from :func:`placebo_gaps`.
+    n_pre : int
+        Number of pre-treatment periods.
+    treated : int
+        Column of ``gaps`` holding the treated unit.
+    q : float
+        Order of the Lq statistic of post-period gaps (``np.inf`` for max).
+    pre_rmse : np.ndarray, optional
+        Pre-period RMSE per column, required with ``rmse_threshold``.
+    rmse_threshold : float, optional
+        Exclude placebos whose pre-period RMSE exceeds this value.
+
+    Returns
+    -------
+    dict
+        p_value, treated_stat, test_stats ``(k,)``, included (bool mask)
+        and period_pvalues ``(T - n_pre,)`` (share of all units whose
+        absolute gap is at least the treated unit's).
+    """
+    post = np.asarray(gaps, dtype=float)[n_pre:]
+    stats = _lq(post, q)
+    included = np.ones(post.shape[1], dtype=bool)
+    if rmse_threshold is not None:
+        included = np.asarray(pre_rmse) <= rmse_threshold
+        included[treated] = True
+
+    abs_post = np.abs(post)
+    return {
+        "p_value": np.mean(stats[included] >= stats[treated]),
+        "treated_stat": stats[treated],
+        "test_stats": stats,
+        "included": included,
+        "period_pvalues": np.mean(abs_post >= abs_post[:, [treated]], axis=1),
+    }
+
+
+def placebo_ci(
+    gaps: np.ndarray,
+    n_pre: int,
+    treated: int,
+    alpha: float = 0.05,
+    grid: Optional[np.ndarray] = None,
+) -> pd.DataFrame:
+    """
+    Per-period confidence intervals by inverting the placebo test.
+
+    ``θ0`` is accepted when ``(1 + #{placebos with |gap| >= |gap₁ - θ0|}) / k
+    > alpha``. Without ``grid`` the accepted set is the exact interval
+    ``gap₁ ± c_t``; with a grid the interval is the range of accepted grid
+    points, as in the notebook's ``per_period_ci``.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per post period with estimate, ci_lower and ci_upper.
+    """
+    post = np.asarray(gaps, dtype=float)[n_pre:]
+    k = post.shape[1]
+    point = post[:, treated]
+    placebo_abs = np.abs(np.delete(post, treated, axis=1))
+
+    if grid is None:
+        # Accept iff at least m placebos reach |gap₁ - θ0|
+        m = int(np.floor(alpha * k - 1)) + 1
+        if m <= 0:
+            half = np.full(len(point), np.inf)
+        elif m > k - 1:
+            half = np.zeros(len(point))
+        else:
+            half = -np.sort(-placebo_abs, axis=1)[:, m - 1]
+        lower, upper = point - half, point + half
+    else:
+        grid = np.asarray(grid, dtype=float)
+        adjusted = np.abs(point[:, None] - grid[None, :])
+        counts = np.sum(placebo_abs[:, :, None] >= adjusted[:, None, :], axis=1)
+        accept = (1 + counts) / k > alpha
+        any_accept = accept.any(axis=1)
+        lower = np.where(any_accept, np.where(accept, grid, np.inf).min(axis=1), point)
+        upper = np.where(any_accept, np.where(accept, grid, -np.inf).max(axis=1), point)
+
+    return pd.DataFrame({
+        "period": np.arange(len(point)),
+        "estimate": point,
+        "ci_lower": lower,
+        "ci_upper": upper,
+    })
+
+
+# =============================================================================
+# Conformal Inference
+# =============================================================================
+
+
+def block_statistics(U: np.ndarray, n_post: int, q: float = 2) -> np.ndarray:
+    """
+    Test statistic of every moving-block permutation of residuals.
+
+    Row ``j`` is the statistic of the ``n_post`` cyclically consecutive
+    residuals starting at period ``j``; the observed statistic is row
+    ``T - n_post``.
+
+    Parameters
+    ----------
+    U : np.ndarray
+        Residuals of shape ``(T,)`` or ``(T, k)``.
+    n_post : int
+        Window length (post-treatment periods).
+    q : float
+        Lq order; ``np.inf`` gives the window max.
+
+    Returns
+    -------
+    np.ndarray
+        Statistics of shape ``(T,)`` or ``(T, k)``.
+    """
+    A = np.abs(np.asarray(U, dtype=float))
+    T = A.shape[0]
+    doubled = np.concatenate([A, A[: n_post - 1]], axis=0)
+    if q == np.inf:
+        windows = np.lib.stride_tricks.sliding_window_view(doubled, n_post, axis=0)
+        return windows.max(axis=-1)
+    csum = np.concatenate([np.zeros((1,) + A.shape[1:]), np.cumsum(doubled ** q, axis=0)])
+    return (csum[n_post:n_post + T] - csum[:T]) ** (1 / q)
+
+
+def conformal_pvalues(
+    Y: np.ndarray,
+    treated: int,
+    n_pre: int,
+    theta: Any = 0.0,
+    q: float = 2,
+    W0: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Moving-block conformal p-values for one or many null hypotheses.
+
+    Parameters
+    ----------
+    Y : np.ndarray
+        Outcomes of shape ``(T, J)``.
+    treated : int
+        Column of the treated unit.
+    n_pre : int
+        Number of pre-treatment periods.
+    theta : float or array-like
+        Null effect(s): a scalar, a grid ``(n_grid,)`` of constant effects,
+        or ``(n_grid, T - n_pre)`` effect paths.
+    q : float
+        Lq order of the statistic.
+    W0 : np.ndarray, optional
+        Warm start for the first grid point.
+
+    Returns
+    -------
+    p_values : np.ndarray
+        ``(n_grid,)`` p-values.
+    info : dict
+        weights ``(J - 1, n_grid)``, residuals ``(T, n_grid)`` and solver
+        information.
+    """
+    Y = np.asarray(Y, dtype=float)
+    T = Y.shape[0]
+    n_post = T - n_pre
+    X = np.delete(Y, treated, axis=1)
+
+    theta = np.asarray(theta, dtype=float)
+    if theta.ndim <= 1:
+        paths = np.repeat(theta.reshape(-1, 1), n_post, axis=1)
+    else:
+        paths = theta
+    Y0 = np.repeat(Y[:, [treated]], paths.shape[0], axis=1)
+    Y0[n_pre:] -= paths.T
+
+    W, info = simplex_least_squares(X, Y0, W0=W0, chain=True)
+    U = Y0 - X @ W
+    stats = block_statistics(U, n_post, q)
+    observed = stats[n_pre]
+    p_values = np.mean(stats >= observed * (1 - 1e-12), axis=0)
+    return p_values, {**info, "weights": W, "residuals": U}
+
+
+def _accepted_range(grid: np.ndarray, p_values: np.ndarray, alpha: float) -> Tuple[float, float]:
+    accepted = grid[p_values > alpha]
+    if len(accepted) == 0:
+        return np.nan, np.nan
+    return accepted.min(), accepted.max()
+
+
+def _grid_pvalues(Y, treated, n_pre, grid, q):
+    return conformal_pvalues(Y, treated, n_pre, grid, q)[0]
+
+
+def conformal_ci(
+    Y: np.ndarray,
+    treated: int,
+    n_pre: int,
+    grid: np.ndarray,
+    alpha: float = 0.1,
+    q: float = 2,
+    per_period: bool = False,
+    n_jobs: int = 1,
+) -> Dict[str, Any]:
+    """
+    Conformal confidence sets by test inversion over a grid.
+
+    Parameters
+    ----------
+    Y : np.ndarray
+        Outcomes of shape ``(T, J)``.
+    treated : int
+        Column of the treated unit.
+    n_pre : int
+        Number of pre-treatment periods.
+    grid : np.ndarray
+        Sorted candidate effects.
+    alpha : float
+        Significance level.
+    q : float
+        Lq order of the statistic.
+    per_period : bool
+        If True, invert a separate test for each post period using the
+        pre-periods plus that period only; otherwise test a constant effect
+        over the whole post-period.
+    n_jobs : int
+        Worker processes. The constant-effect grid is split into contiguous
+        chunks (warm starts chain within a chunk); per-period tests are
+        distributed by period.
+
+    Returns
+    -------
+    dict
+        Constant effect: p_values ``(n_grid,)``, ci_lower, ci_upper.
+        Per period: ``intervals`` DataFrame (period, ci_lower, ci_upper) and
+        p_values ``(n_post, n_grid)``.
+    """
+    Y = np.asarray(Y, dtype=float)
+    grid = np.asarray(grid, dtype=float)
+
+    if per_period:
+        tasks = [(Y[np.r_[:n_pre, n_pre + t]], treated, n_pre, grid, q)
+                 for t in range(Y.shape[0] - n_pre)]
+    else:
+        tasks = [(Y, treated, n_pre, chunk, q)
+                 for chunk in np.array_split(grid, max(1, min(n_jobs, len(grid))))]
+
+    if n_jobs == 1:
+        results: List[np.ndarray] = [_grid_pvalues(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(_grid_pvalues, *zip(*tasks)))
+
+    if not per_period:
+        p_values = np.concatenate(results)
+        lower, upper = _accepted_range(grid, p_values, alpha)
+        return {"p_values": p_values, "ci_lower": lower, "ci_upper": upper}
+
+    p_values = np.vstack(results)
+    bounds = [_accepted_range(grid, p, alpha) for p in p_values]
+    intervals = pd.DataFrame({
+        "period": np.arange(len(bounds)),
+        "ci_lower": [b[0] for b in bounds],
+        "ci_upper": [b[1] for b in bounds],
+    })
+    return {"intervals": intervals, "p_values": p_values}
@@ -0,0 +1,598 @@
+"""
+Synthetic difference-in-differences (Arkhangelsky et al. 2021).
+
+Packaged version of ``SDIDEstimator``, ``SDIDWithInference`` and
+``sdid_staggered`` from the 25_synthetic_did notebooks. Outcomes are an
+``(N, T)`` matrix (units by periods) with a boolean ``treated`` mask and
+``n_pre`` pre-treatment periods.
+
+Both weight problems have the form
+
+    min_{c, v ∈ Δ} ||c + A v - y||² + η ||v||²
+
+(unit weights: rows are pre-periods, ``η = ζ² T_pre``; time weights: rows
+are control units, ``η`` tiny). Profiling out the intercept ``c`` centres
+``A`` and ``y``, leaving a simplex QP in the Gram matrix ``AᵀA + ηI``.
+
+The default solver is Frank-Wolfe with exact line search, as in the
+reference implementation, using pairwise steps (Lacoste-Julien & Jaggi 2015)
+that converge linearly on the simplex. Every step moves mass between two
+vertices, so the iterate's Gram product is updated in ``O(N)`` per problem
+and many problems advance in lock-step. ``method="active-set"`` uses the exact solver from
+:mod:`facure_augment.synthetic.solver` instead.
+
+Placebo variance refits both weight problems with each control as the
+pseudo-treated unit. The unit problems share the control Gram matrix, and
+the time problems differ by a low-rank downdate of the centred scatter
+matrix. All placebo fits are therefore one batched solve, with no per-unit
+problem construction. Bootstrap refits and staggered-adoption cohorts are
+independent and run across a process pool. The jackknife keeps the weights
+fixed and is a closed form.
+"""
+
+from __future__ import annotations
+
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from facure_augment.simulation.dgp import replicate_rngs
+from facure_augment.synthetic.solver import _active_set
+
+__all__ = [
+    "frank_wolfe_simplex",
+    "sdid_zeta",
+    "sdid_weights",
+    "sdid_estimate",
+    "SyntheticDiD",
+    "sdid_staggered",
+]
+
+METHODS = ("frank-wolfe", "active-set")
+
+
+# =============================================================================
+# Regularized Simplex Solver
+# =============================================================================
+
+
+def frank_wolfe_simplex(
+    Q: np.ndarray,
+    B: np.ndarray,
+    mask: Optional[np.ndarray] = None,
+    tol: float = 0.0,
+    max_iter: int = 10_000,
+    pairwise: bool = True,
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Minimize ``wᵀQw - 2bᵀw`` over the simplex for many problems at once.
+
+    Parameters
+    ----------
+    Q : np.ndarray
+        PSD matrix ``(N, N)`` shared by all problems, or ``(k, N, N)``.
+    B : np.ndarray
+        Linear terms ``(N, k)``.
+    mask : np.ndarray of bool, optional
+        ``(N, k)`` allowed coordinates per problem.
+    tol : float
+        A problem stops once its Frank-Wolfe duality gap, an upper bound on
+        its suboptimality, is at most ``tol``.
+    max_iter : int
+        Iteration cap.
+    pairwise : bool
+        Pairwise steps (move mass from the worst support vertex to the best
+        vertex), which converge linearly on the simplex. False gives the
+        classic steps towards a vertex used by the reference implementation.
+
+    Returns
+    -------
+    W : np.ndarray
+        Solutions ``(N, k)``, starting from uniform weights.
+    info : dict
+        n_iter (per problem), converged, gap and solve_time.
+    """
+    start = time.perf_counter()
+    B = np.asarray(B, dtype=float)
+    N, k = B.shape
+    shared = Q.ndim == 2
+    mask = np.ones((N, k), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+
+    # One row per problem, so gathered rows of Q line up with the iterates
+    mask = np.ascontiguousarray(mask.T)
+    B = np.ascontiguousarray(B.T)
+    W = mask / mask.sum(axis=1, keepdims=True)
+    QW = W @ Q if shared else np.einsum("kj,kij->ki", W, Q)
+    diag = np.diag(Q) if shared else np.diagonal(Q, axis1=1, axis2=2)
+    blocked = np.where(mask, 0.0, np.inf)
+    rows = np.arange(k)
+    n_iter = np.zeros(k, dtype=int)
+    active = np.ones(k, dtype=bool)
+    gap = np.full(k, np.inf)
+
+    def gather(i):
+        # Q is symmetric: row i of each problem's Q
+        return Q[i] if shared else Q[rows, i]
+
+    def diagonal(i):
+        return diag[i] if shared else diag[rows, i]
+
+    for _ in range(max_iter):
+        half_grad = QW - B
+        toward = np.argmin(half_grad + blocked, axis=1)
+        g_toward = half_grad[rows, toward]
+        g_mean = np.einsum("ki,ki->k", half_grad, W)
+        gap = np.where(active, 2 * (g_mean - g_toward), gap)
+        active &= gap > tol
+        if not active.any():
+            break
+
+        Q_toward = gather(toward)
+        if pairwise:
+            away = np.argmax(np.where(W > 0, half_grad, -np.inf), axis=1)
+            slope = g_toward - half_grad[rows, away]
+            curvature = diagonal(toward) + diagonal(away) - 2 * Q_toward[rows, away]
+            max_step = W[rows, away]
+        else:
+            slope = g_toward - g_mean
+            curvature = diagonal(toward) - 2 * QW[rows, toward] + np.einsum("ki,ki->k", W, QW)
+            max_step = np.ones(k)
+        # Exact line search, capped at the feasible step
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = np.where(curvature > 0, -slope / curvature, np.inf)
+        step = np.where(active, np.clip(step, 0.0, max_step), 0.0)
+
+        if pairwise:
+            W[rows, toward] += step
+            W[rows, away] = np.where(step == max_step, 0.0, W[rows, away] - step)
+            QW += step[:, None] * (Q_toward - gather(away))
+        else:
+            W *= (1 - step)[:, None]
+            W[rows, toward] += step
+            QW = (1 - step)[:, None] * QW + step[:, None] * Q_toward
+        n_iter += active
+
+    W = W.T
+    return W, {"n_iter": n_iter, "converged": ~active, "gap": gap,
+               "solve_time": time.perf_counter() - start}
+
+
+def _solve(Q, B, mask, method, tol, max_iter) -> np.ndarray:
+    if method == "frank-wolfe":
+        return frank_wolfe_simplex(Q, B, mask, tol, max_iter)[0]
+    N, k = B.shape
+    mask = np.ones((N, k), dtype=bool) if mask is None else mask
+    W = np.zeros((N, k))
+    for i in range(k):
+        Qi = Q if Q.ndim == 2 else Q[i]
+        W[:, i] = _active_set(Qi, B[:, i], mask[:, i], None, 1e-10, 10 * N + 100)[0]
+    return W
+
+
+# =============================================================================
+# Weights
+# =============================================================================
+
+
+def sdid_zeta(Y_co_pre: np.ndarray, n_treated: int, n_post: int) -> float:
+    """
+    Unit-weight regularization ``ζ = (N_tr T_post)^{1/4} σ(ΔY_co,pre)``.
+    """
+    return (n_treated * n_post) ** 0.25 * _noise_level(Y_co_pre)
+
+
+def _noise_level(Y_co_pre: np.ndarray) -> float:
+    return np.std(np.diff(Y_co_pre, axis=1), ddof=1)
+
+
+def _tolerances(Y_co_pre: np.ndarray) -> Tuple[float, float]:
+    """Per-row duality-gap tolerance and time-weight ridge, scaled by noise."""
+    sigma = _noise_level(Y_co_pre)
+    return (1e-5 * sigma) ** 2, (1e-6 * sigma) ** 2
+
+
+def sdid_weights(
+    Y_co: np.ndarray,
+    y_tr: np.ndarray,
+    n_pre: int,
+    zeta: float,
+    method: str = "frank-wolfe",
+    max_iter: int = 10_000,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Unit and time weights for one treated series.
+
+    Parameters
+    ----------
+    Y_co : np.ndarray
+        Control outcomes ``(N_co, T)``.
+    y_tr : np.ndarray
+        Treated outcomes ``(T,)`` (average over treated units).
+    n_pre : int
+        Number of pre-treatment periods.
+    zeta : float
+        Unit-weight regularization.
+    method : {"frank-wolfe", "active-set"}
+        Solver.
+    max_iter : int
+        Frank-Wolfe iteration cap.
+
+    Returns
+    -------
+    omega : np.ndarray
+        Unit weights ``(N_co,)``.
+    lam : np.ndarray
+        Time weights ``(n_pre,)``.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}'. Use one of {METHODS}.")
+    N_co = Y_co.shape[0]
+    pre = Y_co[:, :n_pre]
+    tol, eta_time = _tolerances(pre)
+
+    A = pre.T - pre.T.mean(axis=0)
+    y = y_tr[:n_pre] - y_tr[:n_pre].mean()
+    Q = A.T @ A + zeta ** 2 * n_pre * np.eye(N_co)
+    omega = _solve(Q, (A.T @ y)[:, None], None, method, tol * n_pre, max_iter)[:, 0]
+
+    A = pre - pre.mean(axis=0)
+    target = Y_co[:, n_pre:].mean(axis=1)
+    target = target - target.mean()
+    Q = A.T @ A + eta_time * N_co * np.eye(n_pre)
+    lam = _solve(Q, (A.T @ target)[:, None], None, method, tol * N_co, max_iter)[:, 0]
+    return omega, lam
+
+
+def _double_difference(diff: np.ndarray, lam: np.ndarray, n_pre: int) -> np.ndarray:
+    """``mean(diff_post) - λᵀ diff_pre`` for treated-minus-synthetic series."""
+    return diff[n_pre:].mean(axis=0) - np.sum(lam * diff[:n_pre], axis=0)
+
+
+def sdid_estimate(
+    Y: np.ndarray,
+    treated: np.ndarray,
+    n_pre: int,
+    zeta: Optional[float] = None,
+    method: str = "frank-wolfe",
+    max_iter: int = 10_000,
+) -> Dict[str, Any]:
+    """
+    SDID point estimate.
+
+    Parameters
+    ----------
+    Y : np.ndarray
+        Outcomes ``(N, T)``.
+    treated : np.ndarray of bool
+        Treated units ``(N,)``; treatment starts at period ``n_pre``.
+    n_pre : int
+        Number of pre-treatment periods.
+    zeta : float, optional
+        Unit-weight regularization (default :func:`sdid_zeta`).
+    method, max_iter
+        See :func:`sdid_weights`.
+
+    Returns
+    -------
+    dict
+        tau, omega ``(N_co,)``, lambda ``(n_pre,)``, zeta.
+    """
+    Y = np.asarray(Y, dtype=float)
+    treated = np.asarray(treated, dtype=bool)
+    Y_co = Y[~treated]
+    y_tr = Y[treated].mean(axis=0)
+    if zeta is None:
+        zeta = sdid_zeta(Y_co[:, :n_pre], treated.sum(), Y.shape[1] - n_pre)
+    omega, lam = sdid_weights(Y_co, y_tr, n_pre, zeta, method, max_iter)
+    tau = _double_difference(y_tr - Y_co.T @ omega, lam, n_pre)
+    return {"tau": float(tau), "omega": omega, "lambda": lam, "zeta": zeta}
+
+
+# =============================================================================
+# Variance
+# =============================================================================
+
+
+def _placebo_effects(
+    Y_co: np.ndarray,
+    n_pre: int,
+    zeta: float,
+    pseudo: np.ndarray,
+    method: str,
+    max_iter: int,
+) -> np.ndarray:
+    """
+    SDID estimates with control units ``pseudo[b]`` as treated, batched.
+
+    ``pseudo`` is ``(k, r)``: each row lists the r pseudo-treated controls.
+    """
+    N_co, T = Y_co.shape
+    k, r = pseudo.shape
+    pre = Y_co[:, :n_pre]
+    tol, eta_time = _tolerances(pre)
+    rows = np.arange(k)[:, None]
+    is_pseudo = np.zeros((N_co, k), dtype=bool)
+    is_pseudo[pseudo.T, rows.T] = True
+    targets = Y_co[pseudo].mean(axis=1).T  # (T, k)
+
+    # Unit weights: shared Gram of centred control pre-period columns
+    A = pre.T - pre.T.mean(axis=0)
+    y = targets[:n_pre] - targets[:n_pre].mean(axis=0)
+    Q = A.T @ A + zeta ** 2 * n_pre * np.eye(N_co)
+    omega = _solve(Q, A.T @ y, ~is_pseudo, method, tol * n_pre, max_iter)
+
+    # Time weights: centred scatter of the remaining controls (rows)
+    post_mean = Y_co[:, n_pre:].mean(axis=1)
+    n_keep = N_co - r
+    sum_x = pre.sum(axis=0)[None, :] - pre[pseudo].sum(axis=1)            # (k, T0)
+    sum_t = post_mean.sum() - post_mean[pseudo].sum(axis=1)               # (k,)
+    outer = np.einsum("kri,krj->kij", pre[pseudo], pre[pseudo])
+    xx = (pre.T @ pre)[None] - outer - np.einsum("ki,kj->kij", sum_x, sum_x) / n_keep
+    xt = (pre.T @ post_mean)[None] - np.einsum("kri,kr->ki", pre[pseudo], post_mean[pseudo])
+    xt = xt - sum_x * (sum_t / n_keep)[:, None]
+    Q_time = xx + eta_time * n_keep * np.eye(n_pre)[None]
+    lam = _solve(Q_time, xt.T, None, method, tol * n_keep, max_iter)
+
+    diff = targets - Y_co.T @ omega
+    return _double_difference(diff, lam, n_pre)
+
+
+def _bootstrap_effects(
+    Y: np.ndarray,
+    treated: np.ndarray,
+    n_pre: int,
+    seed: int,
+    start: int,
+    n_reps: int,
+    method: str,
+    max_iter: int,
+) -> np.ndarray:
+    """Unit-resampling bootstrap refits for replicates ``start..start+n_reps``."""
+    N = Y.shape[0]
+    effects = []
+    for rng in replicate_rngs(n_reps, seed, start):
+        while True:
+            idx = rng.integers(0, N, N)
+            if 0 < treated[idx].sum() < N:
+                break
+        effects.append(sdid_estimate(Y[idx], treated[idx], n_pre, None, method, max_iter)["tau"])
+    return np.array(effects)
+
+
+class SyntheticDiD:
+    """
+    Synthetic difference-in-differences estimator with variance estimates.
+
+    Parameters
+    ----------
+    zeta : float, optional
+        Unit-weight regularization; computed from the data if None.
+    method : {"frank-wolfe", "active-set"}
+        Weight solver.
+    max_iter : int
+        Frank-Wolfe iteration cap.
+    n_jobs : int
+        Worker processes for placebo and bootstrap refits.
+
+    Attributes
+    ----------
+    tau_ : float
+        ATT estimate.
+    w_ : np.ndarray
+        Unit weights over control units.
+    lambda_ : np.ndarray
+        Time weights over pre-periods.
+    zeta_ : float
+        Regularization used.
+    se_ : float
+        Standard error from the last :meth:`variance` call.
+    replicates_ : np.ndarray
+        Placebo, jackknife or bootstrap estimates behind ``se_``.
+    solve_time_ : float
+        Seconds spent fitting the weights.
+    """
+
+    def __init__(
+        self,
+        zeta: Optional[float] = None,
+        method: str = "frank-wolfe",
+        max_iter: int = 10_000,
+        n_jobs: int = 1,
+    ):
+        self.zeta = zeta
+        self.method = method
+        self.max_iter = max_iter
+        self.n_jobs = n_jobs
+
+    def fit(self, Y: np.ndarray, treated: np.ndarray, n_pre: int) -> "SyntheticDiD":
+        """
+        Fit unit and time weights and the ATT.
+
+        Parameters
+        ----------
+        Y : np.ndarray
+            Outcomes ``(N, T)``.
+        treated : array-like of bool
+            Treated units.
+        n_pre : int
+            Number of pre-treatment periods.
+        """
+        start = time.perf_counter()
+        self.Y_ = np.asarray(Y, dtype=float)
+        self.treated_ = np.asarray(treated, dtype=bool)
+        self.n_pre_ = n_pre
+        result = sdid_estimate(self.Y_, self.treated_, n_pre, self.zeta, self.method, self.max_iter)
+        self.tau_ = result["tau"]
+        self.w_ = result["omega"]
+        self.lambda_ = result["lambda"]
+        self.zeta_ = result["zeta"]
+        self.solve_time_ = time.perf_counter() - start
+        return self
+
+    def variance(self, method: str = "placebo", n_reps: int = 200, seed: int = 42) -> float:
+        """
+        Standard error of ``tau_``.
+
+        Parameters
+        ----------
+        method : {"placebo", "jackknife", "bootstrap"}
+            Placebo (Algorithm 4): with one treated unit every control is the
+            pseudo-treated unit once; otherwise ``n_reps`` random sets of
+            ``N_tr`` controls. Jackknife (Algorithm 3): leave one unit out with
+            weights held fixed; needs two or more treated units. Bootstrap
+            (Algorithm 2): resample units and refit ``n_reps`` times.
+        n_reps : int
+            Replications for bootstrap and multi-unit placebo.
+        seed : int
+            Random seed.
+
+        Returns
+        -------
+        float
+            Standard error, also stored as ``se_``.
+        """
+        Y, treated, n_pre = self.Y_, self.treated_, self.n_pre_
+        Y_co = Y[~treated]
+        N_co, n_tr = Y_co.shape[0], treated.sum()
+
+        if method == "placebo":
+            if n_tr == 1:
+                pseudo = np.arange(N_co)[:, None]
+            else:
+                rng = np.random.default_rng(seed)
+                pseudo = np.array([rng.choice(N_co, n_tr, replace=False) for _ in range(n_reps)])
+            chunks = np.array_split(pseudo, max(1, min(self.n_jobs, len(pseudo))))
+            args = (Y_co, n_pre, self.zeta_)
+            extra = (self.method, self.max_iter)
+            replicates = self._map(_placebo_effects, [args + (c,) + extra for c in chunks])
+            se = np.sqrt(np.mean((replicates - replicates.mean()) ** 2))
+        elif method == "jackknife":
+            if n_tr < 2:
+                raise ValueError("Jackknife variance needs at least two treated units.")
+            replicates = self._jackknife()
+            n = len(replicates)
+            se = np.sqrt((n - 1) / n * np.sum((replicates - replicates.mean()) ** 2))
+        elif method == "bootstrap":
+            sizes = [len(c) for c in np.array_split(np.arange(n_reps), max(1, self.n_jobs))]
+            starts = np.cumsum([0] + sizes[:-1])
+            tasks = [(Y, treated, n_pre, seed, s, n, self.method, self.max_iter)
+                     for s, n in zip(starts, sizes) if n > 0]
+            replicates = self._map(_bootstrap_effects, tasks)
+            se = np.sqrt(np.mean((replicates - replicates.mean()) ** 2))
+        else:
+            raise ValueError(f"Unknown variance method '{method}'.")
+
+        self.replicates_ = replicates
+        self.se_ = float(se)
+        return self.se_
+
+    def _map(self, fn, tasks) -> np.ndarray:
+        if self.n_jobs == 1 or len(tasks) == 1:
+            return np.concatenate([fn(*task) for task in tasks])
+        with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+            futures = [executor.submit(fn, *task) for task in tasks]
+            return np.concatenate([f.result() for f in futures])
+
+    def _jackknife(self) -> np.ndarray:
+        """Leave-one-unit-out estimates with fixed, renormalized weights."""
+        Y, treated, n_pre = self.Y_, self.treated_, self.n_pre_
+        Y_co, Y_tr = Y[~treated], Y[treated]
+        N_co, n_tr = Y_co.shape[0], Y_tr.shape[0]
+        omega, lam = self.w_, self.lambda_
+
+        # Drop one control: renormalize the remaining weights
+        keep = 1.0 - np.eye(N_co)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            omegas = omega[:, None] * keep / (1.0 - omega)[None, :]
+        y_tr = Y_tr.mean(axis=0)
+        control_out = _double_difference(y_tr[:, None] - Y_co.T @ omegas, lam[:, None], n_pre)
+
+        # Drop one treated unit
+        y_tr_out = (Y_tr.sum(axis=0)[None, :] - Y_tr) / (n_tr - 1)
+        treated_out = _double_difference((y_tr_out - Y_co.T @ omega).T, lam[:, None], n_pre)
+        replicates = np.concatenate([control_out, treated_out])
+        finite = np.isfinite(replicates)
+        if not finite.all():
+            # e.g. a control with ω = 1 leaves no weight to renormalize
+            warnings.warn(
+                f"Jackknife dropped {int((~finite).sum())} of {len(replicates)} leave-one-out "
+                "estimates that are not finite; the standard error uses the rest. "
+                "Consider variance('placebo') or variance('bootstrap').",
+                UserWarning,
+                stacklevel=3,
+            )
+        return replicates[finite]
+
+    def confidence_interval(self, alpha: float = 0.05) -> Tuple[float, float]:
+        """Normal-approximation ``(1 - alpha)`` interval."""
+        from scipy import stats
+
+        z = stats.norm.ppf(1 - alpha / 2)
+        return self.tau_ - z * self.se_, self.tau_ + z * self.se_
+
+
+# =============================================================================
+# Staggered Adoption
+# =============================================================================
+
+
+def _cohort_effect(Y, cohort, c, method, max_iter):
+    treated_mask = cohort == c
+    control_mask = (cohort == 0) | (cohort > c)
+    keep = treated_mask | control_mask
+    result = sdid_estimate(Y[keep], treated_mask[keep], int(c), None, method, max_iter)
+    return result["tau"], int(treated_mask.sum()), int(control_mask.sum())
+
+
+def sdid_staggered(
+    Y: np.ndarray,
+    cohort: np.ndarray,
+    method: str = "frank-wolfe",
+    max_iter: int = 10_000,
+    n_jobs: int = 1,
+) -> pd.DataFrame:
+    """
+    Cohort-by-cohort SDID for staggered adoption.
+
+    Each cohort (units first treated in the same period) is compared with
+    never-treated and not-yet-treated units, as in the notebook's
+    ``sdid_staggered``. Cohorts are fitted in parallel.
+
+    Parameters
+    ----------
+    Y : np.ndarray
+        Outcomes ``(N, T)``.
+    cohort : np.ndarray
+        First treated period per unit; 0 for never treated.
+    method, max_iter
+        See :func:`sdid_weights`.
+    n_jobs : int
+        Worker processes.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per cohort with estimate, n_treated, n_control and weight
+        (share of treated unit-periods), plus the attribute
+        ``attrs["att"]``, the weighted average effect.
+    """
+    Y = np.asarray(Y, dtype=float)
+    cohort = np.asarray(cohort)
+    cohorts = np.sort(np.unique(cohort[cohort > 0]))
+    tasks = [(Y, cohort, c, method, max_iter) for c in cohorts]
+    if n_jobs == 1:
+        results = [_cohort_effect(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(_cohort_effect, *zip(*tasks)))
+
+    table = pd.DataFrame(results, columns=["estimate", "n_treated", "n_control"])
+    table.insert(0, "cohort", cohorts)
+    exposure = table["n_treated"] * (Y.shape[1] - table["cohort"])
+    table["weight"] = exposure / exposure.sum()
+    table.attrs["att"] = float(np.sum(table["weight"] * table["estimate"]))
+    return table
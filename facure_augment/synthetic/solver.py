@@ -0,0 +1,321 @@
+"""
+Batched simplex-constrained least squares for synthetic control.
+
+Synthetic control weights solve
+
+    min_w ||X w - y||²   s.t.   w >= 0, Σ w = 1
+
+``SyntheticControl.fit`` in Facure's ``sc.py`` builds a new ``cp.Problem``
+for every fit, and placebo inference refits once per donor. This module
+solves the problem with a primal active-set method (Lawson-Hanson adapted to
+the simplex) on the Gram matrix ``XᵀX``. The method terminates finitely
+with an exact KKT point, and each iteration is a small linear solve on the
+current support (at most ``T + 1`` donors are active in a basic solution).
+
+- ``XᵀX`` is formed once and shared by every problem on the same panel, so
+  ``Y`` may hold many targets and a full placebo-in-space run is one call;
+- ``mask`` restricts each problem's donor pool (e.g., a unit cannot be its
+  own donor);
+- ``W0`` warm-starts from previous weights: their support is the initial
+  active set, so neighbouring fits typically finish in a few iterations.
+
+The cvxpy formulation is kept as a reference backend that builds the
+problem once with ``cp.Parameter`` data and re-solves with warm starts.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.utils.validation import check_array, check_is_fitted, check_X_y
+
+__all__ = [
+    "simplex_least_squares",
+    "placebo_weights",
+    "CvxpySimplexLS",
+    "SyntheticControl",
+]
+
+
+# =============================================================================
+# Active-Set Solver
+# =============================================================================
+
+
+def _active_set(
+    G: np.ndarray,
+    b: np.ndarray,
+    allowed: np.ndarray,
+    w0: Optional[np.ndarray],
+    tol: float,
+    max_iter: int,
+) -> Tuple[np.ndarray, int, bool]:
+    """Minimize ½ wᵀGw - bᵀw over the simplex restricted to ``allowed``."""
+    J = G.shape[0]
+    candidates = np.flatnonzero(allowed)
+    if w0 is not None and np.any(w0[candidates] > 0):
+        w = np.where(allowed, np.maximum(w0, 0.0), 0.0)
+        w /= w.sum()
+    else:
+        # Best single donor
+        w = np.zeros(J)
+        w[candidates[np.argmin(0.5 * np.diag(G)[candidates] - b[candidates])]] = 1.0
+    free = w > 0
+    gtol = tol * max(1.0, np.max(np.abs(np.diag(G))))
+
+    for n_iter in range(1, max_iter + 1):
+        F = np.flatnonzero(free)
+        m = len(F)
+        # Equality-constrained QP on the support; lstsq copes with collinear donors
+        kkt = np.zeros((m + 1, m + 1))
+        kkt[:m, :m] = G[np.ix_(F, F)]
+        kkt[:m, m] = kkt[m, :m] = 1.0
+        z = np.linalg.lstsq(kkt, np.r_[b[F], 1.0], rcond=None)[0][:m]
+
+        if np.all(z > 0):
+            w = np.zeros(J)
+            w[F] = z
+            grad = G @ w - b
+            violation = np.where(allowed & ~free, grad - grad[F].mean(), np.inf)
+            j = np.argmin(violation)
+            if violation[j] >= -gtol:
+                return w, n_iter, True
+            free[j] = True
+        else:
+            # Move towards z until the first support weight hits zero
+            wF = w[F]
+            hit = z <= 0
+            alpha = np.min(wF[hit] / (wF[hit] - z[hit]))
+            w = np.zeros(J)
+            w[F] = np.maximum(wF + alpha * (z - wF), 0.0)
+            w[w <= tol] = 0.0
+            w /= w.sum()
+            free = w > 0
+    return w, max_iter, False
+
+
+def simplex_least_squares(
+    X: np.ndarray,
+    Y: np.ndarray,
+    mask: Optional[np.ndarray] = None,
+    W0: Optional[np.ndarray] = None,
+    chain: bool = False,
+    tol: float = 1e-10,
+    max_iter: Optional[int] = None,
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Solve simplex-constrained least squares for one or many targets.
+
+    Parameters
+    ----------
+    X : np.ndarray
+        Donor matrix of shape ``(T, J)``.
+    Y : np.ndarray
+        Target(s) of shape ``(T,)`` or ``(T, k)``.
+    mask : np.ndarray of bool, optional
+        ``(J,)`` or ``(J, k)`` allowed donors per problem.
+    W0 : np.ndarray, optional
+        Warm start of shape ``(J,)`` or ``(J, k)``.
+    chain : bool
+        Warm-start each problem from the previous problem's solution (the
+        first from ``W0``). Useful when consecutive targets are close, e.g.
+        a grid of null hypotheses.
+    tol : float
+        Relative tolerance on the KKT conditions.
+    max_iter : int, optional
+        Active-set iterations per problem (default ``10 J + 100``).
+
+    Returns
+    -------
+    W : np.ndarray
+        Weights of shape ``(J,)`` or ``(J, k)``.
+    info : dict
+        n_iter, converged, objective (per problem) and solve_time (seconds
+        for the whole batch, including forming ``XᵀX``).
+
+    Examples
+    --------
+    >>> X = np.array([[1.0, 3.0], [2.0, 4.0]])
+    >>> w, info = simplex_least_squares(X, np.array([2.0, 3.0]))
+    >>> np.round(w, 3)
+    array([0.5, 0.5])
+    """
+    start = time.perf_counter()
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    vector = Y.ndim == 1
+    Y2 = Y[:, None] if vector else Y
+    J, k = X.shape[1], Y2.shape[1]
+
+    if mask is None:
+        mask = np.ones((J, k), dtype=bool)
+    else:
+        mask = np.asarray(mask, dtype=bool)
+        mask = np.broadcast_to(mask[:, None] if mask.ndim == 1 else mask, (J, k))
+    if W0 is not None:
+        W0 = np.asarray(W0, dtype=float)
+        W0 = np.broadcast_to(W0[:, None] if W0.ndim == 1 else W0, (J, k))
+    max_iter = 10 * J + 100 if max_iter is None else max_iter
+
+    G = X.T @ X
+    B = X.T @ Y2
+    W = np.zeros((J, k))
+    n_iter = np.zeros(k, dtype=int)
+    converged = np.zeros(k, dtype=bool)
+    for i in range(k):
+        if chain and i > 0:
+            w0 = W[:, i - 1]
+        else:
+            w0 = None if W0 is None else W0[:, i]
+        W[:, i], n_iter[i], converged[i] = _active_set(G, B[:, i], mask[:, i], w0, tol, max_iter)
+
+    objective = np.sum((X @ W - Y2) ** 2, axis=0)
+    info = {
+        "n_iter": n_iter[0] if vector else n_iter,
+        "converged": converged[0] if vector else converged,
+        "objective": objective[0] if vector else objective,
+        "solve_time": time.perf_counter() - start,
+    }
+    return (W[:, 0] if vector else W), info
+
+
+def placebo_weights(
+    Y_pre: np.ndarray,
+    units: Optional[np.ndarray] = None,
+    W0: Optional[np.ndarray] = None,
+    **kwargs: Any,
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Synthetic control weights for every unit as its own placebo, in one solve.
+
+    Parameters
+    ----------
+    Y_pre : np.ndarray
+        Pre-treatment outcomes (or stacked predictors), shape ``(T, J)``
+        with one column per unit.
+    units : array-like of int, optional
+        Column indices to treat as placebo targets (default: all).
+    W0 : np.ndarray, optional
+        Warm start of shape ``(J, len(units))``.
+    **kwargs
+        Passed to :func:`simplex_least_squares`.
+
+    Returns
+    -------
+    W : np.ndarray
+        ``(J, len(units))``; column ``i`` holds the weights reproducing unit
+        ``units[i]`` from the other units (its own weight is zero).
+    info : dict
+        Solver information.
+    """
+    Y_pre = np.asarray(Y_pre, dtype=float)
+    J = Y_pre.shape[1]
+    units = np.arange(J) if units is None else np.asarray(units)
+    mask = np.ones((J, len(units)), dtype=bool)
+    mask[units, np.arange(len(units))] = False
+    return simplex_least_squares(Y_pre, Y_pre[:, units], mask=mask, W0=W0, **kwargs)
+
+
+# =============================================================================
+# cvxpy Reference Backend
+# =============================================================================
+
+
+class CvxpySimplexLS:
+    """
+    cvxpy formulation built once and re-solved with new data.
+
+    ``X`` and ``y`` are ``cp.Parameter`` objects, so repeated solves skip
+    problem construction and canonicalization and warm-start from the
+    previous solution.
+
+    Parameters
+    ----------
+    n_periods, n_donors : int
+        Shape of the donor matrix.
+    solver : str, optional
+        cvxpy solver name (e.g., "CLARABEL"); default lets cvxpy choose.
+    """
+
+    def __init__(self, n_periods: int, n_donors: int, solver: Optional[str] = None):
+        import cvxpy as cp
+
+        self.X = cp.Parameter((n_periods, n_donors))
+        self.y = cp.Parameter(n_periods)
+        self.w = cp.Variable(n_donors)
+        objective = cp.Minimize(cp.sum_squares(self.X @ self.w - self.y))
+        self.problem = cp.Problem(objective, [cp.sum(self.w) == 1, self.w >= 0])
+        self.solver = solver
+
+    def solve(self, X: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """Solve for new data, returning weights and solver information."""
+        start = time.perf_counter()
+        self.X.value = np.asarray(X, dtype=float)
+        self.y.value = np.asarray(y, dtype=float)
+        self.problem.solve(solver=self.solver, warm_start=True)
+        info = {
+            "solve_time": time.perf_counter() - start,
+            "objective": self.problem.value,
+            "status": self.problem.status,
+        }
+        return np.asarray(self.w.value), info
+
+
+# =============================================================================
+# Estimator
+# =============================================================================
+
+
+class SyntheticControl(BaseEstimator, RegressorMixin):
+    """
+    Synthetic control regressor (drop-in for Facure's ``sc.SyntheticControl``).
+
+    Parameters
+    ----------
+    warm_start : bool
+        Reuse ``w_`` from the previous ``fit`` as the starting point.
+    tol : float
+        Solver tolerance.
+    max_iter : int, optional
+        Solver iteration cap.
+
+    Attributes
+    ----------
+    w_ : np.ndarray
+        Donor weights.
+    solve_time_ : float
+        Seconds spent in the solver during the last ``fit``.
+    n_iter_ : int
+        Solver iterations in the last ``fit``.
+    """
+
+    def __init__(self, warm_start: bool = False, tol: float = 1e-10, max_iter: Optional[int] = None):
+        self.warm_start = warm_start
+        self.tol = tol
+        self.max_iter = max_iter
+
+    def fit(self, X, y):
+        X, y = check_X_y(X, y)
+        W0 = None
+        if self.warm_start and getattr(self, "w_", None) is not None:
+            if self.w_.shape[0] == X.shape[1]:
+                W0 = self.w_
+        w, info = simplex_least_squares(X, y, W0=W0, tol=self.tol, max_iter=self.max_iter)
+
+        self.X_ = X
+        self.y_ = y
+        self.w_ = w
+        self.solve_time_ = info["solve_time"]
+        self.n_iter_ = info["n_iter"]
+
+        self.is_fitted_ = True
+        return self
+
+    def predict(self, X):
+        check_is_fitted(self)
+        X = check_array(X)
+
+        return X @ self.w_
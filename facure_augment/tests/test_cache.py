@@ -0,0 +1,60 @@
+"""
+Tests for the dataset cache in facure_augment.cache.
+"""
+
+from __future__ import annotations
+
+import os
+
+import pandas as pd
+import pytest
+
+from facure_augment.cache import _LRU, _copy_on_write, clear_cache, read_csv_cached, sidecar_path
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / "toy.csv"
+    pd.DataFrame({"a": [1, 2, 3], "b": [0.5, 1.5, 2.5], "c": ["x", "y", "z"]}).to_csv(
+        path, index=False
+    )
+    yield path
+    clear_cache()
+
+
+class TestReadCsvCached:
+    """In-process LRU and Feather sidecars."""
+
+    def test_matches_read_csv(self, csv_file, tmp_path):
+        cached = read_csv_cached(csv_file, cache_dir=tmp_path / "cache")
+        pd.testing.assert_frame_equal(cached, pd.read_csv(csv_file))
+
+    def test_writes_sidecar(self, csv_file, tmp_path):
+        pytest.importorskip("pyarrow")
+        cache_dir = tmp_path / "cache"
+        read_csv_cached(csv_file, cache_dir=cache_dir)
+        assert sidecar_path(csv_file, cache_dir).exists()
+
+        clear_cache()  # force the next read to come from the sidecar
+        from_disk = read_csv_cached(csv_file, cache_dir=cache_dir)
+        pd.testing.assert_frame_equal(from_disk, pd.read_csv(csv_file), check_dtype=False)
+
+    def test_mutation_does_not_leak(self, csv_file, tmp_path):
+        first = read_csv_cached(csv_file, cache_dir=tmp_path / "cache")
+        first.loc[0, "a"] = 100
+        second = read_csv_cached(csv_file, cache_dir=tmp_path / "cache")
+        assert second.loc[0, "a"] == 1
+        assert len(_LRU) == 1
+
+    def test_modified_source_invalidates(self, csv_file, tmp_path):
+        read_csv_cached(csv_file, cache_dir=tmp_path / "cache")
+        pd.DataFrame({"a": [9], "b": [9.0], "c": ["q"]}).to_csv(csv_file, index=False)
+        stat = csv_file.stat()
+        os.utime(csv_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert read_csv_cached(csv_file, cache_dir=tmp_path / "cache")["a"].tolist() == [9]
+
+    @pytest.mark.parametrize("mode, expected", [(True, True), ("warn", False), (False, False)])
+    def test_copy_on_write_modes_on_pandas_2(self, monkeypatch, mode, expected):
+        monkeypatch.setattr(pd, "__version__", "2.2.3")
+        monkeypatch.setattr(pd, "get_option", lambda key: mode)
+        assert _copy_on_write() is expected
@@ -0,0 +1,257 @@
+"""
+Tests for facure_augment.dml.
+
+Cross-fitted estimates are checked against the fold loops of the
+04_cross_fitting and 05_dml_implementation notebooks; caching against fit
+counters; multi-treatment sandwich errors against statsmodels.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.model_selection import KFold
+
+from facure_augment.dml import CrossFitter, DoubleMachineLearning, aipw, dml_plr, r_learner
+from facure_augment.simulation import dml_batch
+
+
+# =============================================================================
+# Reference Implementations (04_cross_fitting, 05_dml_implementation)
+# =============================================================================
+
+
+def cross_fit_residuals(Y, T, X, model_Y, model_T, n_folds=5, random_state=42):
+    n = len(Y)
+    kf = KFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+
+    Y_resid = np.zeros(n)
+    T_resid = np.zeros(n)
+
+    for train_idx, test_idx in kf.split(X):
+        mY = clone(model_Y).fit(X[train_idx], Y[train_idx])
+        mT = clone(model_T).fit(X[train_idx], T[train_idx])
+        Y_resid[test_idx] = Y[test_idx] - mY.predict(X[test_idx])
+        T_resid[test_idx] = T[test_idx] - mT.predict(X[test_idx])
+
+    return Y_resid, T_resid
+
+
+def notebook_dml(Y, T, X, model_Y, model_T, random_state=42):
+    """``DoubleMachineLearning.fit`` estimate and standard error."""
+    Y_resid, T_resid = cross_fit_residuals(Y, T, X, model_Y, model_T,
+                                           random_state=random_state)
+    tau = np.sum(T_resid * Y_resid) / np.sum(T_resid ** 2)
+    psi = T_resid * (Y_resid - tau * T_resid) / np.mean(T_resid ** 2)
+    return tau, np.sqrt(np.var(psi, ddof=1) / len(Y))
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+
+@pytest.fixture
+def plr_data():
+    batch = dml_batch(1, n=600, seed=3)
+    return batch["X"][0], batch["T"][0], batch["Y"][0]
+
+
+@pytest.fixture
+def binary_data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(1500, 3))
+    T = (rng.random(1500) < 1 / (1 + np.exp(-X[:, 0]))).astype(int)
+    Y = X[:, 0] + X[:, 1] + 2.0 * T + rng.normal(size=1500)
+    return X, T, Y
+
+
+@pytest.fixture
+def multi_data():
+    rng = np.random.default_rng(1)
+    n = 800
+    X = rng.normal(size=(n, 4))
+    T = np.column_stack([X[:, 0] + rng.normal(size=n), X[:, 1] + rng.normal(size=n)])
+    Y = np.column_stack([
+        T @ [1.0, 2.0] + X[:, 0] + rng.normal(size=n),
+        T @ [0.0, -1.0] + rng.normal(size=n) * (1 + np.abs(X[:, 2])),
+        X[:, 3] + rng.normal(size=n),
+    ])
+    return X, T, Y
+
+
+@pytest.fixture
+def gbm():
+    return GradientBoostingRegressor(n_estimators=20, max_depth=2, random_state=0)
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+
+
+class TestCrossFitter:
+    """Out-of-fold predictions and caching."""
+
+    def test_matches_notebook_residuals(self, plr_data, gbm):
+        X, T, Y = plr_data
+        Y_resid, T_resid = cross_fit_residuals(Y, T, X, gbm, gbm)
+        result = dml_plr(X, T, Y, gbm, gbm)
+        np.testing.assert_allclose(result["Y_residual"], Y_resid)
+        np.testing.assert_allclose(result["T_residual"], T_resid)
+
+    def test_matches_notebook_estimate(self, plr_data, gbm):
+        X, T, Y = plr_data
+        tau, se = notebook_dml(Y, T, X, gbm, gbm)
+        result = dml_plr(X, T, Y, gbm, gbm)
+        assert result["tau"] == pytest.approx(tau, rel=1e-12)
+        assert result["se"] == pytest.approx(se, rel=1e-12)
+
+    def test_memory_cache(self, plr_data, gbm):
+        X, T, Y = plr_data
+        fitter = CrossFitter()
+        first = fitter.oof(gbm, X, Y)
+        second = fitter.oof(clone(gbm), X, Y)
+        np.testing.assert_array_equal(first, second)
+        assert fitter.stats_["fold_fits"] == 5
+        assert fitter.stats_["memory_hits"] == 1
+
+    def test_key_changes_with_inputs(self, plr_data, gbm):
+        X, T, Y = plr_data
+        fitter = CrossFitter()
+        base = fitter.key(gbm, X, Y)
+        assert fitter.key(gbm.set_params(max_depth=3), X, Y) != base
+        assert fitter.key(clone(gbm).set_params(max_depth=2), X, Y, seed=1) != base
+        assert fitter.key(clone(gbm).set_params(max_depth=2), X, Y + 1) != base
+
+    def test_disk_cache_across_instances(self, plr_data, gbm, tmp_path):
+        X, T, Y = plr_data
+        CrossFitter(cache_dir=tmp_path).oof(gbm, X, Y)
+        fitter = CrossFitter(cache_dir=tmp_path)
+        fitter.oof(gbm, X, Y)
+        assert fitter.stats_ == {"fold_fits": 0, "memory_hits": 0, "disk_hits": 1}
+        fitter.clear(disk=True)
+        assert not list(tmp_path.glob("*.npy"))
+
+    def test_cache_disable(self, plr_data, gbm, tmp_path, monkeypatch):
+        X, T, Y = plr_data
+        monkeypatch.setenv("FACURE_CACHE_DISABLE", "1")
+        CrossFitter(cache_dir=tmp_path).oof(gbm, X, Y)
+        assert not list(tmp_path.glob("*.npy"))
+
+    def test_parallel_matches_serial(self, plr_data, gbm):
+        X, T, Y = plr_data
+        serial = CrossFitter().oof(gbm, X, Y, seed=7)
+        parallel = CrossFitter(n_jobs=2).oof(gbm, X, Y, seed=7)
+        np.testing.assert_array_equal(serial, parallel)
+
+    def test_subset_trains_on_rows(self, binary_data):
+        X, T, Y = binary_data
+        treated = T == 1
+        oof = CrossFitter().oof(LinearRegression(), X, Y, subset=treated)
+        expected = np.empty(len(Y))
+        for train, test in KFold(5, shuffle=True, random_state=42).split(X):
+            train = train[treated[train]]
+            expected[test] = LinearRegression().fit(X[train], Y[train]).predict(X[test])
+        np.testing.assert_allclose(oof, expected)
+
+
+class TestRepeatedSplits:
+    """Repeated cross-fitting reuses earlier repetitions."""
+
+    def test_repeated_matches_notebook(self, plr_data):
+        X, T, Y = plr_data
+        model = LinearRegression()
+        result = dml_plr(X, T, Y, model, model, seeds=[0, 42, 84])
+        taus = [notebook_dml(Y, T, X, model, model, random_state=s)[0] for s in [0, 42, 84]]
+        np.testing.assert_allclose(result["estimates"]["tau"], taus)
+        assert result["tau"] == pytest.approx(np.median(taus))
+
+    def test_more_repetitions_fit_only_new_seeds(self, plr_data):
+        X, T, Y = plr_data
+        fitter = CrossFitter()
+        model = LinearRegression()
+        dml_plr(X, T, Y, model, model, seeds=range(10), fitter=fitter)
+        assert fitter.stats_["fold_fits"] == 10 * 2 * 5
+        dml_plr(X, T, Y, model, model, seeds=range(50), fitter=fitter)
+        assert fitter.stats_["fold_fits"] == 50 * 2 * 5
+        assert fitter.stats_["memory_hits"] == 10 * 2
+
+
+class TestSharedNuisances:
+    """DML, R-learner and AIPW share nuisance fits."""
+
+    def test_r_learner_reuses_dml_fits(self, plr_data, gbm):
+        X, T, Y = plr_data
+        fitter = CrossFitter()
+        dml = dml_plr(X, T, Y, gbm, gbm, fitter=fitter)
+        fits = fitter.stats_["fold_fits"]
+        cate = r_learner(X, T, Y, gbm, gbm, LinearRegression(), fitter=fitter,
+                         features=np.ones((len(Y), 1)))
+        assert fitter.stats_["fold_fits"] == fits
+        # A constant CATE model recovers the DML slope
+        assert cate.intercept_ == pytest.approx(dml["tau"], rel=1e-10)
+
+    def test_aipw_shares_propensity(self, binary_data):
+        X, T, Y = binary_data
+        fitter = CrossFitter()
+        result = aipw(X, T, Y, LinearRegression(), LogisticRegression(), fitter=fitter)
+        assert fitter.stats_["fold_fits"] == 15
+        dml_plr(X, T, Y, LinearRegression(), LogisticRegression(), fitter=fitter,
+                method_t="predict_proba")
+        assert fitter.stats_["fold_fits"] == 20
+        assert result["ci_lower"] < 2.0 < result["ci_upper"]
+
+
+class TestDoubleMachineLearning:
+    """Multi-outcome, multi-treatment estimator."""
+
+    def test_single_outcome_matches_notebook(self, plr_data, gbm):
+        X, T, Y = plr_data
+        tau, se = notebook_dml(Y, T, X, gbm, gbm)
+        dml = DoubleMachineLearning(gbm, gbm).fit(Y, T, X)
+        assert dml.tau_.iloc[0, 0] == pytest.approx(tau, rel=1e-12)
+        assert dml.se_.iloc[0, 0] == pytest.approx(se, rel=1e-12)
+
+    def test_outcome_matrix_matches_loop(self, multi_data):
+        X, T, Y = multi_data
+        model = LinearRegression()
+        dml = DoubleMachineLearning(model, model).fit(Y, T[:, 0], X)
+        for j in range(Y.shape[1]):
+            tau, se = notebook_dml(Y[:, j], T[:, 0], X, model, model)
+            assert dml.tau_.iloc[j, 0] == pytest.approx(tau, rel=1e-10)
+            assert dml.se_.iloc[j, 0] == pytest.approx(se, rel=1e-10)
+
+    def test_treatment_nuisance_fit_once(self, multi_data):
+        X, T, Y = multi_data
+        dml = DoubleMachineLearning(LinearRegression(), LinearRegression()).fit(Y, T, X)
+        assert dml.fitter.stats_["fold_fits"] == 5 * (T.shape[1] + Y.shape[1])
+
+    def test_multiple_treatments_sandwich(self, multi_data):
+        X, T, Y = multi_data
+        n = len(Y)
+        dml = DoubleMachineLearning(LinearRegression(), LinearRegression()).fit(Y, T, X)
+        for j in range(Y.shape[1]):
+            ols = sm.OLS(dml.Y_resid_[:, j], dml.T_resid_).fit(cov_type="HC0")
+            np.testing.assert_allclose(dml.tau_.iloc[j], ols.params, rtol=1e-10)
+            np.testing.assert_allclose(dml.se_.iloc[j], ols.bse * np.sqrt(n / (n - 1)), rtol=1e-10)
+        assert dml.ci_[0].iloc[0, 1] < 2.0 < dml.ci_[1].iloc[0, 1]
+
+    def test_summary_uses_column_names(self, multi_data):
+        X, T, Y = multi_data
+        dml = DoubleMachineLearning(LinearRegression(), LinearRegression())
+        dml.fit(pd.DataFrame(Y, columns=["revenue", "clicks", "churn"]),
+                pd.DataFrame(T, columns=["discount", "email"]), X)
+        summary = dml.summary()
+        assert len(summary) == 6
+        assert set(summary["outcome"]) == {"revenue", "clicks", "churn"}
+        assert set(summary["treatment"]) == {"discount", "email"}
+
+    def test_summary_before_fit(self):
+        with pytest.raises(ValueError, match="not fitted"):
+            DoubleMachineLearning().summary()
@@ -0,0 +1,45 @@
+"""
+Tests for the dataset dtype registry in facure_augment.dtypes.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from facure_augment.common import FACURE_DATA_DIR, load_facure_data
+from facure_augment.dtypes import dataset_dtypes, load_dtype_schema, memory_report
+
+BUNDLED = sorted(
+    name for name in load_dtype_schema() if (FACURE_DATA_DIR / name).exists()
+)
+
+
+@pytest.mark.parametrize("filename", BUNDLED)
+def test_typed_load_preserves_values(filename):
+    """Compact dtypes must not change values beyond float32 rounding."""
+    default = load_facure_data(filename, cache=False)
+    typed = load_facure_data(filename, typed=True, cache=False)
+
+    assert list(typed.columns) == list(default.columns)
+    assert set(dataset_dtypes(filename)) == set(default.columns)
+    for col in default.columns:
+        values = typed[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(default[col].dtype)
+        np.testing.assert_allclose(
+            values.astype(float), default[col].astype(float), rtol=1e-6, err_msg=col
+        )
+
+
+def test_usecols_projection():
+    df = load_facure_data("wage.csv", typed=True, usecols=["wage", "educ"], cache=False)
+    assert list(df.columns) == ["wage", "educ"]
+    assert df["educ"].dtype == np.int8
+
+
+def test_memory_report_shrinks_every_dataset():
+    report = memory_report(BUNDLED)
+    assert len(report) == len(BUNDLED)
+    assert (report["typed_mb"] < report["default_mb"]).all()
@@ -0,0 +1,164 @@
+"""
+Tests for facure_augment.evaluation.
+
+Checks the vectorized curves against the head()-per-step reference
+implementation from Facure's ``nb21.py``.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from facure_augment.evaluation import (
+    StreamingGain,
+    auuc,
+    cumulative_curve,
+    cumulative_elast_curve,
+    cumulative_elast_curve_ci,
+    cumulative_gain,
+    cumulative_gain_ci,
+    gain_curve_error,
+    quantile_edges,
+    row_grid,
+)
+
+
+# =============================================================================
+# Reference Implementation (nb21.py)
+# =============================================================================
+
+
+def _elast(data, y, t):
+    return (np.sum((data[t] - data[t].mean()) * (data[y] - data[y].mean())) /
+            np.sum((data[t] - data[t].mean()) ** 2))
+
+
+def _elast_ci(df, y, t, z=1.96):
+    n = df.shape[0]
+    t_bar = df[t].mean()
+    beta1 = _elast(df, y, t)
+    beta0 = df[y].mean() - beta1 * t_bar
+    e = df[y] - (beta0 + beta1 * df[t])
+    se = np.sqrt(((1 / (n - 2)) * np.sum(e ** 2)) / np.sum((df[t] - t_bar) ** 2))
+    return np.array([beta1 - z * se, beta1 + z * se])
+
+
+def _reference(dataset, prediction, y, t, fn, scale, min_periods=30, steps=100):
+    size = dataset.shape[0]
+    ordered_df = dataset.sort_values(prediction, ascending=False).reset_index(drop=True)
+    n_rows = list(range(min_periods, size, size // steps)) + [size]
+    return np.array([
+        fn(ordered_df.head(rows), y, t) * (rows / size if scale else 1)
+        for rows in n_rows
+    ])
+
+
+@pytest.fixture(scope="module")
+def scored() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    n = 2_345
+    x = rng.normal(size=n)
+    price = rng.integers(3, 10, size=n).astype(float)
+    sales = 200 + (-2 - x) * price + rng.normal(0, 3, size=n)
+    pred = np.round(-x + rng.normal(0, 0.5, size=n), 1)  # rounded -> many ties
+    return pd.DataFrame({"pred": pred, "sales": sales, "price": price})
+
+
+# =============================================================================
+# Equivalence Tests
+# =============================================================================
+
+
+class TestMatchesReference:
+    """Vectorized curves reproduce the quadratic reference implementation."""
+
+    def test_cumulative_gain(self, scored):
+        expected = _reference(scored, "pred", "sales", "price", _elast, scale=True)
+        result = cumulative_gain(scored, "pred", "sales", "price")
+        np.testing.assert_allclose(result, expected, rtol=1e-9)
+
+    def test_cumulative_gain_ci(self, scored):
+        expected = _reference(scored, "pred", "sales", "price", _elast_ci, scale=True)
+        result = cumulative_gain_ci(scored, "pred", "sales", "price")
+        assert result.shape == expected.shape
+        np.testing.assert_allclose(result, expected, rtol=1e-9)
+
+    def test_cumulative_elast_curve_ci(self, scored):
+        expected = _reference(scored, "pred", "sales", "price", _elast_ci, scale=False)
+        result = cumulative_elast_curve_ci(scored, "pred", "sales", "price")
+        np.testing.assert_allclose(result, expected, rtol=1e-9)
+
+    def test_final_point_is_ate(self, scored):
+        curve = cumulative_elast_curve(scored, "pred", "sales", "price")
+        assert curve[-1] == pytest.approx(_elast(scored, "sales", "price"), rel=1e-12)
+
+
+class TestGrid:
+    """Step grid and explicit prefix sizes."""
+
+    def test_row_grid_matches_range(self):
+        expected = list(range(30, 1234, 1234 // 100)) + [1234]
+        assert row_grid(1234).tolist() == expected
+
+    def test_all_points(self, scored):
+        curve = cumulative_curve(scored, "pred", "sales", "price", steps=None)
+        assert len(curve) == len(scored) - 30 + 1
+        assert curve["rows"].iloc[-1] == len(scored)
+
+    def test_explicit_rows(self, scored):
+        curve = cumulative_curve(scored, "pred", "sales", "price", rows=[100, 500])
+        ordered = scored.sort_values("pred", ascending=False)
+        assert curve["elast"].iloc[1] == pytest.approx(
+            _elast(ordered.head(500), "sales", "price"), rel=1e-10
+        )
+
+
+# =============================================================================
+# Streaming Gain
+# =============================================================================
+
+
+def _chunks(df: pd.DataFrame, size: int = 500):
+    for start in range(0, len(df), size):
+        yield df.iloc[start:start + size]
+
+
+class TestStreamingGain:
+    """Binned sufficient statistics reproduce the exact curve at the knots."""
+
+    def test_knots_are_exact(self, scored):
+        edges = quantile_edges(_chunks(scored), "pred", n_bins=50)
+        sketch = StreamingGain.from_chunks(_chunks(scored), "pred", "sales", "price", edges=edges)
+        approx = sketch.curve()
+        exact = cumulative_curve(scored, "pred", "sales", "price", rows=approx["rows"])
+        np.testing.assert_allclose(approx["gain"], exact["gain"], rtol=1e-8)
+        np.testing.assert_allclose(approx["elast_se"], exact["elast_se"], rtol=1e-8)
+        assert sketch.n_rows == len(scored)
+
+    def test_merge_matches_single_pass(self, scored):
+        edges = quantile_edges([scored], "pred", n_bins=40)
+        whole = StreamingGain(edges).update(scored, "pred", "sales", "price")
+        left = StreamingGain(edges).update(scored.iloc[:1000], "pred", "sales", "price")
+        right = StreamingGain(edges).update(scored.iloc[1000:], "pred", "sales", "price")
+        merged = left.merge(right)
+        np.testing.assert_allclose(merged.curve()["gain"], whole.curve()["gain"], rtol=1e-8)
+
+    def test_error_report(self, scored):
+        sketch = StreamingGain.from_chunks(_chunks(scored), "pred", "sales", "price", n_bins=100)
+        report = gain_curve_error(sketch, scored, "pred", "sales", "price")
+        assert report["max_abs_error"] < 0.5
+        assert abs(report["auuc_error"]) < 0.05
+        assert report["auuc_exact"] == auuc(scored, "pred", "sales", "price")
+        assert report["auuc_streaming"] == sketch.auuc()
+
+    def test_auuc_matches_in_memory_definition(self, scored):
+        # With one row per bin every prefix is a knot, so the areas agree exactly
+        data = scored.assign(pred=scored["pred"] + np.linspace(0, 1e-3, len(scored)))
+        edges = np.unique(data["pred"].to_numpy())[1:]
+        sketch = StreamingGain(edges).update(data, "pred", "sales", "price")
+        for steps in (100, None):
+            np.testing.assert_allclose(sketch.auuc(steps=steps),
+                                       auuc(data, "pred", "sales", "price", steps=steps),
+                                       rtol=1e-8)
@@ -0,0 +1,244 @@
+"""
+Tests for facure_augment.inference.
+
+Checks the weight-matrix estimators against the resample-and-refit loops
+from the propensity-score and orthogonalization notebooks, and the
+multiplier bootstrap against analytic and resampling standard errors.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from facure_augment.inference import (
+    aipw_influence,
+    aipw_statistic,
+    bootstrap,
+    bootstrap_weights,
+    hajek_influence,
+    hajek_statistic,
+    iptw_statistic,
+    iter_bootstrap_weights,
+    multiplier_bootstrap,
+    multiplier_weights,
+    residual_influence,
+    residual_statistic,
+)
+
+
+# =============================================================================
+# Reference Implementations (notebooks)
+# =============================================================================
+
+
+def hajek_ate(Y, T, ps):
+    """11_propensity_score/02_iptw.ipynb"""
+    w1 = T / ps
+    w0 = (1 - T) / (1 - ps)
+    return np.sum(w1 * Y) / np.sum(w1) - np.sum(w0 * Y) / np.sum(w0)
+
+
+def tau_resid(T_star, Y_star):
+    """A2_orthogonalization/03_cross_fitting.ipynb (bootstrap_tau body)"""
+    return np.sum(T_star * Y_star) / np.sum(T_star ** 2)
+
+
+@pytest.fixture
+def observational():
+    rng = np.random.default_rng(0)
+    n = 400
+    X = rng.normal(size=n)
+    ps = 1 / (1 + np.exp(-0.8 * X))
+    T = rng.binomial(1, ps).astype(float)
+    mu0 = 1 + X
+    mu1 = mu0 + 2
+    Y = np.where(T == 1, mu1, mu0) + rng.normal(size=n)
+    return Y, T, ps, mu0, mu1
+
+
+def _indices(W):
+    units = np.arange(W.shape[1])
+    return [np.repeat(units, w.astype(int)) for w in W]
+
+
+# =============================================================================
+# Weights
+# =============================================================================
+
+
+class TestWeights:
+    def test_multinomial_rows_sum_to_n(self):
+        W = bootstrap_weights(50, 20)
+        assert W.shape == (20, 50)
+        np.testing.assert_array_equal(W.sum(axis=1), 50)
+
+    @pytest.mark.parametrize("scheme", ["multinomial", "poisson"])
+    def test_chunking_is_invisible(self, scheme):
+        whole = bootstrap_weights(30, 25, scheme=scheme, seed=3)
+        chunks = np.vstack(list(iter_bootstrap_weights(30, 25, scheme, 3, chunk_size=4)))
+        np.testing.assert_array_equal(whole, chunks)
+
+    def test_cluster_weights_constant_within_cluster(self):
+        clusters = np.repeat(["a", "b", "c", "d"], 5)
+        W = bootstrap_weights(20, 10, clusters=clusters)
+        for block in W.reshape(10, 4, 5):
+            assert (block == block[:, :1]).all()
+        np.testing.assert_array_equal(W.sum(axis=1), 20)
+
+    def test_unknown_scheme(self):
+        with pytest.raises(ValueError, match="Unknown scheme"):
+            bootstrap_weights(10, 5, scheme="bayes")
+
+
+# =============================================================================
+# Weighted Estimators
+# =============================================================================
+
+
+class TestStatistics:
+    def test_hajek_matches_resample_loop(self, observational):
+        Y, T, ps, *_ = observational
+        W = bootstrap_weights(len(Y), 50)
+        expected = [hajek_ate(Y[i], T[i], ps[i]) for i in _indices(W)]
+        np.testing.assert_allclose(hajek_statistic(W, Y, T, ps), expected)
+
+    def test_residual_matches_resample_loop(self, observational):
+        Y, T, ps, mu0, _ = observational
+        W = bootstrap_weights(len(Y), 50, scheme="poisson")
+        y, t = Y - mu0, T - ps
+        expected = [tau_resid(t[i], y[i]) for i in _indices(W)]
+        np.testing.assert_allclose(residual_statistic(W, y, t), expected)
+
+    def test_ones_give_point_estimate(self, observational):
+        Y, T, ps, mu0, mu1 = observational
+        ones = np.ones(len(Y))
+        assert np.isclose(hajek_statistic(ones, Y, T, ps), hajek_ate(Y, T, ps))
+        ht = np.mean(T * Y / ps - (1 - T) * Y / (1 - ps))
+        assert np.isclose(iptw_statistic(ones, Y, T, ps), ht)
+
+    @pytest.mark.parametrize("name", ["iptw", "hajek", "aipw", "residual"])
+    def test_analytic_se_tracks_bootstrap_sd(self, observational, name):
+        Y, T, ps, mu0, mu1 = observational
+        args = {
+            "iptw": (iptw_statistic, (Y, T, ps)),
+            "hajek": (hajek_statistic, (Y, T, ps)),
+            "aipw": (aipw_statistic, (Y, T, ps, mu0, mu1)),
+            "residual": (residual_statistic, (Y - mu0, T - ps)),
+        }
+        statistic, data = args[name]
+        _, se = statistic(np.ones(len(Y)), *data, return_se=True)
+        sd = bootstrap(statistic, *data, n_boot=2000)["se"]
+        assert abs(se / sd - 1) < 0.1
+
+
+# =============================================================================
+# Bootstrap and Intervals
+# =============================================================================
+
+
+class TestBootstrap:
+    def test_refit_matches_vectorized(self, observational):
+        Y, T, ps, *_ = observational
+        fast = bootstrap(hajek_statistic, Y, T, ps, n_boot=100, seed=5)
+        slow = bootstrap(hajek_ate, Y, T, ps, n_boot=100, seed=5, vectorized=False)
+        np.testing.assert_allclose(fast["draws"], slow["draws"])
+        assert np.isclose(fast["estimate"], slow["estimate"])
+
+    def test_parallel_refit(self, observational):
+        Y, T, ps, *_ = observational
+        serial = bootstrap(hajek_ate, Y, T, ps, n_boot=40, vectorized=False)
+        parallel = bootstrap(hajek_ate, Y, T, ps, n_boot=40, vectorized=False, n_jobs=2)
+        np.testing.assert_array_equal(serial["draws"], parallel["draws"])
+
+    def test_refit_accepts_pandas(self, observational):
+        Y, T, ps, *_ = observational
+        df = pd.DataFrame({"Y": Y, "T": T, "ps": ps})
+        result = bootstrap(
+            lambda d: hajek_ate(d["Y"].values, d["T"].values, d["ps"].values),
+            df, n_boot=20, vectorized=False,
+        )
+        assert np.isclose(result["estimate"], hajek_ate(Y, T, ps))
+
+    @pytest.mark.parametrize("ci", ["percentile", "bca", "studentized"])
+    def test_intervals_bracket_estimate(self, observational, ci):
+        Y, T, ps, mu0, mu1 = observational
+        result = bootstrap(aipw_statistic, Y, T, ps, mu0, mu1, n_boot=1000, ci=ci)
+        assert result["ci_lower"] < result["estimate"] < result["ci_upper"]
+        width = result["ci_upper"] - result["ci_lower"]
+        assert abs(width / (2 * 1.96 * result["se"]) - 1) < 0.15
+
+    def test_bca_jackknife_matches_refit(self, observational):
+        Y, T, ps, *_ = observational
+        Y, T, ps = Y[:80], T[:80], ps[:80]
+        fast = bootstrap(hajek_statistic, Y, T, ps, n_boot=200, ci="bca")
+        slow = bootstrap(hajek_ate, Y, T, ps, n_boot=200, ci="bca", vectorized=False)
+        assert np.isclose(fast["ci_lower"], slow["ci_lower"])
+        assert np.isclose(fast["ci_upper"], slow["ci_upper"])
+
+    def test_studentized_requires_vectorized(self, observational):
+        Y, T, ps, *_ = observational
+        with pytest.raises(ValueError, match="Studentized"):
+            bootstrap(hajek_ate, Y, T, ps, ci="studentized", vectorized=False)
+
+
+# =============================================================================
+# Multiplier Bootstrap
+# =============================================================================
+
+
+class TestMultiplier:
+    @pytest.mark.parametrize("kind", ["rademacher", "gaussian", "mammen"])
+    def test_moments(self, kind):
+        xi = multiplier_weights((200, 1000), kind, np.random.default_rng(0))
+        assert abs(xi.mean()) < 0.01
+        assert abs(xi.var() - 1) < 0.01
+        if kind == "mammen":
+            assert abs(np.mean(xi ** 3) - 1) < 0.05
+
+    def test_unknown_kind(self):
+        with pytest.raises(ValueError, match="Unknown multiplier"):
+            multiplier_weights((2, 2), "uniform")
+
+    @pytest.mark.parametrize("influence,args", [
+        (aipw_influence, lambda d: d),
+        (hajek_influence, lambda d: d[:3]),
+        (residual_influence, lambda d: (d[0] - d[3], d[1] - d[2])),
+    ])
+    def test_matches_analytic_se(self, observational, influence, args):
+        data = args(observational)
+        estimate, psi = influence(*data)
+        result = multiplier_bootstrap(psi, estimate, n_boot=4000)
+        analytic = psi.std() / np.sqrt(len(psi))
+        assert abs(result["se"] / analytic - 1) < 0.05
+        assert result["ci_lower"] < estimate < result["ci_upper"]
+
+    def test_influence_estimates_match_statistics(self, observational):
+        Y, T, ps, mu0, mu1 = observational
+        ones = np.ones(len(Y))
+        assert np.isclose(aipw_influence(Y, T, ps, mu0, mu1)[0],
+                          aipw_statistic(ones, Y, T, ps, mu0, mu1))
+        assert np.isclose(hajek_influence(Y, T, ps)[0], hajek_ate(Y, T, ps))
+
+    def test_singleton_clusters_match_units(self):
+        psi = np.random.default_rng(1).normal(size=300)
+        units = multiplier_bootstrap(psi, n_boot=500)
+        clusters = multiplier_bootstrap(psi, n_boot=500, clusters=np.arange(300))
+        np.testing.assert_allclose(units["draws"], clusters["draws"])
+
+    def test_clusters_widen_correlated_scores(self):
+        rng = np.random.default_rng(2)
+        clusters = np.repeat(np.arange(40), 25)
+        psi = rng.normal(size=40)[clusters] + 0.2 * rng.normal(size=1000)
+        naive = multiplier_bootstrap(psi, n_boot=2000)["se"]
+        clustered = multiplier_bootstrap(psi, n_boot=2000, clusters=clusters)["se"]
+        assert clustered > 3 * naive
+
+    def test_uniform_band_for_several_parameters(self):
+        psi = np.random.default_rng(3).normal(size=(500, 6))
+        result = multiplier_bootstrap(psi, np.zeros(6), n_boot=4000, kind="gaussian")
+        assert result["draws"].shape == (4000, 6)
+        assert 2.2 < result["crit_uniform"] < 3.1
+        assert (result["band_upper"] - result["band_lower"] >
+                result["ci_upper"] - result["ci_lower"]).all()
@@ -0,0 +1,52 @@
+"""
+Tests for lazy imports in facure_augment.common.
+"""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ["matplotlib.pyplot", "seaborn", "statsmodels.api", "scipy.stats"]
+
+
+def _run(code: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip()
+
+
+def test_star_import_defers_heavy_modules():
+    loaded = _run(
+        "import sys\n"
+        "from facure_augment.common import *\n"
+        f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    )
+    assert loaded == "[]"
+
+
+def test_star_import_exports_all_names():
+    missing = _run(
+        "import facure_augment.common as c\n"
+        "ns = {}\n"
+        "exec('from facure_augment.common import *', ns)\n"
+        "print([n for n in c.__all__ if n not in ns])"
+    )
+    assert missing == "[]"
+
+
+@pytest.mark.parametrize(
+    "expr,expected",
+    [
+        ("round(stats.norm.ppf(0.975), 2)", "1.96"),
+        ("round(float(minimize(lambda v: (v[0] - 3) ** 2, [0.0]).x[0]), 3)", "3.0"),
+        ("type(smf.ols('y ~ x', pd.DataFrame({'x': [1, 2, 3], 'y': [1, 3, 2]})).fit()).__name__",
+         "RegressionResultsWrapper"),
+        ("sm.OLS is __import__('statsmodels.api').api.OLS", "True"),
+    ],
+)
+def test_proxies_resolve_on_use(expr, expected):
+    assert _run(f"from facure_augment.common import *\nprint({expr})") == expected
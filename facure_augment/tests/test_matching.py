@@ -0,0 +1,556 @@
+"""
+Tests for facure_augment.matching.
+
+Nearest-neighbor estimates are checked against the matching helpers of the
+10_matching, 11_propensity_score and 12_doubly_robust notebooks, and greedy
+matching without replacement against a brute-force distance matrix. CEM is
+checked against the exact matching, subclassification and stratification
+helpers, and the balance tables against ``compute_smd``, ``analyze_balance``
+and ``effective_sample_size``.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.spatial.distance import cdist
+from scipy.stats import ks_2samp
+from sklearn.linear_model import LinearRegression
+from sklearn.neighbors import NearestNeighbors
+
+from facure_augment.matching import (
+    CEM,
+    Matcher,
+    balance_diagnostics,
+    balance_table,
+    coarsen,
+    ess_table,
+    love_plot,
+    matching_estimate,
+    stratum_keys,
+)
+
+
+# =============================================================================
+# Reference Implementations (10_matching, 11_propensity_score)
+# =============================================================================
+
+
+def knn_matching_att(X_treated, X_control, Y_treated, Y_control, K=1):
+    nn = NearestNeighbors(n_neighbors=K, metric='euclidean')
+    nn.fit(X_control)
+    distances, indices = nn.kneighbors(X_treated)
+    counterfactuals = Y_control[indices].mean(axis=1)
+    effects = Y_treated - counterfactuals
+    att = effects.mean()
+    se = effects.std() / np.sqrt(len(effects))
+    return {
+        'ATT': att,
+        'SE': se,
+        'mean_distance': distances.mean(),
+        'effects': effects,
+        'match_indices': indices
+    }
+
+
+def bias_corrected_matching(X_treated, X_control, Y_treated, Y_control, K=1):
+    nn = NearestNeighbors(n_neighbors=K, metric='euclidean')
+    nn.fit(X_control)
+    distances, indices = nn.kneighbors(X_treated)
+    outcome_model = LinearRegression()
+    outcome_model.fit(X_control, Y_control)
+    corrected_effects = []
+    uncorrected_effects = []
+    for i in range(len(X_treated)):
+        matched_outcomes = Y_control[indices[i]].mean()
+        uncorrected = Y_treated[i] - matched_outcomes
+        uncorrected_effects.append(uncorrected)
+        mu_treated = outcome_model.predict(X_treated[i:i+1])[0]
+        mu_matched = outcome_model.predict(X_control[indices[i]]).mean()
+        correction = mu_treated - mu_matched
+        corrected_counterfactual = matched_outcomes + correction
+        corrected = Y_treated[i] - corrected_counterfactual
+        corrected_effects.append(corrected)
+    uncorrected_effects = np.array(uncorrected_effects)
+    corrected_effects = np.array(corrected_effects)
+    return {
+        'ATT_uncorrected': uncorrected_effects.mean(),
+        'SE_uncorrected': uncorrected_effects.std() / np.sqrt(len(uncorrected_effects)),
+        'ATT_corrected': corrected_effects.mean(),
+        'SE_corrected': corrected_effects.std() / np.sqrt(len(corrected_effects)),
+    }
+
+
+def ps_matching(ps, T, Y, caliper=None, replacement=True):
+    treated_idx = np.where(T == 1)[0]
+    control_idx = np.where(T == 0)[0]
+    ps_treated = ps[treated_idx]
+    ps_control = ps[control_idx]
+    Y_treated = Y[treated_idx]
+    Y_control = Y[control_idx]
+    matched_effects = []
+    unmatched_count = 0
+    used_controls = set()
+    for i, (ps_t, y_t) in enumerate(zip(ps_treated, Y_treated)):
+        if replacement:
+            distances = np.abs(ps_control - ps_t)
+        else:
+            available = [j for j in range(len(ps_control)) if j not in used_controls]
+            if len(available) == 0:
+                unmatched_count += 1
+                continue
+            distances = np.abs(ps_control[available] - ps_t)
+        if replacement:
+            best_idx = np.argmin(distances)
+            best_distance = distances[best_idx]
+        else:
+            best_local_idx = np.argmin(distances)
+            best_idx = available[best_local_idx]
+            best_distance = distances[best_local_idx]
+        if caliper is not None and best_distance > caliper:
+            unmatched_count += 1
+            continue
+        matched_effects.append(y_t - Y_control[best_idx])
+        if not replacement:
+            used_controls.add(best_idx)
+    matched_effects = np.array(matched_effects)
+    return {
+        'ATT': matched_effects.mean(),
+        'SE': matched_effects.std() / np.sqrt(len(matched_effects)),
+        'n_matched': len(matched_effects),
+        'n_unmatched': unmatched_count,
+        'match_rate': len(matched_effects) / len(treated_idx)
+    }
+
+
+def exact_matching_att(df, outcome_col, treatment_col, match_col):
+    treated = df[df[treatment_col] == 1]
+    control = df[df[treatment_col] == 0]
+    effects = []
+    unmatched = 0
+    for idx, row in treated.iterrows():
+        matched_controls = control[control[match_col] == row[match_col]]
+        if len(matched_controls) > 0:
+            counterfactual = matched_controls[outcome_col].mean()
+            effects.append(row[outcome_col] - counterfactual)
+        else:
+            unmatched += 1
+    effects = pd.Series(effects)
+    return {
+        'ATT': effects.mean(),
+        'SE': effects.std() / np.sqrt(len(effects)),
+        'n_matched': len(effects),
+        'n_unmatched': unmatched,
+    }
+
+
+def subclassification_att(df, outcome_col, treatment_col, strata_col):
+    strata_results = []
+    n_treated_total = (df[treatment_col] == 1).sum()
+    for stratum in df[strata_col].unique():
+        stratum_df = df[df[strata_col] == stratum]
+        treated = stratum_df[stratum_df[treatment_col] == 1]
+        control = stratum_df[stratum_df[treatment_col] == 0]
+        if len(treated) > 0 and len(control) > 0:
+            effect = treated[outcome_col].mean() - control[outcome_col].mean()
+            weight = len(treated) / n_treated_total
+            strata_results.append({
+                'stratum': stratum,
+                'n_treated': len(treated),
+                'n_control': len(control),
+                'effect': effect,
+                'weight': weight,
+                'weighted_effect': effect * weight
+            })
+    strata_df = pd.DataFrame(strata_results)
+    att = strata_df['weighted_effect'].sum()
+    return att, strata_df
+
+
+def stratification_ate(df, outcome_col, treatment_col, strata_col):
+    strata_effects = []
+    for stratum in sorted(df[strata_col].unique()):
+        stratum_df = df[df[strata_col] == stratum]
+        treated = stratum_df[stratum_df[treatment_col] == 1]
+        control = stratum_df[stratum_df[treatment_col] == 0]
+        if len(treated) > 0 and len(control) > 0:
+            effect = treated[outcome_col].mean() - control[outcome_col].mean()
+            weight = len(stratum_df) / len(df)
+            strata_effects.append({'stratum': stratum, 'effect': effect, 'weight': weight})
+    strata_df = pd.DataFrame(strata_effects)
+    ate = (strata_df['effect'] * strata_df['weight']).sum()
+    return ate, strata_df
+
+
+def compute_smd(X, T, weights=None):
+    if weights is None:
+        weights = np.ones(len(T))
+    w1 = weights * T / np.sum(weights * T)
+    w0 = weights * (1-T) / np.sum(weights * (1-T))
+    smds = []
+    for j in range(X.shape[1]):
+        x = X[:, j]
+        mean1 = np.sum(w1 * x)
+        mean0 = np.sum(w0 * x)
+        var1 = np.var(x[T==1])
+        var0 = np.var(x[T==0])
+        pooled_sd = np.sqrt((var1 + var0) / 2)
+        if pooled_sd > 0:
+            smd = (mean1 - mean0) / pooled_sd
+        else:
+            smd = 0.0
+        smds.append(smd)
+    return np.array(smds)
+
+
+def analyze_balance(X_treated, X_control_matched, feature_names):
+    results = []
+    for i, name in enumerate(feature_names):
+        treat_mean = X_treated[:, i].mean()
+        control_mean = X_control_matched[:, i].mean()
+        pooled_std = np.sqrt((X_treated[:, i].var() + X_control_matched[:, i].var()) / 2)
+        smd = (treat_mean - control_mean) / pooled_std
+        results.append({
+            'feature': name,
+            'treated_mean': treat_mean,
+            'control_mean': control_mean,
+            'SMD': smd
+        })
+    return pd.DataFrame(results)
+
+
+def effective_sample_size(weights, treatment):
+    ess_treated = np.sum(weights[treatment==1])**2 / np.sum(weights[treatment==1]**2)
+    ess_control = np.sum(weights[treatment==0])**2 / np.sum(weights[treatment==0]**2)
+    return ess_treated, ess_control
+
+
+def greedy_brute_force(X_query, X_index, k=1, caliper=None):
+    """Greedy matching without replacement from the full distance matrix."""
+    D = cdist(X_query, X_index)
+    used = np.zeros(len(X_index), dtype=bool)
+    matches = np.full((len(X_query), k), -1)
+    for i in range(len(X_query)):
+        for slot in range(k):
+            d = np.where(used, np.inf, D[i])
+            j = np.argmin(d)
+            if np.isinf(d[j]) or (caliper is not None and d[j] > caliper):
+                break
+            used[j] = True
+            matches[i, slot] = j
+    return matches
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+
+@pytest.fixture
+def observational():
+    rng = np.random.default_rng(0)
+    n = 2000
+    X = rng.normal(size=(n, 3)) * [1.0, 10.0, 0.1]
+    ps = 1 / (1 + np.exp(-(X[:, 0] - 1)))
+    T = (rng.random(n) < ps).astype(int)
+    Y = X @ [1.0, 0.1, 5.0] + 2.0 * T + rng.normal(size=n)
+    return X, T, Y, ps
+
+
+@pytest.fixture
+def strata_data():
+    rng = np.random.default_rng(3)
+    n = 3000
+    df = pd.DataFrame({
+        "age": rng.integers(20, 60, n),
+        "severity": rng.random(n),
+        "region": rng.choice(["north", "south", "east"], n),
+    })
+    df["T"] = (rng.random(n) < 1 / (1 + np.exp(-(df["age"] - 40) / 10))).astype(int)
+    df["Y"] = 0.1 * df["age"] + df["severity"] + 2.0 * df["T"] + rng.normal(size=n)
+    df["stratum"] = pd.qcut(df["severity"], 5, labels=False)
+    return df
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+
+
+class TestMatcher:
+    """Index construction and queries."""
+
+    @pytest.mark.parametrize("algorithm", ["kd_tree", "ball_tree"])
+    def test_knn_matches_sklearn(self, observational, algorithm):
+        X, T, _, _ = observational
+        expected_d, expected_i = NearestNeighbors(n_neighbors=3).fit(X[T == 0]).kneighbors(X[T == 1])
+        d, i = Matcher(algorithm=algorithm, n_jobs=2, chunk_size=100).fit(X[T == 0]).query(X[T == 1], k=3)
+        np.testing.assert_array_equal(i, expected_i)
+        np.testing.assert_allclose(d, expected_d)
+
+    def test_mahalanobis_whitening(self, observational):
+        X, T, _, _ = observational
+        VI = np.linalg.inv(np.cov(X.T))
+        D = cdist(X[T == 1], X[T == 0], metric="mahalanobis", VI=VI)
+        d, i = Matcher("mahalanobis", cov=np.cov(X.T)).fit(X[T == 0]).query(X[T == 1])
+        np.testing.assert_array_equal(i[:, 0], D.argmin(axis=1))
+        np.testing.assert_allclose(d[:, 0], D.min(axis=1))
+
+    def test_sorted_index_ties(self):
+        index = np.array([3.0, 1.0, 3.0, 2.0, 1.0, 1.0])
+        d, i = Matcher().fit(index).query(np.array([1.0, 2.75, 1.5]), k=2)
+        np.testing.assert_array_equal(i, [[1, 4], [0, 2], [1, 3]])
+
+    def test_caliper(self, observational):
+        X, T, _, _ = observational
+        d, i = Matcher().fit(X[T == 0]).query(X[T == 1], k=2, caliper=1.0)
+        assert np.all((i >= 0) == np.isfinite(d))
+        assert np.all(d[np.isfinite(d)] <= 1.0)
+
+    @pytest.mark.parametrize("algorithm", ["kd_tree", "ball_tree", "sorted"])
+    @pytest.mark.parametrize("k,caliper", [(1, None), (2, None), (1, 0.05)])
+    def test_greedy_without_replacement(self, algorithm, k, caliper):
+        rng = np.random.default_rng(1)
+        dims = 1 if algorithm == "sorted" else 2
+        X_index, X_query = rng.normal(size=(600, dims)), rng.normal(size=(500, dims))
+        _, i = Matcher(algorithm=algorithm).fit(X_index).query(X_query, k, caliper, replacement=False)
+        np.testing.assert_array_equal(i, greedy_brute_force(X_query, X_index, k, caliper))
+
+    @pytest.mark.parametrize("algorithm", ["kd_tree", "ball_tree"])
+    @pytest.mark.parametrize("k", [1, 3])
+    def test_tree_ties_pick_lowest_row(self, algorithm, k):
+        rng = np.random.default_rng(2)
+        X_index = rng.integers(0, 4, size=(300, 2)).astype(float)
+        X_query = rng.integers(0, 4, size=(200, 2)).astype(float)
+        matcher = Matcher(algorithm=algorithm, chunk_size=64).fit(X_index)
+        D = cdist(X_query, X_index)
+        _, i = matcher.query(X_query, k)
+        rows = np.arange(len(X_index))
+        expected = [np.lexsort((rows, d))[:k] for d in D]
+        np.testing.assert_array_equal(i, expected)
+        _, i = matcher.query(X_query, k, replacement=False)
+        np.testing.assert_array_equal(i, greedy_brute_force(X_query, X_index, k))
+
+    def test_sorted_requires_1d(self, observational):
+        X, _, _, _ = observational
+        with pytest.raises(ValueError, match="one-dimensional"):
+            Matcher(algorithm="sorted").fit(X)
+
+
+class TestMatchingEstimate:
+    """Estimates equal the notebook functions."""
+
+    @pytest.mark.parametrize("K", [1, 4])
+    def test_knn_att(self, observational, K):
+        X, T, Y, _ = observational
+        expected = knn_matching_att(X[T == 1], X[T == 0], Y[T == 1], Y[T == 0], K=K)
+        result = matching_estimate(X, T, Y, k=K)
+        assert result["estimate"] == pytest.approx(expected["ATT"], rel=1e-12)
+        assert result["se"] == pytest.approx(expected["SE"], rel=1e-12)
+        assert result["mean_distance"] == pytest.approx(expected["mean_distance"], rel=1e-12)
+
+    def test_bias_correction(self, observational):
+        X, T, Y, _ = observational
+        expected = bias_corrected_matching(X[T == 1], X[T == 0], Y[T == 1], Y[T == 0], K=2)
+        result = matching_estimate(X, T, Y, k=2, bias_correction=True)
+        assert result["estimate"] == pytest.approx(expected["ATT_corrected"], rel=1e-10)
+        assert result["se"] == pytest.approx(expected["SE_corrected"], rel=1e-10)
+        assert result["estimate_uncorrected"] == pytest.approx(expected["ATT_uncorrected"], rel=1e-12)
+
+    @pytest.mark.parametrize("caliper", [None, 0.002])
+    @pytest.mark.parametrize("replacement", [True, False])
+    def test_ps_matching(self, observational, caliper, replacement):
+        _, T, Y, ps = observational
+        expected = ps_matching(ps, T, Y, caliper, replacement)
+        result = matching_estimate(ps, T, Y, caliper=caliper, replacement=replacement)
+        assert result["estimate"] == pytest.approx(expected["ATT"], rel=1e-12)
+        assert result["se"] == pytest.approx(expected["SE"], rel=1e-12)
+        assert result["n_matched"] == expected["n_matched"]
+        assert result["n_unmatched"] == expected["n_unmatched"]
+
+    def test_ps_matching_with_ties(self, observational):
+        _, T, Y, ps = observational
+        coarse = np.round(ps, 2)
+        for replacement in (True, False):
+            expected = ps_matching(coarse, T, Y, replacement=replacement)
+            result = matching_estimate(coarse, T, Y, replacement=replacement)
+            assert result["estimate"] == pytest.approx(expected["ATT"], rel=1e-12)
+
+    def test_ate_combines_both_directions(self, observational):
+        X, T, Y, _ = observational
+        att = matching_estimate(X, T, Y, estimand="att")
+        atc = matching_estimate(X, T, Y, estimand="atc")
+        ate = matching_estimate(X, T, Y, estimand="ate")
+        n1, n0 = (T == 1).sum(), (T == 0).sum()
+        assert ate["estimate"] == pytest.approx((n1 * att["estimate"] + n0 * atc["estimate"]) / len(T))
+        assert ate["matches"].shape == (len(T), 1)
+
+    def test_unknown_estimand(self, observational):
+        X, T, Y, _ = observational
+        with pytest.raises(ValueError, match="Unknown estimand"):
+            matching_estimate(X, T, Y, estimand="cate")
+
+
+class TestCEM:
+    """Stratum index and CEM estimates."""
+
+    def test_exact_matching(self, strata_data):
+        df = strata_data.iloc[:1500]
+        expected = exact_matching_att(df, "Y", "T", "age")
+        result = CEM(bins=None).fit(df[["age"]], df["T"]).estimate(df["Y"].to_numpy())
+        assert result["estimate"] == pytest.approx(expected["ATT"], rel=1e-12)
+        assert result["se"] == pytest.approx(expected["SE"], rel=1e-10)
+        assert result["n_matched"] == expected["n_matched"]
+        assert result["n_unmatched"] == expected["n_unmatched"]
+
+    def test_subclassification_att(self, strata_data):
+        df = strata_data
+        expected, expected_strata = subclassification_att(df, "Y", "T", "stratum")
+        cem = CEM(bins=None).fit(df[["stratum"]], df["T"])
+        assert cem.estimate(df["Y"].to_numpy())["estimate"] == pytest.approx(expected, rel=1e-12)
+        strata = cem.strata(df["Y"].to_numpy())
+        expected_strata = expected_strata.sort_values("stratum")
+        np.testing.assert_allclose(strata["effect"], expected_strata["effect"], rtol=1e-12)
+        np.testing.assert_allclose(strata["weight"], expected_strata["weight"], rtol=1e-12)
+
+    def test_stratification_ate_with_quantile_bins(self, strata_data):
+        df = strata_data
+        expected, _ = stratification_ate(df, "Y", "T", "stratum")
+        cem = CEM(bins=5, method="quantile").fit(df[["severity"]], df["T"])
+        assert cem.estimate(df["Y"].to_numpy(), "ate")["estimate"] == pytest.approx(expected, rel=1e-12)
+
+    def test_outcome_matrix(self, strata_data):
+        df = strata_data
+        cem = CEM(bins={"severity": 4}).fit(df[["age", "severity", "region"]], df["T"])
+        Y = np.column_stack([df["Y"], 3 * df["Y"] - 1, df["severity"]])
+        result = cem.estimate(Y, "atc")
+        for j in range(Y.shape[1]):
+            single = cem.estimate(Y[:, j], "atc")
+            assert result["estimate"][j] == pytest.approx(single["estimate"], rel=1e-12)
+            assert result["se"][j] == pytest.approx(single["se"], rel=1e-12)
+
+    def test_ate_combines_att_and_atc(self, strata_data):
+        df = strata_data
+        cem = CEM(bins=[8, 4]).fit(df[["age", "severity"]], df["T"])
+        Y = df["Y"].to_numpy()
+        att, atc, ate = (cem.estimate(Y, e) for e in ("att", "atc", "ate"))
+        n1, n0 = att["n_matched"], atc["n_matched"]
+        assert ate["estimate"] == pytest.approx((n1 * att["estimate"] + n0 * atc["estimate"]) / (n1 + n0))
+
+    def test_weights_reproduce_estimate(self, strata_data):
+        df = strata_data
+        cem = CEM(bins=[8, 4]).fit(df[["age", "severity"]], df["T"])
+        T, Y = df["T"].to_numpy() == 1, df["Y"].to_numpy()
+        for estimand in ("att", "ate"):
+            w = cem.weights(estimand)
+            weighted = w[T] @ Y[T] / w[T].sum() - w[~T] @ Y[~T] / w[~T].sum()
+            assert weighted == pytest.approx(cem.estimate(Y, estimand)["estimate"], rel=1e-10)
+        w = cem.weights("att")
+        result = cem.estimate(Y)
+        assert w[T].sum() == pytest.approx(result["n_matched_treated"])
+        assert w[~T].sum() == pytest.approx(result["n_matched_control"])
+
+    def test_balance_after_exact_matching(self, strata_data):
+        df = strata_data
+        balance = CEM(bins=None).fit(df[["age"]], df["T"]).balance(df[["age", "severity"]])
+        assert abs(balance.loc["age", "smd_before"]) > 0.5
+        assert balance.loc["age", "smd_after"] == pytest.approx(0, abs=1e-12)
+
+    def test_hashed_keys_for_wide_code_space(self):
+        rng = np.random.default_rng(0)
+        codes = rng.integers(0, 1000, size=(5000, 8))
+        codes[1::2] = codes[::2]
+        keys = stratum_keys(codes)
+        assert keys.dtype == np.int64
+        np.testing.assert_array_equal(keys[1::2], keys[::2])
+        assert len(np.unique(keys)) == len(np.unique(codes, axis=0))
+
+    def test_coarsen_cutpoints(self):
+        X = np.array([[0.0, 1.0], [0.5, 2.0], [1.0, 3.0]])
+        np.testing.assert_array_equal(coarsen(X, [[0.5], None]), [[0, 0], [1, 1], [1, 2]])
+        with pytest.raises(ValueError, match="one entry per column"):
+            coarsen(X, [2])
+
+
+class TestBalance:
+    """Balance tables for many covariates and weightings."""
+
+    def test_smd_matches_compute_smd(self, observational):
+        X, T, _, ps = observational
+        ipw = T / ps + (1 - T) / (1 - ps)
+        table = balance_table(X, T, {"ipw": ipw})
+        np.testing.assert_allclose(table.loc["unweighted", "smd"], compute_smd(X, T), rtol=1e-10)
+        np.testing.assert_allclose(table.loc["ipw", "smd"], compute_smd(X, T, ipw), rtol=1e-10)
+
+    def test_matched_sample_matches_analyze_balance(self, observational):
+        X, T, _, _ = observational
+        matches = matching_estimate(X, T, np.zeros(len(T)))["matches"][:, 0]
+        counts = np.where(T == 1, 1.0, np.bincount(matches, minlength=len(T)))
+        expected = analyze_balance(X[T == 1], X[matches], ["a", "b", "c"])
+        table = balance_table(X, T, counts, names=["a", "b", "c"], unweighted=False,
+                              denominator="weighted").loc["weighted"]
+        np.testing.assert_allclose(table["smd"], expected["SMD"], rtol=1e-10)
+        np.testing.assert_allclose(table["mean_control"], expected["control_mean"], rtol=1e-10)
+
+    def test_ks_and_variance_ratio_unweighted(self, observational):
+        X, T, _, _ = observational
+        X = np.column_stack([X, np.round(X[:, 0])])
+        table = balance_table(X, T).loc["unweighted"]
+        expected_ks = [ks_2samp(X[T == 1, j], X[T == 0, j]).statistic for j in range(X.shape[1])]
+        np.testing.assert_allclose(table["ks"], expected_ks, rtol=1e-12)
+        ratio = X[T == 1].var(axis=0) / X[T == 0].var(axis=0)
+        np.testing.assert_allclose(table["variance_ratio"], ratio, rtol=1e-10)
+
+    def test_integer_weights_equal_replicated_rows(self, observational):
+        X, T, _, _ = observational
+        counts = np.random.default_rng(0).integers(1, 4, len(T))
+        weighted = balance_table(X, T, counts, unweighted=False).loc["weighted"]
+        replicated = balance_table(np.repeat(X, counts, axis=0), np.repeat(T, counts)).loc["unweighted"]
+        for column in ("mean_treated", "mean_control", "variance_ratio", "ks"):
+            np.testing.assert_allclose(weighted[column], replicated[column], rtol=1e-10)
+
+    def test_many_weightings_in_one_call(self, observational):
+        X, T, _, ps = observational
+        W = np.random.default_rng(1).random((len(T), 6))
+        table = balance_table(X, T, W)
+        assert table.shape[0] == 7 * X.shape[1]
+        for j in range(W.shape[1]):
+            single = balance_table(X, T, W[:, j], unweighted=False).loc["weighted"]
+            np.testing.assert_allclose(table.loc[f"w{j}"].to_numpy(), single.to_numpy(), rtol=1e-10)
+
+    def test_ess(self, observational):
+        _, T, _, ps = observational
+        ipw = T / ps + (1 - T) / (1 - ps)
+        ess = ess_table(T, {"ipw": ipw}).loc["ipw"]
+        expected = effective_sample_size(ipw, T)
+        assert ess["ess_treated"] == pytest.approx(expected[0], rel=1e-12)
+        assert ess["ess_control"] == pytest.approx(expected[1], rel=1e-12)
+
+    def test_diagnostics_summary(self, observational):
+        X, T, _, ps = observational
+        weights = {"ipw": T / ps + (1 - T) / (1 - ps), "overlap": T * (1 - ps) + (1 - T) * ps}
+        result = balance_diagnostics(X, T, weights)
+        summary = result["summary"]
+        assert list(summary.index) == ["unweighted", "ipw", "overlap"]
+        assert summary.loc["ipw", "max_abs_smd"] == pytest.approx(np.abs(compute_smd(X, T, weights["ipw"])).max())
+        assert summary.loc["ipw", "max_abs_smd"] < summary.loc["unweighted", "max_abs_smd"]
+        assert not summary.loc["unweighted", "balanced"]
+
+    def test_invalid_weights(self, observational):
+        X, T, _, _ = observational
+        with pytest.raises(ValueError, match="non-negative"):
+            balance_table(X, T, -np.ones(len(T)))
+        with pytest.raises(ValueError, match="both arms"):
+            balance_table(X, T, T.astype(float), unweighted=False)
+
+    def test_love_plot(self, observational):
+        matplotlib = pytest.importorskip("matplotlib")
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+
+        X, T, _, ps = observational
+        table = balance_table(X, T, {"ipw": T / ps + (1 - T) / (1 - ps)}, names=["a", "b", "c"])
+        ax = love_plot(table)
+        assert [t.get_text() for t in ax.get_yticklabels()][-1] == "a"
+        plt.close(ax.figure)
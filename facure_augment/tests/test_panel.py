@@ -0,0 +1,364 @@
+"""
+Tests for facure_augment.panel.
+
+Fixed-effects fits are checked against statsmodels dummy-variable
+regressions and the helpers from the 13_difference_in_differences and
+24_did_saga notebooks; event-study specifications against one refit each.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.formula.api as smf
+
+from facure_augment.panel import (
+    EventStudy,
+    absorbed_ols,
+    cell_dummies,
+    demean,
+    feols,
+    group_codes,
+)
+
+
+# =============================================================================
+# Reference Implementations (24_did_saga, 13_difference_in_differences)
+# =============================================================================
+
+
+def notebook_demean(df, col_to_demean):
+    return df.assign(**{
+        col_to_demean: (
+            df[col_to_demean]
+            - df.groupby("unit")[col_to_demean].transform("mean")
+            - df.groupby("date")[col_to_demean].transform("mean")
+            + df[col_to_demean].mean()
+        )
+    })
+
+
+def run_event_study(df):
+    rel_times = sorted(df['rel_time'].unique())
+
+    def make_var_name(rt):
+        if rt < 0:
+            return f'rt_m{abs(rt)}'
+        else:
+            return f'rt_p{rt}'
+
+    for rt in rel_times:
+        var_name = make_var_name(rt)
+        df[var_name] = ((df['rel_time'] == rt) & (df['treated'] == 1)).astype(int)
+
+    rt_vars = [make_var_name(rt) for rt in rel_times if rt != -1]
+    formula = 'y ~ treated + C(period) + ' + ' + '.join(rt_vars)
+    model = smf.ols(formula, data=df).fit()
+    return model, rt_vars
+
+
+def pretrends_test(df):
+    model, rt_vars = run_event_study(df)
+    pre_vars = [v for v in rt_vars if v.startswith("rt_m")]
+    restrictions = ' = '.join(pre_vars) + ' = 0'
+    return model.f_test(restrictions)
+
+
+@pytest.fixture(scope="module")
+def trends_panel():
+    """03_parallel_trends simulation (non-parallel trends)."""
+    np.random.seed(42)
+    units = np.repeat(np.arange(400), 6)
+    periods = np.tile(np.arange(6), 400)
+    treated = (units >= 200).astype(int)
+    y0 = 100 + np.where(treated == 0, 2.0 * periods, 4.0 * periods)
+    y = y0 + 5.0 * treated * (periods >= 4) + np.random.normal(0, 5, len(units))
+    df = pd.DataFrame({"unit": units, "period": periods, "treated": treated, "y": y})
+    df["rel_time"] = df["period"] - 4
+    return df
+
+
+@pytest.fixture(scope="module")
+def staggered_panel():
+    """03_flexible_twfe panel (40 units), 20% of rows dropped, random weights."""
+    date = pd.date_range("2021-05-01", "2021-07-31", freq="D")
+    cohorts = pd.to_datetime(["2021-06-01", "2021-07-15", "2022-01-01"])
+    units = range(1, 40 + 1)
+    np.random.seed(1)
+    df = pd.DataFrame(dict(
+        date=np.tile(date, len(units)),
+        unit=np.repeat(units, len(date)),
+        cohort=np.repeat(np.random.choice(cohorts, len(units)), len(date)),
+        unit_fe=np.repeat(np.random.normal(0, 5, size=len(units)), len(date)),
+        time_fe=np.tile(np.random.normal(size=len(date)), len(units)),
+        w_seas=np.tile(abs(5 - date.weekday) % 7, len(units)),
+    )).assign(
+        trend=lambda d: (d["date"] - d["date"].min()).dt.days / 70,
+        treat=lambda d: (d["date"] >= d["cohort"]).astype(int),
+    ).assign(
+        y0=lambda d: 10 + d["trend"] + 0.2 * d["unit_fe"] + 0.05 * d["time_fe"]
+        + d["w_seas"] / 50 + np.random.normal(0, 0.1, len(d)),
+    ).assign(
+        y1=lambda d: d["y0"] + np.minimum(
+            0.1 * np.maximum(0, (d["date"] - d["cohort"]).dt.days), 1.0),
+    ).assign(
+        installs=lambda d: np.where(d["treat"] == 1, d["y1"], d["y0"]),
+    )
+    return df, df.sample(frac=0.8, random_state=0).assign(
+        w=lambda d: np.random.uniform(0.5, 2, len(d))).reset_index(drop=True)
+
+
+# =============================================================================
+# Demeaning
+# =============================================================================
+
+
+class TestDemean:
+    def test_balanced_matches_notebook(self, staggered_panel):
+        df, _ = staggered_panel
+        ours, info = demean(df[["installs", "treat"]].to_numpy(float),
+                            group_codes(df, ["unit", "date"]))
+        for j, col in enumerate(["installs", "treat"]):
+            np.testing.assert_allclose(ours[:, j], notebook_demean(df, col)[col], atol=1e-8)
+        assert info["converged"] and info["n_iter"] <= 3
+
+    def test_unbalanced_weighted_means_vanish(self, staggered_panel):
+        _, df = staggered_panel
+        codes = group_codes(df, ["unit", "date", ("cohort", "w_seas")])
+        w = df["w"].to_numpy()
+        yd, info = demean(df["installs"].to_numpy(), codes, w, tol=1e-12)
+        assert info["converged"]
+        for c in codes:
+            assert np.abs(np.bincount(c, w * yd) / np.bincount(c, w)).max() < 1e-9
+
+    def test_interacted_dimension(self, staggered_panel):
+        df, _ = staggered_panel
+        (codes,) = group_codes(df, [("unit", "w_seas")])
+        assert codes.max() + 1 == len(df.drop_duplicates(["unit", "w_seas"]))
+
+
+# =============================================================================
+# Estimation
+# =============================================================================
+
+
+class TestFixedEffectsOLS:
+    def test_weighted_twfe_matches_dummies(self, staggered_panel):
+        _, df = staggered_panel
+        model = smf.wls("installs ~ treat + C(unit) + C(date)",
+                        data=df, weights=df["w"]).fit()
+        fit = feols(df, "installs", ["treat"], fe=["unit", "date"], weights="w")
+        assert fit["params"]["treat"] == pytest.approx(model.params["treat"], rel=1e-8)
+        assert fit["se"]["treat"] == pytest.approx(model.bse["treat"], rel=1e-6)
+        assert fit["df_resid"] == model.df_resid
+
+    def test_clustered_se_matches_statsmodels(self, staggered_panel):
+        _, df = staggered_panel
+        model = smf.ols("installs ~ treat + C(unit) + C(date)", data=df).fit(
+            cov_type="cluster", cov_kwds={"groups": df["unit"]})
+        fit = feols(df, "installs", ["treat"], cluster="unit")
+        assert fit["se"]["treat"] == pytest.approx(model.bse["treat"], rel=1e-6)
+
+    def test_absorbed_regressor_is_dropped(self, staggered_panel):
+        _, df = staggered_panel
+        fit = feols(df, "installs", ["treat", "unit_fe"])
+        assert np.isnan(fit["params"]["unit_fe"]) and np.isfinite(fit["params"]["treat"])
+        assert fit["dropped"] == ["unit_fe"]
+
+    def test_collinear_after_absorption_is_dropped(self, staggered_panel):
+        _, df = staggered_panel
+        # Differs from 2·trend only by a unit constant, so collinear once demeaned
+        df = df.assign(shifted=2 * df["trend"] + df["unit_fe"])
+        fit = feols(df, "installs", ["treat", "trend", "shifted"], fe="unit")
+        alone = feols(df, "installs", ["treat", "trend"], fe="unit")
+        assert fit["dropped"] == ["shifted"]
+        np.testing.assert_allclose(fit["params"][["treat", "trend"]], alone["params"], rtol=1e-8)
+        np.testing.assert_allclose(fit["se"][["treat", "trend"]], alone["se"], rtol=1e-8)
+        assert fit["df_resid"] == alone["df_resid"]
+
+    def test_requires_regressors(self, staggered_panel):
+        _, df = staggered_panel
+        with pytest.raises(ValueError, match="regressors or interact"):
+            feols(df, "installs", fe=["unit", "date"])
+        with pytest.raises(ValueError, match="absorbed"):
+            feols(df, "installs", ["unit_fe"], fe="unit")
+
+    def test_three_way_matches_dummies(self, staggered_panel):
+        _, df = staggered_panel
+        model = smf.ols("installs ~ treat + C(unit) + C(date) + C(cohort):C(w_seas)",
+                        data=df).fit()
+        codes = group_codes(df, ["unit", "date", ("cohort", "w_seas")])
+        fit = absorbed_ols(df["installs"], df[["treat"]], codes, names=["treat"], tol=1e-12)
+        assert fit["params"]["treat"] == pytest.approx(model.params["treat"], rel=1e-7)
+
+
+class TestFlexibleSpecifications:
+    def test_cell_dummies_match_feature_eng(self, staggered_panel):
+        df, _ = staggered_panel
+        data = df.astype({"cohort": str, "date": str})
+
+        def feature_eng(df):
+            return df.assign(
+                date_0601=np.where(df["date"] >= "2021-06-01", df["date"], "control"),
+                date_0715=np.where(df["date"] >= "2021-07-15", df["date"], "control"),
+                cohort_0601=(df["cohort"] == "2021-06-01").astype(float),
+                cohort_0715=(df["cohort"] == "2021-07-15").astype(float),
+            )
+
+        model = smf.ols("""installs ~ treat:cohort_0601:C(date_0601)
+                                    + treat:cohort_0715:C(date_0715)
+                                    + C(unit) + C(date)""", data=data.pipe(feature_eng)).fit()
+        params = model.params[model.params.index.str.contains("treat")
+                              & ~model.params.index.str.contains("control")]
+        fit = feols(data, "installs", interact=["cohort", "date"], where="treat")
+        assert len(fit["params"]) == len(params)
+        np.testing.assert_allclose(np.sort(fit["params"]), np.sort(params), atol=1e-10)
+
+        X, names = cell_dummies(data, ["cohort", "date"], where="treat")
+        assert ["treat:" + name for name in names] == list(fit["params"].index)
+        att = (X @ fit["params"].to_numpy())[data["treat"] == 1].mean()
+        flexible = smf.ols("installs ~ treat:C(cohort):C(date) + C(unit) + C(date)",
+                           data=data).fit()
+        effect = data["installs"] - flexible.predict(data.assign(treat=0))
+        assert att == pytest.approx(effect[data["treat"] == 1].mean(), abs=1e-8)
+
+    def test_run_event_study_spec(self):
+        rng = np.random.default_rng(42)
+        units, periods = np.repeat(np.arange(400), 6), np.tile(np.arange(6), 400)
+        treated = (units >= 200).astype(int)
+        y = 100 + 2.0 * periods + 5.0 * treated * (periods >= 4) + rng.normal(0, 5, len(units))
+        df = pd.DataFrame({"unit": units, "period": periods, "treated": treated, "y": y,
+                           "rel_time": periods - 4})
+        model, rt_vars = run_event_study(df)
+        fit = feols(df, "y", ["treated"] + rt_vars, fe="period")
+        np.testing.assert_allclose(fit["params"][rt_vars], model.params[rt_vars], rtol=1e-8)
+        np.testing.assert_allclose(fit["se"][rt_vars], model.bse[rt_vars], rtol=1e-6)
+
+
+# =============================================================================
+# Event Studies
+# =============================================================================
+
+
+@pytest.fixture(scope="module")
+def event_panel():
+    """Staggered panel: cohorts 5 and 8 of 12 periods plus never treated."""
+    rng = np.random.default_rng(3)
+    n_units, n_periods = 90, 12
+    cohort = np.repeat([5.0, 8.0, np.nan], n_units // 3)
+    df = pd.DataFrame({
+        "unit": np.repeat(np.arange(n_units), n_periods),
+        "period": np.tile(np.arange(n_periods), n_units),
+        "cohort": np.repeat(cohort, n_periods),
+    })
+    df["rel_time"] = df["period"] - df["cohort"]
+    effect = np.where(df["rel_time"] >= 0, 1.0 + 0.3 * df["rel_time"].fillna(0), 0.0)
+    df["x"] = rng.normal(size=len(df))
+    df["y"] = (rng.normal(size=n_units)[df["unit"]] + 0.2 * df["period"] + effect
+               + 0.5 * df["x"] + rng.normal(size=len(df)))
+    return df.sample(frac=0.9, random_state=1).reset_index(drop=True)
+
+
+@pytest.fixture(scope="module")
+def all_treated_panel():
+    """Staggered panel in which every unit is eventually treated (cohorts 5, 8, 11)."""
+    rng = np.random.default_rng(4)
+    n_units, n_periods = 90, 14
+    df = pd.DataFrame({
+        "unit": np.repeat(np.arange(n_units), n_periods),
+        "period": np.tile(np.arange(n_periods), n_units),
+        "cohort": np.repeat(np.repeat([5.0, 8.0, 11.0], n_units // 3), n_periods),
+    })
+    df["rel_time"] = df["period"] - df["cohort"]
+    df["x"] = rng.normal(size=len(df))
+    df["y"] = (rng.normal(size=n_units)[df["unit"]] + 0.2 * df["period"]
+               + (df["rel_time"] >= 0) + 0.5 * df["x"] + rng.normal(size=len(df)))
+    return df
+
+
+def refit_event_study(df, window, reference, bin_endpoints, by_cohort=False, cluster=None):
+    """One feols fit with explicit indicator columns."""
+    references = {reference} if np.isscalar(reference) else set(reference)
+    rel = df["rel_time"].clip(*window) if bin_endpoints else df["rel_time"]
+    inside = rel.between(*window) & ~rel.isin(references)
+    data = df.assign(rel=rel.where(inside), active=inside)
+    cols = ["cohort", "rel"] if by_cohort else ["rel"]
+    return feols(data, "y", ["x"], fe=["unit", "period"], interact=cols, where="active",
+                 cluster=cluster)
+
+
+class TestEventStudy:
+    def test_matches_run_event_study(self, trends_panel):
+        df = trends_panel.assign(rel=lambda d: d["rel_time"].where(d["treated"] == 1))
+        model, rt_vars = run_event_study(trends_panel.copy())
+        fit = EventStudy(df, "y", "rel", fe="period", regressors=["treated"]).fit()
+        np.testing.assert_allclose(fit["coefficients"]["estimate"], model.params[rt_vars])
+        np.testing.assert_allclose(fit["coefficients"]["se"], model.bse[rt_vars])
+
+        f_test = pretrends_test(trends_panel.copy())
+        assert fit["pretrend"]["f_stat"] == pytest.approx(float(np.squeeze(f_test.fvalue)))
+        assert fit["pretrend"]["p_value"] == pytest.approx(float(f_test.pvalue), rel=1e-6)
+
+    @pytest.mark.parametrize("window, reference, bin_endpoints", [
+        ((-3, 3), -1, True),
+        ((-3, 3), -1, False),
+        ((-4, 5), (-1, -4), True),
+    ])
+    def test_specifications_match_refits(self, event_panel, window, reference, bin_endpoints):
+        study = EventStudy(event_panel, "y", "rel_time", fe=["unit", "period"],
+                           regressors=["x"], cluster="unit")
+        fit = study.fit(window, reference, bin_endpoints)
+        refit = refit_event_study(event_panel, window, reference, bin_endpoints, cluster="unit")
+        event = refit["params"].drop("x")
+        np.testing.assert_allclose(fit["coefficients"]["estimate"], event, rtol=1e-7)
+        np.testing.assert_allclose(fit["coefficients"]["se"], refit["se"].drop("x"), rtol=1e-6)
+        assert fit["controls"]["estimate"]["x"] == pytest.approx(refit["params"]["x"])
+
+    def test_by_cohort_matches_interacted_refit(self, event_panel):
+        study = EventStudy(event_panel, "y", "rel_time", fe=["unit", "period"],
+                           cohort="cohort", regressors=["x"])
+        fit = study.fit((-4, 3), -1, by_cohort=True)
+        refit = refit_event_study(event_panel, (-4, 3), -1, True, by_cohort=True)
+        np.testing.assert_allclose(fit["coefficients"]["estimate"],
+                                   refit["params"].drop("x"), rtol=1e-7)
+        aggregate = fit["aggregate"].set_index("rel_time")["estimate"]
+        assert aggregate[2] == pytest.approx(1.6, abs=0.5)
+        with pytest.raises(ValueError, match="cohort"):
+            EventStudy(event_panel, "y", "rel_time", fe=["unit", "period"]).fit(by_cohort=True)
+
+    def test_column_blocks_match_single_block(self, event_panel, monkeypatch):
+        spec = dict(fe=["unit", "period"], cohort="cohort", regressors=["x"], cluster="unit")
+        single = EventStudy(event_panel, "y", "rel_time", **spec).fit(by_cohort=True)
+        monkeypatch.setattr("facure_augment.panel.event_study._BLOCK", 3)
+        blocked = EventStudy(event_panel, "y", "rel_time", **spec).fit(by_cohort=True)
+        for key in ("estimate", "se"):
+            np.testing.assert_allclose(blocked["coefficients"][key],
+                                       single["coefficients"][key], rtol=1e-6)
+
+    @pytest.mark.parametrize("reference", [-1, (-1, -5)])
+    def test_collinear_columns_without_never_treated(self, all_treated_panel, reference):
+        study = EventStudy(all_treated_panel, "y", "rel_time", fe=["unit", "period"],
+                           cohort="cohort", regressors=["x"], cluster="unit")
+        fit = study.fit(reference=reference)
+        refit = refit_event_study(all_treated_panel, (-11, 8), reference, True, cluster="unit")
+        assert fit["dropped"]
+        coefficients = fit["coefficients"].set_index("rel_time")
+        assert coefficients.loc[fit["dropped"], "estimate"].isna().all()
+        np.testing.assert_allclose(coefficients["estimate"], refit["params"].drop("x"), rtol=1e-7)
+        np.testing.assert_allclose(coefficients["se"], refit["se"].drop("x"), rtol=1e-6)
+        assert np.isfinite(fit["pretrend"]["p_value"])
+        assert fit["controls"]["estimate"]["x"] == pytest.approx(refit["params"]["x"])
+        by_cohort = study.fit(reference=reference, by_cohort=True)
+        assert by_cohort["dropped"] and by_cohort["aggregate"]["estimate"].notna().any()
+
+    def test_grid_matches_single_fits(self, event_panel):
+        study = EventStudy(event_panel, "y", "rel_time", fe=["unit", "period"], cohort="cohort")
+        coefs, pretrends = study.fit_grid(windows=[(-3, 3), (-5, 5)],
+                                          references=[-1, (-1, -5)], by_cohort=(False, True))
+        assert len(pretrends) == 8
+        single = study.fit((-5, 5), (-1, -5))
+        row = pretrends[(pretrends["window"] == (-5, 5)) & ~pretrends["by_cohort"]
+                        & (pretrends["reference"] == (-1, -5))]
+        assert row["p_value"].iloc[0] == pytest.approx(single["pretrend"]["p_value"])
+        assert pretrends["p_value"].gt(0.01).all()
@@ -0,0 +1,427 @@
+"""
+Tests for facure_augment.rdd.
+
+Bandwidth sweeps are checked against ``rdd_local_linear`` of the
+02_rdd_estimation notebook (one statsmodels WLS fit per bandwidth), and
+hat-matrix leave-one-out residuals against explicit refits without each
+unit. Density tests are checked against ``simple_density_test`` of the
+03_fuzzy_rdd notebook (window counts) and a direct McCrary fit to
+``np.histogram`` heights, and fuzzy Wald estimates against the notebook's
+separate first-stage and reduced-form regressions.
+"""
+
+from __future__ import annotations
+
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.formula.api as smf
+from scipy import stats
+
+from facure_augment.rdd import (
+    RunningHistogram,
+    density_test,
+    fuzzy_rdd,
+    loo_bandwidth,
+    rdd_local_linear,
+    rdd_sweep,
+    sensitivity_plot,
+    triangular_kernel,
+    uniform_kernel,
+)
+
+
+# =============================================================================
+# Reference Implementations (02_rdd_estimation, 03_fuzzy_rdd)
+# =============================================================================
+
+
+def notebook_rdd_local_linear(data, outcome, bandwidth, kernel='triangular'):
+    # Compute weights
+    if kernel == 'triangular':
+        weights = triangular_kernel(data['age_centered'], bandwidth)
+    else:
+        weights = uniform_kernel(data['age_centered'], bandwidth)
+
+    # Filter to observations within bandwidth
+    in_bandwidth = weights > 0
+    data_bw = data[in_bandwidth].copy()
+    weights_bw = weights[in_bandwidth]
+
+    # WLS regression
+    model = smf.wls(
+        f'{outcome} ~ age_centered * above_21',
+        data=data_bw,
+        weights=weights_bw
+    ).fit()
+
+    return {
+        'estimate': model.params['above_21'],
+        'se': model.bse['above_21'],
+        'n_effective': in_bandwidth.sum(),
+        'bandwidth': bandwidth,
+        'model': model
+    }
+
+
+def simple_density_test(data, score_col, cutoff=0, bandwidth=5):
+    below = data[(data[score_col] >= cutoff - bandwidth) & (data[score_col] < cutoff)]
+    above = data[(data[score_col] >= cutoff) & (data[score_col] < cutoff + bandwidth)]
+
+    # Use person_years as weights
+    n_below = below['person_years'].sum() if 'person_years' in data.columns else len(below)
+    n_above = above['person_years'].sum() if 'person_years' in data.columns else len(above)
+
+    # Simple chi-squared test for equal proportions
+    total = n_below + n_above
+    expected = total / 2
+    chi2 = (n_below - expected)**2 / expected + (n_above - expected)**2 / expected
+    pvalue = 1 - stats.chi2.cdf(chi2, df=1)
+
+    return {
+        'n_below': n_below,
+        'n_above': n_above,
+        'ratio': n_above / n_below if n_below > 0 else np.inf,
+        'chi2': chi2,
+        'pvalue': pvalue
+    }
+
+
+def notebook_fuzzy_rdd(sheepskin, outcome='avgearnings'):
+    first_stage = smf.ols('receivehsd ~ minscore * above_cutoff', data=sheepskin).fit()
+    first_stage_jump = first_stage.params['above_cutoff']
+    first_stage_se = first_stage.bse['above_cutoff']
+
+    reduced_form = smf.ols(f'{outcome} ~ minscore * above_cutoff', data=sheepskin).fit()
+    reduced_form_jump = reduced_form.params['above_cutoff']
+    reduced_form_se = reduced_form.bse['above_cutoff']
+
+    fuzzy_rdd = reduced_form_jump / first_stage_jump
+    fuzzy_se = np.sqrt(
+        (1/first_stage_jump)**2 * reduced_form_se**2 +
+        (reduced_form_jump/first_stage_jump**2)**2 * first_stage_se**2
+    )
+    return {
+        'first_stage': first_stage, 'reduced_form': reduced_form,
+        'first_stage_jump': first_stage_jump, 'first_stage_se': first_stage_se,
+        'reduced_form_jump': reduced_form_jump, 'reduced_form_se': reduced_form_se,
+        'fuzzy_rdd': fuzzy_rdd, 'fuzzy_se': fuzzy_se,
+    }
+
+
+def mccrary(x, cutoff, bin_width, bandwidth):
+    """McCrary (2008) log-density jump from ``np.histogram`` heights."""
+    lo = np.floor((x.min() - cutoff) / bin_width)
+    hi = np.ceil((x.max() - cutoff) / bin_width) + 1
+    edges = cutoff + np.arange(lo, hi) * bin_width
+    counts, _ = np.histogram(x, edges)
+    mid = (edges[:-1] + edges[1:]) / 2
+    heights = counts / (len(x) * bin_width)
+    f = []
+    for side in (mid < cutoff, mid >= cutoff):
+        d = mid[side] - cutoff
+        w = np.maximum(1 - np.abs(d) / bandwidth, 0)
+        keep = w > 0
+        Z = np.column_stack([np.ones(keep.sum()), d[keep]])
+        beta = np.linalg.solve(Z.T @ (w[keep, None] * Z), Z.T @ (w[keep] * heights[side][keep]))
+        f.append(beta[0])
+    theta = np.log(f[1]) - np.log(f[0])
+    se = np.sqrt(24 / 5 / (len(x) * bandwidth) * (1 / f[0] + 1 / f[1]))
+    return theta, se
+
+
+def loo_refit(x, y, bandwidth, window, kernel='triangular'):
+    """Mean squared prediction error of one-side refits without each unit."""
+    weight = triangular_kernel if kernel == 'triangular' else uniform_kernel
+    errors = []
+    for i in np.flatnonzero(np.abs(x) < window):
+        w = weight(x, bandwidth)
+        keep = ((x >= 0) == (x[i] >= 0)) & (w > 0)
+        keep[i] = False
+        Z = np.column_stack([np.ones(keep.sum()), x[keep]])
+        beta = np.linalg.solve(Z.T @ (w[keep, None] * Z), Z.T @ (w[keep] * y[keep]))
+        errors.append(y[i] - beta[0] - beta[1] * x[i])
+    return np.mean(np.square(errors))
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+
+@pytest.fixture
+def drinking():
+    """Age cells around 21 with a jump in mortality, as in the MLDA data."""
+    rng = np.random.default_rng(21)
+    age = np.round(rng.uniform(19, 23, 400), 3)
+    df = pd.DataFrame({'age_centered': age - 21})
+    df['above_21'] = (df['age_centered'] >= 0).astype(int)
+    df['all'] = (92 + 2 * df['age_centered'] - 0.5 * df['age_centered'] ** 2
+                 + 7.5 * df['above_21'] + rng.normal(0, 2, len(df)))
+    return df
+
+
+@pytest.fixture
+def scores():
+    """Integer test scores with extra mass just above the passing cutoff."""
+    rng = np.random.default_rng(16)
+    score = np.round(rng.normal(0, 15, 20_000))
+    bunched = rng.integers(0, 3, 600).astype(float)
+    df = pd.DataFrame({'minscore': np.concatenate([score, bunched])})
+    df['person_years'] = rng.integers(1, 5, len(df)).astype(float)
+    return df
+
+
+@pytest.fixture
+def sheepskin():
+    """Score cells with partial diploma take-up above the passing cutoff."""
+    rng = np.random.default_rng(9)
+    score = rng.uniform(-30, 30, 3_000)
+    above = (score >= 0).astype(int)
+    take_up = rng.uniform(size=len(score)) < 0.2 + 0.01 * score.clip(-15, 15) + 0.5 * above
+    df = pd.DataFrame({
+        'minscore': score,
+        'above_cutoff': above,
+        'receivehsd': take_up.astype(float),
+    })
+    df['avgearnings'] = 12_000 + 40 * score + 1_500 * take_up + rng.normal(0, 3_000, len(df))
+    df['employed'] = 0.6 + 0.004 * score + 0.05 * take_up + rng.normal(0, 0.3, len(df))
+    return df
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+
+
+class TestLocalLinear:
+    """Tests for the bandwidth sweep."""
+
+    @pytest.mark.parametrize("kernel", ["triangular", "uniform"])
+    def test_sweep_matches_notebook(self, drinking, kernel):
+        bandwidths = [0.5, 1.0, 1.5, 2.0, 3.0]
+        sweep = rdd_sweep(drinking['age_centered'], drinking['all'], bandwidths, kernel=kernel)
+        for row, h in zip(sweep.itertuples(), bandwidths):
+            expected = notebook_rdd_local_linear(drinking, 'all', h, kernel)
+            model = expected['model']
+            np.testing.assert_allclose(row.estimate, expected['estimate'], rtol=1e-10)
+            np.testing.assert_allclose(row.se, expected['se'], rtol=1e-8)
+            assert row.n_effective == expected['n_effective']
+            np.testing.assert_allclose(row.mu_below, model.params['Intercept'], rtol=1e-10)
+            np.testing.assert_allclose(row.slope_below, model.params['age_centered'], rtol=1e-8)
+            np.testing.assert_allclose(
+                row.slope_above,
+                model.params['age_centered'] + model.params['age_centered:above_21'],
+                rtol=1e-8,
+            )
+
+    def test_single_bandwidth(self, drinking):
+        result = rdd_local_linear(drinking['age_centered'], drinking['all'], 1.0, kernel='uniform')
+        expected = notebook_rdd_local_linear(drinking, 'all', 1.0, 'uniform')
+        np.testing.assert_allclose(result['estimate'], expected['estimate'], rtol=1e-10)
+        assert result['ci_lower'] < result['estimate'] < result['ci_upper']
+        assert result['bandwidth'] == 1.0
+
+    def test_cutoff_shift(self, drinking):
+        age = drinking['age_centered'] + 21
+        shifted = rdd_sweep(age, drinking['all'], [1.0, 2.0], cutoff=21)
+        centered = rdd_sweep(drinking['age_centered'], drinking['all'], [1.0, 2.0])
+        np.testing.assert_allclose(shifted['estimate'], centered['estimate'], rtol=1e-8)
+        np.testing.assert_allclose(shifted['se'], centered['se'], rtol=1e-8)
+
+    def test_bandwidth_at_unit_distance(self):
+        # The triangular weight vanishes at d = h, the uniform weight does not
+        x = np.array([-2.0, -1.0, -0.5, -0.25, 0.0, 0.25, 0.5, 1.0, 2.0])
+        y = np.arange(len(x), dtype=float) ** 1.5
+        triangular = rdd_sweep(x, y, [1.0], kernel='triangular')
+        uniform = rdd_sweep(x, y, [1.0], kernel='uniform')
+        assert triangular['n_effective'][0] == 5
+        assert uniform['n_effective'][0] == 7
+
+    def test_too_few_units(self):
+        x = np.array([-1.0, -0.5, 0.5, 1.0])
+        sweep = rdd_sweep(x, x, [0.1, 0.6, 2.0])
+        assert np.isnan(sweep['estimate'][0]) and np.isnan(sweep['estimate'][1])
+        assert np.isfinite(sweep['estimate'][2]) and np.isnan(sweep['se'][2])
+
+    def test_invalid_inputs(self, drinking):
+        with pytest.raises(ValueError, match="Unknown kernel"):
+            rdd_sweep(drinking['age_centered'], drinking['all'], [1.0], kernel='epanechnikov')
+        with pytest.raises(ValueError, match="positive"):
+            rdd_sweep(drinking['age_centered'], drinking['all'], [0.0, 1.0])
+
+
+class TestBandwidthSelection:
+    """Tests for hat-matrix leave-one-out selection."""
+
+    @pytest.mark.parametrize("kernel", ["triangular", "uniform"])
+    def test_matches_refits(self, drinking, kernel):
+        x, y = drinking['age_centered'].to_numpy(), drinking['all'].to_numpy()
+        bandwidths = np.array([0.4, 0.8, 1.6])
+        result = loo_bandwidth(x, y, bandwidths, kernel=kernel)
+        expected = [loo_refit(x, y, h, 0.4, kernel) for h in bandwidths]
+        np.testing.assert_allclose(result['cv']['cv'], expected, rtol=1e-9)
+        assert result['bandwidth'] == bandwidths[np.argmin(expected)]
+        assert (result['cv']['n_eval'] == (np.abs(x) < 0.4).sum()).all()
+
+    def test_chunked(self, drinking, monkeypatch):
+        import facure_augment.rdd.local_linear as local_linear
+
+        x, y = drinking['age_centered'], drinking['all']
+        bandwidths = np.linspace(0.5, 2.0, 7)
+        expected = loo_bandwidth(x, y, bandwidths, window=0.5)['cv']['cv']
+        monkeypatch.setattr(local_linear, "MAX_CHUNK_ELEMENTS", 100)
+        np.testing.assert_allclose(loo_bandwidth(x, y, bandwidths, window=0.5)['cv']['cv'],
+                                   expected, rtol=1e-12)
+
+    def test_sensitivity_plot(self, drinking):
+        matplotlib = pytest.importorskip("matplotlib")
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+
+        x, y = drinking['age_centered'], drinking['all']
+        bandwidths = np.linspace(0.3, 2.0, 40)
+        selected = loo_bandwidth(x, y, bandwidths)['bandwidth']
+        ax = sensitivity_plot(rdd_sweep(x, y, bandwidths), selected=selected)
+        assert len(ax.lines) == 3
+        plt.close("all")
+
+
+class TestDensity:
+    """Tests for the binned McCrary test."""
+
+    def test_window_counts_match_notebook(self, scores):
+        result = density_test(scores['minscore'], cutoffs=[0, -5, 12], bin_width=1, bandwidth=10,
+                              weights=scores['person_years'])
+        for row in result.itertuples():
+            expected = simple_density_test(scores, 'minscore', cutoff=row.cutoff, bandwidth=10)
+            assert row.n_below == expected['n_below']
+            assert row.n_above == expected['n_above']
+
+    def test_matches_direct_fit(self):
+        rng = np.random.default_rng(0)
+        x = np.concatenate([rng.normal(size=50_000), rng.uniform(0, 0.3, 1_000)])
+        result = density_test(x, cutoffs=[0.0, 0.5, -1.0], bin_width=0.05, bandwidth=0.6)
+        for row in result.itertuples():
+            theta, se = mccrary(x, row.cutoff, 0.05, 0.6)
+            np.testing.assert_allclose(row.theta, theta, rtol=1e-9)
+            np.testing.assert_allclose(row.se, se, rtol=1e-9)
+        assert result['pvalue'][0] < 1e-6 and result['theta'][0] > 0
+
+    def test_no_jump_in_smooth_density(self):
+        rng = np.random.default_rng(3)
+        result = density_test(rng.normal(size=100_000), cutoffs=np.arange(-1, 1.25, 0.25),
+                              bin_width=0.025)
+        assert np.isfinite(result['bandwidth']).all()
+        assert (result['pvalue'] > 0.001).all()
+
+    def test_chunks_and_merge(self, scores):
+        x = scores['minscore'].to_numpy()
+        whole = RunningHistogram(1.0).update(x)
+        streamed = RunningHistogram.from_chunks(
+            (scores.iloc[i:i + 997] for i in range(0, len(scores), 997)), 1.0, column='minscore')
+        shards = [RunningHistogram(1.0).update(part) for part in np.array_split(np.sort(x), 5)]
+        merged = shards[0]
+        for shard in shards[1:]:
+            merged = merged.merge(shard)
+        for hist in (streamed, merged):
+            assert hist.start_ == whole.start_
+            np.testing.assert_array_equal(hist.counts_, whole.counts_)
+        with pytest.raises(ValueError, match="different bin grids"):
+            whole.merge(RunningHistogram(0.5))
+
+    def test_edges_and_snapping(self):
+        # 0.3 / 0.1 is not exactly 3 in floating point
+        hist = RunningHistogram(0.1).update([0.3, 0.29, -0.1, np.nan])
+        assert hist.start_ == -1
+        np.testing.assert_array_equal(hist.counts_, [1, 0, 0, 1, 1])
+        np.testing.assert_allclose(hist.heights.sum() * hist.bin_width, 1)
+        with pytest.warns(UserWarning, match="nearest bin edge"):
+            result = hist.density_test(cutoffs=0.31, bandwidth=1.0)
+        np.testing.assert_allclose(result['edge'], 0.3)
+
+    def test_default_bins_put_every_cutoff_on_an_edge(self):
+        x = np.random.default_rng(5).normal(size=200_000)
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            result = density_test(x, cutoffs=[-1, 0, 0.5, 1])
+            thirds = density_test(x, cutoffs=[0.1, 0.4, 1 / 3])
+        np.testing.assert_allclose(result['edge'], result['cutoff'], atol=1e-12)
+        np.testing.assert_allclose(thirds['edge'], thirds['cutoff'], atol=1e-12)
+        assert (result['pvalue'] > 0.001).all()
+        with pytest.warns(UserWarning, match="nearest bin edge"):
+            density_test(x, cutoffs=[0, 0.5, np.sqrt(2) / 10])
+
+    def test_sparse_sides_are_nan(self):
+        result = density_test(np.arange(-3.0, 20.0), cutoffs=[0, 40], bin_width=1, bandwidth=2)
+        assert np.isfinite(result['theta'][0])
+        assert np.isnan(result['theta'][1]) and result['bandwidth'][1] == 2
+        assert np.isnan(density_test(np.arange(-3.0, 20.0), cutoffs=0, bin_width=1)['theta'][0])
+
+
+class TestFuzzy:
+    """Tests for the multi-outcome fuzzy RDD."""
+
+    def test_matches_notebook(self, sheepskin):
+        result = fuzzy_rdd(sheepskin['minscore'], sheepskin[['avgearnings', 'employed']],
+                           sheepskin['receivehsd'], kernel='uniform')
+        assert list(result['outcome']) == ['avgearnings', 'employed']
+        for row in result.itertuples():
+            expected = notebook_fuzzy_rdd(sheepskin, row.outcome)
+            np.testing.assert_allclose(row.first_stage, expected['first_stage_jump'], rtol=1e-9)
+            np.testing.assert_allclose(row.first_stage_se, expected['first_stage_se'], rtol=1e-8)
+            np.testing.assert_allclose(row.reduced_form, expected['reduced_form_jump'], rtol=1e-9)
+            np.testing.assert_allclose(row.reduced_form_se, expected['reduced_form_se'], rtol=1e-8)
+            np.testing.assert_allclose(row.estimate, expected['fuzzy_rdd'], rtol=1e-9)
+            assert row.n_effective == len(sheepskin)
+
+    def test_delta_method_covariance(self, sheepskin):
+        row = fuzzy_rdd(sheepskin['minscore'], sheepskin['avgearnings'], sheepskin['receivehsd'],
+                        kernel='uniform').iloc[0]
+        expected = notebook_fuzzy_rdd(sheepskin)
+        first, reduced = expected['first_stage'], expected['reduced_form']
+        # Cross-equation covariance of the two jumps from the OLS residuals
+        cov = (first.resid @ reduced.resid / first.df_resid
+               * first.normalized_cov_params.loc['above_cutoff', 'above_cutoff'])
+        tau, fs = expected['fuzzy_rdd'], expected['first_stage_jump']
+        se = np.sqrt((expected['reduced_form_se'] ** 2 - 2 * tau * cov
+                      + tau ** 2 * expected['first_stage_se'] ** 2) / fs ** 2)
+        np.testing.assert_allclose(row['se'], se, rtol=1e-8)
+        # Without the covariance term this is the notebook's approximation
+        notebook = np.sqrt(row['reduced_form_se'] ** 2 / fs ** 2
+                           + tau ** 2 * row['first_stage_se'] ** 2 / fs ** 2)
+        np.testing.assert_allclose(notebook, expected['fuzzy_se'], rtol=1e-8)
+
+    def test_outcomes_and_bandwidths_are_independent(self, sheepskin):
+        x, D = sheepskin['minscore'], sheepskin['receivehsd']
+        bandwidths = [8.0, 15.0, 25.0]
+        joint = fuzzy_rdd(x, sheepskin[['avgearnings', 'employed']], D, bandwidths=bandwidths)
+        for outcome in ('avgearnings', 'employed'):
+            alone = fuzzy_rdd(x, sheepskin[outcome], D, bandwidths=bandwidths)
+            rows = joint[joint['outcome'] == outcome].reset_index(drop=True)
+            pd.testing.assert_frame_equal(rows, alone, check_exact=False, rtol=1e-10)
+            reduced = rdd_sweep(x, sheepskin[outcome], bandwidths)
+            np.testing.assert_allclose(rows['reduced_form'], reduced['estimate'], rtol=1e-9)
+            np.testing.assert_allclose(rows['reduced_form_se'], reduced['se'], rtol=1e-8)
+
+    def test_sharp_design(self, drinking):
+        x, y = drinking['age_centered'], drinking['all']
+        result = fuzzy_rdd(x, y, drinking['above_21'], bandwidths=[1.0, 2.0])
+        expected = rdd_sweep(x, y, [1.0, 2.0])
+        np.testing.assert_allclose(result['first_stage'], 1.0)
+        np.testing.assert_allclose(result['estimate'], expected['estimate'], rtol=1e-9)
+        np.testing.assert_allclose(result['se'], expected['se'], rtol=1e-6)
+
+    def test_cutoffs_in_parallel(self, sheepskin):
+        x = sheepskin['minscore'].to_numpy()
+        D = (x >= 0) * 0.5 + (x >= 10) * 0.3 + 0.1
+        Y = sheepskin[['avgearnings', 'employed']]
+        serial = fuzzy_rdd(x, Y, D, cutoffs=[0, 10], bandwidths=[5.0, 9.0], kernel='uniform')
+        parallel = fuzzy_rdd(x, Y, D, cutoffs=[0, 10], bandwidths=[5.0, 9.0], kernel='uniform',
+                             n_jobs=2)
+        pd.testing.assert_frame_equal(serial, parallel)
+        assert list(serial['cutoff']) == [0] * 4 + [10] * 4
+        shifted = fuzzy_rdd(x - 10, Y, D, bandwidths=[5.0, 9.0], kernel='uniform')
+        np.testing.assert_allclose(serial['estimate'][4:], shifted['estimate'], rtol=1e-8)
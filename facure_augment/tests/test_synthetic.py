@@ -0,0 +1,437 @@
+"""
+Tests for facure_augment.synthetic.
+
+Checks the active-set solver against cvxpy on the California smoking panel,
+the placebo batch against one refit per unit, and the vectorized inference
+against the loop implementations in the A1_conformal_scm notebooks. SDID is
+checked against the cvxpy estimator from the 25_synthetic_did notebooks.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from facure_augment.common import load_facure_data
+from facure_augment.simulation import panel_batch
+from facure_augment.synthetic import (
+    CvxpySimplexLS,
+    SyntheticControl,
+    SyntheticDiD,
+    block_statistics,
+    conformal_ci,
+    conformal_pvalues,
+    frank_wolfe_simplex,
+    panel_matrix,
+    placebo_ci,
+    placebo_gaps,
+    placebo_test,
+    placebo_weights,
+    sdid_estimate,
+    sdid_staggered,
+    simplex_least_squares,
+)
+
+
+@pytest.fixture(scope="module")
+def smoking_pre():
+    """Pre-treatment cigarette sales, one column per state (California = 3)."""
+    smoking = load_facure_data("smoking.csv")
+    return (smoking.query("~after_treatment")
+            .pivot(index="year", columns="state")["cigsale"]
+            .values)
+
+
+def _reference_objective(X, y):
+    import cvxpy as cp
+
+    w = cp.Variable(X.shape[1])
+    problem = cp.Problem(cp.Minimize(cp.sum_squares(X @ w - y)), [cp.sum(w) == 1, w >= 0])
+    problem.solve(solver=cp.CLARABEL)
+    return problem.value
+
+
+# =============================================================================
+# Solver
+# =============================================================================
+
+
+class TestSolver:
+    def test_feasible_and_optimal(self, smoking_pre):
+        y, X = smoking_pre[:, 2], np.delete(smoking_pre, 2, axis=1)
+        w, info = simplex_least_squares(X, y)
+        assert info["converged"]
+        assert w.min() >= 0 and np.isclose(w.sum(), 1)
+        assert info["objective"] <= _reference_objective(X, y) * (1 + 1e-6) + 1e-8
+
+    def test_batch_matches_single_fits(self, smoking_pre):
+        X, Y = smoking_pre[:, 5:], smoking_pre[:, :5]
+        W, _ = simplex_least_squares(X, Y)
+        for i in range(5):
+            w, _ = simplex_least_squares(X, Y[:, i])
+            np.testing.assert_allclose(W[:, i], w)
+
+    def test_mask_excludes_donors(self, smoking_pre):
+        X, y = smoking_pre[:, 1:], smoking_pre[:, 0]
+        mask = np.ones(X.shape[1], dtype=bool)
+        mask[:10] = False
+        w, _ = simplex_least_squares(X, y, mask=mask)
+        assert (w[:10] == 0).all() and np.isclose(w.sum(), 1)
+
+    def test_warm_start_reduces_iterations(self, smoking_pre):
+        y, X = smoking_pre[:, 2], np.delete(smoking_pre, 2, axis=1)
+        w, cold = simplex_least_squares(X[:-1], y[:-1])
+        w_warm, warm = simplex_least_squares(X, y, W0=w)
+        w_cold, _ = simplex_least_squares(X, y)
+        assert warm["n_iter"] < cold["n_iter"]
+        assert np.isclose(warm["objective"], np.sum((X @ w_cold - y) ** 2))
+
+
+# =============================================================================
+# Placebos and Estimator
+# =============================================================================
+
+
+class TestPlacebo:
+    def test_matches_per_unit_refits(self, smoking_pre):
+        W, info = placebo_weights(smoking_pre)
+        J = smoking_pre.shape[1]
+        assert W.shape == (J, J) and np.all(np.diag(W) == 0)
+        assert info["converged"].all()
+        for j in (0, 2, J - 1):
+            X = np.delete(smoking_pre, j, axis=1)
+            w, _ = simplex_least_squares(X, smoking_pre[:, j])
+            np.testing.assert_allclose(np.delete(W[:, j], j), w, atol=1e-8)
+
+    def test_cvxpy_backend_agrees(self, smoking_pre):
+        X, y = np.delete(smoking_pre, 2, axis=1), smoking_pre[:, 2]
+        backend = CvxpySimplexLS(*X.shape, solver="CLARABEL")
+        _, info = backend.solve(X, y)
+        _, ours = simplex_least_squares(X, y)
+        assert np.isclose(ours["objective"], info["objective"], rtol=1e-5)
+
+
+class TestSyntheticControl:
+    def test_sklearn_api(self, smoking_pre):
+        X, y = np.delete(smoking_pre, 2, axis=1), smoking_pre[:, 2]
+        model = SyntheticControl().fit(X, y)
+        assert model.predict(X).shape == y.shape
+        assert model.solve_time_ > 0 and model.n_iter_ >= 1
+
+    def test_warm_start_refit(self, smoking_pre):
+        X, y = np.delete(smoking_pre, 2, axis=1), smoking_pre[:, 2]
+        model = SyntheticControl(warm_start=True).fit(X, y)
+        first = model.n_iter_
+        model.fit(X, y)
+        assert model.n_iter_ <= first
+
+
+# =============================================================================
+# Reference Implementations (A1_conformal_scm/02_scm_confidence_intervals)
+# =============================================================================
+
+
+def per_period_pvalue(treated_gap, all_gaps, period_idx):
+    abs_gaps = [np.abs(gaps[period_idx]) for gaps in all_gaps.values()]
+    return np.mean(np.array(abs_gaps) >= np.abs(treated_gap))
+
+
+def per_period_ci(treated_unit, all_gaps, period_idx, alpha=0.05,
+                  grid_range=(-100, 50), grid_points=151):
+    point_est = all_gaps[treated_unit][period_idx]
+    theta_grid = np.linspace(grid_range[0], grid_range[1], grid_points)
+    p_values = []
+    for theta0 in theta_grid:
+        adjusted_treated = point_est - theta0
+        placebo_abs = [np.abs(gaps[period_idx])
+                       for u, gaps in all_gaps.items() if u != treated_unit]
+        p = (1 + np.sum(np.array(placebo_abs) >= np.abs(adjusted_treated))) / len(all_gaps)
+        p_values.append(p)
+    in_ci = np.array(p_values) > alpha
+    if np.any(in_ci):
+        return theta_grid[in_ci].min(), theta_grid[in_ci].max(), point_est
+    return point_est, point_est, point_est
+
+
+def aggregate_pvalue(treated_unit, all_gaps, pre_rmse_dict, rmse_threshold=None, q=2):
+    test_stats = {}
+    for unit, gaps in all_gaps.items():
+        if rmse_threshold and pre_rmse_dict[unit] > rmse_threshold:
+            continue
+        if q == np.inf:
+            stat = np.max(np.abs(gaps))
+        else:
+            stat = np.sum(np.abs(gaps) ** q) ** (1 / q)
+        test_stats[unit] = stat
+    treated_stat = test_stats[treated_unit]
+    return np.mean([s >= treated_stat for s in test_stats.values()])
+
+
+@pytest.fixture(scope="module")
+def smoking_panel():
+    smoking = load_facure_data("smoking.csv")
+    Y, units, years = panel_matrix(smoking, "state", "year", "cigsale")
+    return Y, int(np.sum(years < 1989)), list(units).index(3)
+
+
+@pytest.fixture(scope="module")
+def smoking_gaps(smoking_panel):
+    Y, n_pre, _ = smoking_panel
+    return placebo_gaps(Y, n_pre)
+
+
+# =============================================================================
+# Placebo Inference
+# =============================================================================
+
+
+class TestPlaceboInference:
+    def test_gaps_parallel_matches_serial(self, smoking_panel, smoking_gaps):
+        Y, n_pre, _ = smoking_panel
+        parallel = placebo_gaps(Y, n_pre, n_jobs=3)
+        np.testing.assert_allclose(parallel["gaps"], smoking_gaps["gaps"])
+
+    @pytest.mark.parametrize("q", [1, 2, np.inf])
+    def test_aggregate_matches_notebook(self, smoking_panel, smoking_gaps, q):
+        _, n_pre, treated = smoking_panel
+        gaps, rmse = smoking_gaps["gaps"], smoking_gaps["pre_rmse"]
+        post = {j: gaps[n_pre:, j] for j in range(gaps.shape[1])}
+        rmse_dict = dict(enumerate(rmse))
+        threshold = 5 * rmse[treated]
+        ours = placebo_test(gaps, n_pre, treated, q=q, pre_rmse=rmse, rmse_threshold=threshold)
+        assert ours["p_value"] == aggregate_pvalue(treated, post, rmse_dict, threshold, q)
+        assert placebo_test(gaps, n_pre, treated, q=q)["p_value"] == \
+            aggregate_pvalue(treated, post, rmse_dict, None, q)
+
+    def test_period_pvalues_match_notebook(self, smoking_panel, smoking_gaps):
+        _, n_pre, treated = smoking_panel
+        gaps = smoking_gaps["gaps"]
+        post = {j: gaps[n_pre:, j] for j in range(gaps.shape[1])}
+        expected = [per_period_pvalue(post[treated][i], post, i) for i in range(len(post[0]))]
+        np.testing.assert_allclose(placebo_test(gaps, n_pre, treated)["period_pvalues"], expected)
+
+    def test_ci_matches_notebook_grid(self, smoking_panel, smoking_gaps):
+        _, n_pre, treated = smoking_panel
+        gaps = smoking_gaps["gaps"]
+        post = {j: gaps[n_pre:, j] for j in range(gaps.shape[1])}
+        grid = np.linspace(-80, 30, 151)
+        ours = placebo_ci(gaps, n_pre, treated, alpha=0.1, grid=grid)
+        for i, row in ours.iterrows():
+            lower, upper, point = per_period_ci(treated, post, i, 0.1, (-80, 30))
+            assert (row["ci_lower"], row["ci_upper"], row["estimate"]) == pytest.approx(
+                (lower, upper, point))
+
+    def test_exact_ci_contains_grid_ci(self, smoking_panel, smoking_gaps):
+        _, n_pre, treated = smoking_panel
+        exact = placebo_ci(smoking_gaps["gaps"], n_pre, treated, alpha=0.1)
+        grid = placebo_ci(smoking_gaps["gaps"], n_pre, treated, alpha=0.1,
+                          grid=np.linspace(-80, 30, 1101))
+        assert (exact["ci_lower"] <= grid["ci_lower"] + 1e-9).all()
+        assert (exact["ci_upper"] >= grid["ci_upper"] - 1e-9).all()
+        assert (grid["ci_upper"] - exact["ci_upper"]).abs().max() < 0.11
+
+
+# =============================================================================
+# Conformal Inference
+# =============================================================================
+
+
+class TestConformal:
+    @pytest.mark.parametrize("q", [1, 2, np.inf])
+    def test_block_statistics_match_rolls(self, q):
+        u = np.random.default_rng(0).normal(size=(20, 3))
+        stats = block_statistics(u, 6, q)
+        for j in range(20):
+            window = np.roll(u, -j, axis=0)[:6]
+            expected = np.max(np.abs(window), axis=0) if q == np.inf else \
+                np.sum(np.abs(window) ** q, axis=0) ** (1 / q)
+            np.testing.assert_allclose(stats[j], expected)
+
+    def test_grid_matches_cold_refits(self, smoking_panel):
+        Y, n_pre, treated = smoking_panel
+        grid = np.array([-30.0, -20.0, -10.0, 0.0])
+        p_values, _ = conformal_pvalues(Y, treated, n_pre, grid)
+        X = np.delete(Y, treated, axis=1)
+        for theta, p in zip(grid, p_values):
+            y0 = Y[:, treated].copy()
+            y0[n_pre:] -= theta
+            w, _ = simplex_least_squares(X, y0)
+            stats = block_statistics(y0 - X @ w, len(Y) - n_pre)
+            assert p == pytest.approx(np.mean(stats >= stats[n_pre] * (1 - 1e-12)))
+
+    def test_ci_parallel_matches_serial(self, smoking_panel):
+        Y, n_pre, treated = smoking_panel
+        grid = np.linspace(-40, 10, 41)
+        serial = conformal_ci(Y, treated, n_pre, grid, per_period=True)
+        parallel = conformal_ci(Y, treated, n_pre, grid, per_period=True, n_jobs=3)
+        np.testing.assert_allclose(serial["p_values"], parallel["p_values"])
+        constant = conformal_ci(Y, treated, n_pre, grid)
+        chunked = conformal_ci(Y, treated, n_pre, grid, n_jobs=3)
+        np.testing.assert_allclose(constant["p_values"], chunked["p_values"])
+
+    def test_per_period_intervals_cover_gap(self, smoking_panel, smoking_gaps):
+        Y, n_pre, treated = smoking_panel
+        grid = np.linspace(-40, 10, 101)
+        intervals = conformal_ci(Y, treated, n_pre, grid, per_period=True)["intervals"]
+        gap = smoking_gaps["gaps"][n_pre:, treated]
+        inside = (intervals["ci_lower"] <= gap) & (gap <= intervals["ci_upper"])
+        assert inside.mean() > 0.8
+        assert (intervals["ci_upper"] < 0).sum() >= len(intervals) // 2
+
+
+# =============================================================================
+# Reference Implementation (25_synthetic_did/03_staggered_inference)
+# =============================================================================
+
+
+def sdid_estimate_full(Y_tr_pre, Y_tr_post, Y_co_pre, Y_co_post, zeta=None):
+    import cvxpy as cp
+
+    N_co, T_pre = Y_co_pre.shape
+    T_post = Y_co_post.shape[1]
+    N_tr = 1
+    if zeta is None:
+        delta = np.diff(Y_co_pre, axis=1)
+        sigma = np.std(delta, ddof=1)
+        zeta = (N_tr * T_post) ** 0.25 * sigma
+
+    w = cp.Variable(N_co)
+    w0 = cp.Variable()
+    pred = w0 + Y_co_pre.T @ w
+    obj = cp.Minimize(cp.sum_squares(pred - Y_tr_pre.flatten()) + zeta**2 * T_pre * cp.sum_squares(w))
+    cp.Problem(obj, [cp.sum(w) == 1, w >= 0]).solve(solver=cp.CLARABEL)
+    w_hat = w.value
+
+    lam = cp.Variable(T_pre)
+    lam0 = cp.Variable()
+    obj_t = cp.Minimize(cp.sum_squares(lam0 + Y_co_pre @ lam - Y_co_post.mean(axis=1)))
+    cp.Problem(obj_t, [cp.sum(lam) == 1, lam >= 0]).solve(solver=cp.CLARABEL)
+    lam_hat = lam.value
+
+    tau = (Y_tr_post.mean() - (Y_co_post.T @ w_hat).mean()) - \
+        (Y_tr_pre.flatten() @ lam_hat - (Y_co_pre.T @ w_hat) @ lam_hat)
+    return tau, w_hat, lam_hat, zeta
+
+
+@pytest.fixture(scope="module")
+def smoking_units(smoking_panel):
+    """Units-by-years panel and California mask."""
+    Y, n_pre, treated = smoking_panel
+    mask = np.zeros(Y.shape[1], dtype=bool)
+    mask[treated] = True
+    return Y.T, mask, n_pre
+
+
+@pytest.fixture(scope="module")
+def multi_treated():
+    """Appendix A1 panel with the first three units treated."""
+    Y = panel_batch(1, n_units=25, n_pre=15, n_post=5)["Y"][0]
+    treated = np.zeros(25, dtype=bool)
+    treated[:3] = True
+    Y[1:3, 15:] += 5.0
+    return Y, treated, 15
+
+
+# =============================================================================
+# Synthetic Difference-in-Differences
+# =============================================================================
+
+
+class TestSDID:
+    @pytest.mark.parametrize("method", ["frank-wolfe", "active-set"])
+    def test_matches_notebook(self, smoking_units, method):
+        Y, treated, n_pre = smoking_units
+        Y_co = Y[~treated]
+        expected = sdid_estimate_full(Y[treated, :n_pre], Y[treated, n_pre:],
+                                      Y_co[:, :n_pre], Y_co[:, n_pre:])
+        ours = sdid_estimate(Y, treated, n_pre, method=method)
+        assert ours["tau"] == pytest.approx(expected[0], abs=1e-5)
+        np.testing.assert_allclose(ours["omega"], expected[1], atol=1e-5)
+        np.testing.assert_allclose(ours["lambda"], expected[2], atol=1e-5)
+
+    @pytest.mark.parametrize("pairwise, slack", [(True, 1e-9), (False, 1e-2)])
+    def test_frank_wolfe_matches_active_set(self, pairwise, slack):
+        rng = np.random.default_rng(0)
+        A, Y = rng.normal(size=(30, 12)), rng.normal(size=(30, 4))
+        Q, B = A.T @ A + 0.5 * np.eye(12), A.T @ Y
+        W, info = frank_wolfe_simplex(Q, B, tol=1e-10, max_iter=20_000, pairwise=pairwise)
+        assert info["converged"].all() or not pairwise
+        # Same problem as least squares on [A; sqrt(0.5) I] against [y; 0]
+        X = np.vstack([A, np.sqrt(0.5) * np.eye(12)])
+        exact, _ = simplex_least_squares(X, np.vstack([Y, np.zeros((12, 4))]))
+        objective = np.einsum("ik,ij,jk->k", W, Q, W) - 2 * np.sum(B * W, axis=0)
+        best = np.einsum("ik,ij,jk->k", exact, Q, exact) - 2 * np.sum(B * exact, axis=0)
+        assert np.all(objective <= best + slack)
+
+    def test_placebo_batch_matches_refits(self, smoking_units):
+        Y, treated, n_pre = smoking_units
+        model = SyntheticDiD(method="active-set").fit(Y, treated, n_pre)
+        model.variance("placebo")
+        Y_co = Y[~treated]
+        for j in (0, 10, len(Y_co) - 1):
+            pseudo = np.zeros(len(Y_co), dtype=bool)
+            pseudo[j] = True
+            refit = sdid_estimate(Y_co, pseudo, n_pre, zeta=model.zeta_, method="active-set")
+            assert model.replicates_[j] == pytest.approx(refit["tau"], abs=1e-8)
+
+    def test_placebo_frank_wolfe_and_parallel(self, smoking_units):
+        Y, treated, n_pre = smoking_units
+        exact = SyntheticDiD(method="active-set").fit(Y, treated, n_pre).variance("placebo")
+        serial = SyntheticDiD().fit(Y, treated, n_pre).variance("placebo")
+        parallel = SyntheticDiD(n_jobs=2).fit(Y, treated, n_pre).variance("placebo")
+        assert serial == pytest.approx(exact, abs=1e-5)
+        assert parallel == pytest.approx(serial)
+
+    def test_jackknife_matches_loop(self, multi_treated):
+        Y, treated, n_pre = multi_treated
+        model = SyntheticDiD().fit(Y, treated, n_pre)
+        se = model.variance("jackknife")
+        Y_co, Y_tr = Y[~treated], Y[treated]
+        estimates = []
+        for i in range(len(Y)):
+            omega = model.w_.copy()
+            keep_tr = np.ones(len(Y_tr), dtype=bool)
+            if treated[i]:
+                keep_tr[np.flatnonzero(treated).tolist().index(i)] = False
+            else:
+                omega[np.flatnonzero(~treated).tolist().index(i)] = 0.0
+                omega /= omega.sum()
+            diff = Y_tr[keep_tr].mean(axis=0) - Y_co.T @ omega
+            estimates.append(diff[n_pre:].mean() - model.lambda_ @ diff[:n_pre])
+        estimates = np.array(estimates)
+        n = len(estimates)
+        expected = np.sqrt((n - 1) / n * np.sum((estimates - estimates.mean()) ** 2))
+        assert se == pytest.approx(expected)
+
+    def test_jackknife_warns_on_dropped_units(self, multi_treated):
+        model = SyntheticDiD().fit(*multi_treated)
+        model.w_ = np.eye(len(model.w_))[0]
+        with pytest.warns(UserWarning, match="dropped 1 of"):
+            se = model.variance("jackknife")
+        assert len(model.replicates_) == len(multi_treated[0]) - 1 and np.isfinite(se)
+
+    def test_jackknife_needs_two_treated(self, smoking_units):
+        with pytest.raises(ValueError, match="two treated"):
+            SyntheticDiD().fit(*smoking_units).variance("jackknife")
+
+    def test_bootstrap_parallel_matches_serial(self, multi_treated):
+        Y, treated, n_pre = multi_treated
+        serial = SyntheticDiD().fit(Y, treated, n_pre)
+        parallel = SyntheticDiD(n_jobs=2).fit(Y, treated, n_pre)
+        assert serial.variance("bootstrap", n_reps=8) == pytest.approx(
+            parallel.variance("bootstrap", n_reps=8))
+        low, high = serial.confidence_interval()
+        assert low < serial.tau_ < high
+
+    def test_staggered_matches_cohort_fits(self, multi_treated):
+        Y, _, _ = multi_treated
+        cohort = np.zeros(len(Y), dtype=int)
+        cohort[:3], cohort[3:6] = 15, 12
+        table = sdid_staggered(Y, cohort)
+        parallel = sdid_staggered(Y, cohort, n_jobs=2)
+        np.testing.assert_allclose(table["estimate"], parallel["estimate"])
+        assert list(table["cohort"]) == [12, 15]
+        later = (cohort == 0) | (cohort >= 12)
+        expected = sdid_estimate(Y[later], cohort[later] == 12, 12)["tau"]
+        assert table["estimate"].iloc[0] == pytest.approx(expected)
+        assert table.attrs["att"] == pytest.approx(np.sum(table["weight"] * table["estimate"]))
@@ -0,0 +1,384 @@
+"""
+Tests for facure_augment.weighting.
+
+Streaming estimates are checked against the in-memory helpers of the
+11_propensity_score and A3_ps_debiasing notebooks, batched propensity
+refits against scikit-learn and one-at-a-time refits of resampled rows, and
+trimming/clipping sweeps against the per-threshold notebook helpers.
+"""
+
+from __future__ import annotations
+
+import functools
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from facure_augment.inference import bootstrap, bootstrap_weights, hajek_statistic
+from facure_augment.inference.multiplier import hajek_influence
+from facure_augment.weighting import (
+    BatchedLogit,
+    StreamingIPTW,
+    clip_sweep,
+    tradeoff_plot,
+    trim_sweep,
+)
+
+
+# =============================================================================
+# Reference Implementations (11_propensity_score, A3_ps_debiasing)
+# =============================================================================
+
+
+def iptw_ate(Y, T, ps):
+    n = len(Y)
+    mu1 = np.sum(T * Y / ps) / n
+    mu0 = np.sum((1 - T) * Y / (1 - ps)) / n
+    return mu1 - mu0
+
+
+def hajek_ate(Y, T, ps):
+    mu1 = np.sum(T * Y / ps) / np.sum(T / ps)
+    mu0 = np.sum((1 - T) * Y / (1 - ps)) / np.sum((1 - T) / (1 - ps))
+    return mu1 - mu0
+
+
+def weighted_mean(x, w, t, treatment_value):
+    mask = t == treatment_value
+    return np.average(x[mask], weights=w[mask])
+
+
+def stabilized_weights(T, ps):
+    p_t = T.mean()
+    sw = T * (p_t / ps) + (1 - T) * ((1 - p_t) / (1 - ps))
+    return sw
+
+
+def effective_sample_size(weights):
+    return (np.sum(weights)**2) / np.sum(weights**2)
+
+
+def trim_weights(weights, percentile=99):
+    threshold = np.percentile(weights, percentile)
+    trimmed = np.minimum(weights, threshold)
+    return trimmed
+
+
+def iptw_ate_comparison(Y, T, ps, trim_pct=None):
+    weights = T / ps + (1 - T) / (1 - ps)
+    if trim_pct is not None:
+        weights = trim_weights(weights, trim_pct)
+    mu1 = np.sum(T * Y * weights) / np.sum(T * weights)
+    mu0 = np.sum((1 - T) * Y * weights) / np.sum((1 - T) * weights)
+    return mu1 - mu0
+
+
+def iptw_ate_trimmed(outcome, treatment, propensity_score, max_weight=None,
+                     ps_bounds=None, normalized=True):
+    T = np.asarray(treatment)
+    Y = np.asarray(outcome)
+    e = np.asarray(propensity_score)
+    if ps_bounds is not None:
+        mask = (e >= ps_bounds[0]) & (e <= ps_bounds[1])
+    else:
+        mask = np.ones(len(Y), dtype=bool)
+    T = T[mask]
+    Y = Y[mask]
+    e = e[mask]
+    weights = np.where(T == 1, 1 / e, 1 / (1 - e))
+    if max_weight is not None:
+        weights = np.clip(weights, 0, max_weight)
+    if normalized:
+        mu1 = np.sum(Y * T * weights) / np.sum(T * weights) if np.sum(T * weights) > 0 else np.nan
+        mu0 = np.sum(Y * (1 - T) * weights) / np.sum((1 - T) * weights) if np.sum((1 - T) * weights) > 0 else np.nan
+    else:
+        n = len(Y)
+        mu1 = np.sum(Y * T * weights) / n
+        mu0 = np.sum(Y * (1 - T) * weights) / n
+    return {
+        'ate': mu1 - mu0,
+        'mu1': mu1,
+        'mu0': mu0,
+        'n_included': mask.sum(),
+        'n_excluded': (~mask).sum() if ps_bounds else 0
+    }
+
+
+def bootstrap_iptw(Y, T, X, idx_list):
+    """``bootstrap_iptw`` from 11_propensity_score over given resamples."""
+    estimates = []
+    for idx in idx_list:
+        Y_boot = Y[idx]
+        T_boot = T[idx]
+        X_boot = X[idx]
+        ps_model = LogisticRegression(C=1e6, max_iter=1000, solver='lbfgs')
+        ps_model.fit(X_boot, T_boot)
+        ps_boot = ps_model.predict_proba(X_boot)[:, 1]
+        ate_boot = hajek_ate(Y_boot, T_boot, ps_boot)
+        estimates.append(ate_boot)
+    return np.array(estimates)
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+
+@pytest.fixture
+def observational():
+    rng = np.random.default_rng(0)
+    n = 5000
+    X = rng.normal(size=(n, 3))
+    ps = 1 / (1 + np.exp(-(0.8 * X[:, 0] - 0.5 * X[:, 1])))
+    T = (rng.random(n) < ps).astype(int)
+    Y = 500 + X[:, 0] + X[:, 2] + 2.0 * T + rng.normal(size=n)
+    return X, T, Y, ps
+
+
+def _stream(X, T, Y, ps, batch=613, shift=None):
+    state = StreamingIPTW(["x0", "x1", "x2"], shift)
+    for i in range(0, len(T), batch):
+        state.update(T[i:i + batch], Y[i:i + batch], ps[i:i + batch], X[i:i + batch])
+    return state
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+
+
+class TestStreamingIPTW:
+    """Running sums reproduce the in-memory estimators."""
+
+    def test_point_estimates(self, observational):
+        X, T, Y, ps = observational
+        result = _stream(X, T, Y, ps).estimate()
+        assert result["ate"] == pytest.approx(hajek_ate(Y, T, ps), rel=1e-10)
+        assert result["ate_ht"] == pytest.approx(iptw_ate(Y, T, ps), rel=1e-10)
+
+    def test_sandwich_variance(self, observational):
+        X, T, Y, ps = observational
+        n = len(Y)
+        result = _stream(X, T, Y, ps).estimate()
+        _, psi = hajek_influence(Y, T, ps)
+        assert result["se"] == pytest.approx(np.sqrt(np.sum(psi ** 2)) / n, rel=1e-8)
+        phi = T * Y / ps - (1 - T) * Y / (1 - ps)
+        assert result["se_ht"] == pytest.approx(np.sqrt(np.var(phi) / n), rel=1e-8)
+
+    def test_effective_sample_sizes(self, observational):
+        X, T, Y, ps = observational
+        result = _stream(X, T, Y, ps).estimate()
+        w = T / ps + (1 - T) / (1 - ps)
+        sw = stabilized_weights(T, ps)
+        assert result["ess"] == pytest.approx(effective_sample_size(w), rel=1e-10)
+        assert result["ess_stabilized"] == pytest.approx(effective_sample_size(sw), rel=1e-10)
+        assert result["ess_treated"] == pytest.approx(effective_sample_size(w[T == 1]), rel=1e-10)
+        assert result["ess_control"] == pytest.approx(effective_sample_size(w[T == 0]), rel=1e-10)
+
+    def test_weighted_means(self, observational):
+        X, T, Y, ps = observational
+        w = T / ps + (1 - T) / (1 - ps)
+        means = _stream(X, T, Y, ps).weighted_means()
+        for j, name in enumerate(means.index):
+            assert means.loc[name, "mean_treated"] == pytest.approx(weighted_mean(X[:, j], w, T, 1))
+            assert means.loc[name, "mean_control"] == pytest.approx(weighted_mean(X[:, j], w, T, 0))
+
+    def test_merge_is_associative(self, observational):
+        X, T, Y, ps = observational
+        # Shards need not share an outcome shift
+        splits = np.array_split(np.arange(len(T)), 3)
+        shards = [_stream(X[s], T[s], Y[s], ps[s], shift=shift)
+                  for s, shift in zip(splits, [None, 450.0, 0.0])]
+        left = shards[0].merge(shards[1]).merge(shards[2]).estimate()
+        right = shards[0].merge(shards[1].merge(shards[2])).estimate()
+        whole = functools.reduce(StreamingIPTW.merge, shards).estimate()
+        full = _stream(X, T, Y, ps).estimate()
+        for key in ("ate", "se", "ate_ht", "se_ht", "ess", "mu1"):
+            assert left[key] == pytest.approx(right[key], rel=1e-10)
+            assert whole[key] == pytest.approx(full[key], rel=1e-10)
+
+    def test_from_chunks(self, observational):
+        X, T, Y, ps = observational
+        df = pd.DataFrame({"t": T, "y": Y, "ps": ps, "x0": X[:, 0]})
+        chunks = (df.iloc[i:i + 1000] for i in range(0, len(df), 1000))
+        state = StreamingIPTW.from_chunks(chunks, "t", "y", "ps", covariates=["x0"])
+        assert state.n_rows == len(df)
+        assert state.estimate()["ate"] == pytest.approx(hajek_ate(Y, T, ps), rel=1e-10)
+
+    def test_invalid_propensity(self):
+        with pytest.raises(ValueError, match="strictly between"):
+            StreamingIPTW().update([1, 0], [1.0, 2.0], [1.0, 0.5])
+
+    def test_empty_arm(self):
+        state = StreamingIPTW().update([1, 1], [1.0, 2.0], [0.5, 0.5])
+        with pytest.raises(ValueError, match="Both treatment arms"):
+            state.estimate()
+
+
+class TestBatchedLogit:
+    """Batched IRLS refits of the propensity model."""
+
+    @pytest.mark.parametrize("C", [1e6, 0.05])
+    def test_full_sample_matches_sklearn(self, observational, C):
+        X, T, _, _ = observational
+        X = X * [1.0, 10.0, 0.1] + [0.0, 50.0, 0.0]
+        model = BatchedLogit(C=C).fit(X, T)
+        expected = LogisticRegression(C=C, tol=1e-12, max_iter=10000).fit(X, T)
+        np.testing.assert_allclose(model.coef_, expected.coef_[0], rtol=1e-6)
+        assert model.intercept_ == pytest.approx(expected.intercept_[0], rel=1e-6)
+        np.testing.assert_allclose(model.predict_proba(), expected.predict_proba(X)[:, 1], atol=1e-8)
+        np.testing.assert_allclose(model.predict_proba(X[:10]), model.predict_proba()[:10])
+
+    def test_weights_equal_resampled_refits(self, observational):
+        X, T, _, _ = observational
+        model = BatchedLogit().fit(X, T)
+        W = bootstrap_weights(len(T), 8, seed=1)
+        coefs = model.fit_weights(W)
+        assert model.n_iter_ <= 6
+        for w, coef in zip(W, coefs):
+            idx = np.repeat(np.arange(len(T)), w.astype(int))
+            refit = BatchedLogit().fit(X[idx], T[idx])
+            np.testing.assert_allclose(coef, np.r_[refit.intercept_, refit.coef_], rtol=1e-9, atol=1e-12)
+
+    def test_sample_weight(self, observational):
+        X, T, _, _ = observational
+        w = np.random.default_rng(2).random(len(T))
+        model = BatchedLogit().fit(X, T, sample_weight=w)
+        expected = LogisticRegression(C=1e6, tol=1e-12, max_iter=10000).fit(X, T, sample_weight=w)
+        np.testing.assert_allclose(model.coef_, expected.coef_[0], rtol=1e-6)
+        batched = BatchedLogit().fit(X, T).fit_weights(w)
+        np.testing.assert_allclose(batched[0], np.r_[model.intercept_, model.coef_], rtol=1e-9)
+
+    def test_bootstrap_hajek_matches_notebook(self, observational):
+        X, T, Y, _ = observational
+        W = bootstrap_weights(len(T), 5, seed=3)
+        idx_list = [np.repeat(np.arange(len(T)), w.astype(int)) for w in W]
+        expected = bootstrap_iptw(Y, T, X, idx_list)
+        model = BatchedLogit().fit(X, T)
+        # lbfgs stops at its default tolerance; the refits above are exact
+        np.testing.assert_allclose(model.hajek_statistic(W, Y), expected, atol=1e-3)
+
+    def test_statistic_plugs_into_bootstrap(self, observational):
+        X, T, Y, _ = observational
+        model = BatchedLogit().fit(X, T)
+        ps = model.predict_proba()
+        estimate, se = model.hajek_statistic(np.ones(len(T)), Y, return_se=True)
+        expected = hajek_statistic(np.ones(len(T)), Y, T, ps, return_se=True)
+        assert estimate == pytest.approx(expected[0], rel=1e-12)
+        assert se == pytest.approx(expected[1], rel=1e-10)
+        result = bootstrap(model.hajek_statistic, Y, n_boot=50, seed=0, ci="studentized")
+        assert result["estimate"] == pytest.approx(hajek_ate(Y, T, ps), rel=1e-12)
+        assert result["ci_lower"] < result["estimate"] < result["ci_upper"]
+
+    def test_chunked_hessians(self, observational, monkeypatch):
+        import facure_augment.weighting.propensity as propensity
+
+        X, T, _, _ = observational
+        W = bootstrap_weights(len(T), 4, seed=1)
+        expected = BatchedLogit().fit(X, T).fit_weights(W)
+        monkeypatch.setattr(propensity, "MAX_CHUNK_ELEMENTS", 4096)
+        np.testing.assert_allclose(BatchedLogit().fit(X, T).fit_weights(W), expected, rtol=1e-10)
+
+    def test_weight_shape(self, observational):
+        X, T, _, _ = observational
+        with pytest.raises(ValueError, match="one column per observation"):
+            BatchedLogit().fit(X, T).fit_weights(np.ones((2, 10)))
+
+
+class TestOverlapSweep:
+    """Trimming and clipping sweeps from one sorted pass."""
+
+    @pytest.fixture
+    def extreme(self):
+        rng = np.random.default_rng(4)
+        n = 3000
+        X = rng.normal(size=n)
+        ps = 1 / (1 + np.exp(-2.5 * X))
+        T = (rng.random(n) < ps).astype(int)
+        Y = 50 + X + 2.0 * T + rng.normal(size=n)
+        return Y, T, ps
+
+    def test_trim_matches_notebook(self, extreme):
+        Y, T, ps = extreme
+        thresholds = [0.0, 0.01, 0.05, 0.1, 0.25]
+        sweep = trim_sweep(Y, T, ps, thresholds)
+        for a, row in zip(thresholds, sweep.itertuples()):
+            hajek = iptw_ate_trimmed(Y, T, ps, ps_bounds=(a, 1 - a))
+            ht = iptw_ate_trimmed(Y, T, ps, ps_bounds=(a, 1 - a), normalized=False)
+            assert row.ate == pytest.approx(hajek["ate"], rel=1e-10)
+            assert row.mu1 == pytest.approx(hajek["mu1"], rel=1e-12)
+            assert row.ate_ht == pytest.approx(ht["ate"], rel=1e-10)
+            assert row.n == hajek["n_included"]
+            kept = (ps >= a) & (ps <= 1 - a)
+            w = np.where(T == 1, 1 / ps, 1 / (1 - ps))[kept]
+            assert row.ess == pytest.approx(effective_sample_size(w), rel=1e-10)
+
+    def test_trim_boundary_scores_match_notebook(self, extreme):
+        Y, T, _ = extreme
+        rng = np.random.default_rng(5)
+        boundary = rng.choice([0.05, 0.1, 0.2, 0.3, 0.7, 0.8, 0.9, 0.95], size=len(Y))
+        rounded = np.clip(np.round(rng.uniform(size=len(Y)), 3), 0.001, 0.999)
+        thresholds = [0.05, 0.1, 0.2, 0.3]
+        for ps in (boundary, rounded):
+            sweep = trim_sweep(Y, T, ps, thresholds)
+            for a, row in zip(thresholds, sweep.itertuples()):
+                hajek = iptw_ate_trimmed(Y, T, ps, ps_bounds=(a, 1 - a))
+                ht = iptw_ate_trimmed(Y, T, ps, ps_bounds=(a, 1 - a), normalized=False)
+                assert row.n == hajek["n_included"]
+                assert row.ate == pytest.approx(hajek["ate"], rel=1e-10)
+                assert row.ate_ht == pytest.approx(ht["ate"], rel=1e-10)
+        kept = trim_sweep(Y, T, rounded)
+        for a, n in zip(kept["threshold"], kept["n"]):
+            assert n == np.sum((rounded >= a) & (rounded <= 1 - a))
+
+    def test_clip_matches_notebook(self, extreme):
+        Y, T, ps = extreme
+        percentiles = [100, 99, 95, 90]
+        sweep = clip_sweep(Y, T, ps, percentiles=percentiles)
+        for q, row in zip(percentiles, sweep.itertuples()):
+            assert row.ate == pytest.approx(iptw_ate_comparison(Y, T, ps, q), rel=1e-10)
+        caps = [2.0, 10.0, 50.0]
+        sweep = clip_sweep(Y, T, ps, max_weights=caps)
+        for cap, row in zip(caps, sweep.itertuples()):
+            assert row.ate == pytest.approx(iptw_ate_trimmed(Y, T, ps, max_weight=cap)["ate"], rel=1e-10)
+            ht = iptw_ate_trimmed(Y, T, ps, max_weight=cap, normalized=False)["ate"]
+            assert row.ate_ht == pytest.approx(ht, rel=1e-10)
+            w = np.minimum(np.where(T == 1, 1 / ps, 1 / (1 - ps)), cap)
+            assert row.ess_treated == pytest.approx(effective_sample_size(w[T == 1]), rel=1e-10)
+            assert row.n_clipped == np.sum(np.where(T == 1, 1 / ps, 1 / (1 - ps)) > cap)
+
+    def test_untrimmed_row_matches_streaming(self, extreme):
+        Y, T, ps = extreme
+        expected = StreamingIPTW().update(T, Y, ps).estimate()
+        for row in (trim_sweep(Y, T, ps, [0.0]).iloc[0], clip_sweep(Y, T, ps, [np.inf]).iloc[0]):
+            for key in ("ate", "se", "ate_ht", "se_ht", "ess", "ess_control", "n"):
+                assert row[key] == pytest.approx(expected[key], rel=1e-10)
+
+    def test_default_grid_drops_one_unit_per_row(self, extreme):
+        Y, T, ps = extreme
+        sweep = trim_sweep(Y, T, ps)
+        assert len(sweep) == len(np.unique(np.minimum(ps, 1 - ps)))
+        assert sweep["n"].iloc[0] == len(Y)
+        assert np.all(np.diff(sweep["n"]) < 0)
+        assert np.isnan(sweep["ate"].iloc[-1]) or sweep["n_treated"].iloc[-1] > 0
+
+    def test_invalid_inputs(self, extreme):
+        Y, T, ps = extreme
+        with pytest.raises(ValueError, match="not both"):
+            clip_sweep(Y, T, ps, max_weights=[5], percentiles=[99])
+        with pytest.raises(ValueError, match="strictly between"):
+            trim_sweep(Y, T, np.where(ps > 0.5, 1.0, ps))
+
+    def test_tradeoff_plot(self, extreme):
+        matplotlib = pytest.importorskip("matplotlib")
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+
+        Y, T, ps = extreme
+        top, bottom = tradeoff_plot(trim_sweep(Y, T, ps, np.linspace(0, 0.2, 21)), truth=2.0)
+        assert len(top.lines) == 3 and len(bottom.lines) == 2
+        top, bottom = tradeoff_plot(clip_sweep(Y, T, ps, percentiles=np.linspace(80, 100, 21)))
+        assert bottom.get_xscale() == "log"
+        plt.close("all")
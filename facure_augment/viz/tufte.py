@@ -17,12 +17,15 @@ References
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional, Tuple, Union
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple, Union
 
-import matplotlib.pyplot as plt
 import numpy as np
-from matplotlib.axes import Axes
-from matplotlib.figure import Figure
+
+if TYPE_CHECKING:
+    # pyplot is imported where a figure is created, keeping this module (and
+    # facure_augment.common) cheap to import
+    from matplotlib.axes import Axes
+    from matplotlib.figure import Figure
 
 __all__ = [
     "TUFTE_PALETTE",
@@ -386,6 +389,8 @@ def create_tufte_figure(
     >>> ax.plot([1, 2, 3], [1, 4, 2])
     >>> plt.show()
     """
+    import matplotlib.pyplot as plt
+
     if figsize is None:
         figsize = (8 * ncols, 5 * nrows)
 
@@ -0,0 +1,21 @@
+"""Propensity score weighting utilities for augmented."""
+
+from facure_augment.weighting.streaming import (
+    StreamingIPTW,
+)
+from facure_augment.weighting.propensity import (
+    BatchedLogit,
+)
+from facure_augment.weighting.overlap import (
+    trim_sweep,
+    clip_sweep,
+    tradeoff_plot,
+)
+
+__all__ = [
+    "StreamingIPTW",
+    "BatchedLogit",
+    "trim_sweep",
+    "clip_sweep",
+    "tradeoff_plot",
+]
@@ -0,0 +1,348 @@
+"""
+IPTW estimates for every trimming threshold and weight cap in one sorted pass.
+
+``trim_weights``, ``iptw_ate_comparison`` (11_propensity_score) and
+``iptw_ate_trimmed`` (A3_ps_debiasing) recompute the estimate for one
+threshold at a time. Every IPTW quantity is a function of the per-arm sums
+of :class:`~facure_augment.weighting.StreamingIPTW`,
+
+    n, Σw, Σw², Σwy, Σw²y, Σw²y²
+
+so after one sort the sums for every threshold are prefix sums:
+
+- **trimming** keeps units with ``α ≤ e ≤ 1 - α``, i.e. ``min(e, 1 - e) ≥ α``.
+  Sorted by ``min(e, 1 - e)`` descending, each threshold keeps a prefix.
+- **clipping** caps weights at ``M`` (``np.minimum(w, M)``). Sorted by ``w``,
+  units below the cap contribute prefix sums of the uncapped statistics
+  and units above contribute ``M``, ``M²`` times suffix sums of 1, y, y².
+
+Each sweep is O(n log n) for the sort plus O(1) per threshold, and the
+default grid is every distinct threshold.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from facure_augment.viz.tufte import (
+    COLORS,
+    create_tufte_figure,
+    direct_label_line,
+    set_tufte_labels,
+    set_tufte_title,
+)
+
+if TYPE_CHECKING:
+    from matplotlib.axes import Axes
+
+__all__ = [
+    "trim_sweep",
+    "clip_sweep",
+    "tradeoff_plot",
+]
+
+
+# =============================================================================
+# Sufficient Statistics
+# =============================================================================
+
+
+def _inputs(Y, T, ps) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, float]:
+    Y = np.asarray(Y, dtype=np.float64)
+    T = np.asarray(T, dtype=np.float64)
+    ps = np.asarray(ps, dtype=np.float64)
+    if np.any((ps <= 0) | (ps >= 1)):
+        raise ValueError("Propensity scores must lie strictly between 0 and 1")
+    arm = (T == 1).astype(np.intp)
+    w = np.where(arm == 1, 1 / ps, 1 / (1 - ps))
+    shift = float(Y.mean())
+    return Y - shift, arm, w, ps, shift
+
+
+def _trim_limit(ps: np.ndarray) -> np.ndarray:
+    """
+    Largest ``α`` at which each unit passes ``(e >= α) & (e <= 1 - α)``.
+
+    Compared in floating point exactly as ``iptw_ate_trimmed`` does: the
+    bound on ``1 - α`` starts at ``1 - e`` and moves by single ulps until
+    ``fl(1 - α) >= e`` holds there but not at the next float up.
+    """
+    upper = 1 - ps
+    while True:
+        low = (1 - upper) < ps
+        if not low.any():
+            break
+        upper[low] = np.nextafter(upper[low], -np.inf)
+    while True:
+        up = np.nextafter(upper, np.inf)
+        grow = (1 - up) >= ps
+        if not grow.any():
+            break
+        upper[grow] = up[grow]
+    return np.minimum(ps, upper)
+
+
+def _by_arm(columns: Sequence[np.ndarray], arm: np.ndarray) -> np.ndarray:
+    """Stack per-unit columns into ``(n, 2, c)`` with zeros in the other arm."""
+    out = np.zeros((len(arm), 2, len(columns)))
+    rows = np.arange(len(arm))
+    out[rows, arm] = np.column_stack(columns)
+    return out
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    """Cumulative sums along axis 0 with a leading row of zeros."""
+    out = np.zeros((len(values) + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
+
+
+def _estimates(S: np.ndarray, shift: float, alpha: float) -> pd.DataFrame:
+    """
+    Hajek and Horvitz-Thompson estimates for every row of ``S (m, 2, 6)``.
+
+    Vectorized :meth:`StreamingIPTW.estimate`; thresholds leaving an arm
+    empty give NaN.
+    """
+    n_arm, sw, sww, swy, swwy, swwyy = np.moveaxis(S, -1, 0)
+    n = n_arm.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mu = swy / sw
+        ss = swwyy - 2 * mu * swwy + mu * mu * sww
+        se = np.sqrt(np.sum(ss / sw ** 2, axis=1))
+        ate = mu[:, 1] - mu[:, 0]
+        ht = (swy + shift * sw) / n[:, None]
+        sq = swwyy + 2 * shift * swwy + shift * shift * sww
+        ate_ht = ht[:, 1] - ht[:, 0]
+        var_ht = (sq.sum(axis=1) - n * ate_ht ** 2) / n ** 2
+        ess_arm = sw ** 2 / sww
+        ess = sw.sum(axis=1) ** 2 / sww.sum(axis=1)
+    empty = np.any(n_arm == 0, axis=1)
+    ate[empty] = se[empty] = ate_ht[empty] = np.nan
+    z = stats.norm.ppf(1 - alpha / 2)
+    return pd.DataFrame({
+        "n": n.astype(np.int64),
+        "n_treated": n_arm[:, 1].astype(np.int64),
+        "n_control": n_arm[:, 0].astype(np.int64),
+        "ate": ate,
+        "se": se,
+        "ci_lower": ate - z * se,
+        "ci_upper": ate + z * se,
+        "mu1": mu[:, 1] + shift,
+        "mu0": mu[:, 0] + shift,
+        "ate_ht": ate_ht,
+        "se_ht": np.sqrt(np.maximum(var_ht, 0)),
+        "ess": ess,
+        "ess_treated": ess_arm[:, 1],
+        "ess_control": ess_arm[:, 0],
+    })
+
+
+# =============================================================================
+# Sweeps
+# =============================================================================
+
+
+def trim_sweep(
+    Y: np.ndarray,
+    T: np.ndarray,
+    ps: np.ndarray,
+    thresholds: Optional[Sequence[float]] = None,
+    alpha: float = 0.05,
+) -> pd.DataFrame:
+    """
+    IPTW estimates after symmetric propensity trimming, for every threshold.
+
+    Threshold ``α`` keeps units with ``α ≤ e ≤ 1 - α`` (``iptw_ate_trimmed``
+    with ``ps_bounds=(α, 1 - α)``) and estimates on the retained units.
+
+    Parameters
+    ----------
+    Y : np.ndarray
+        Outcome.
+    T : np.ndarray
+        Binary treatment.
+    ps : np.ndarray
+        Propensity scores in (0, 1).
+    thresholds : sequence of float, optional
+        Values of ``α`` (default: every distinct ``min(e, 1 - e)``, up to
+        rounding, so each row drops the next unit(s) closest to the
+        boundary).
+    alpha : float
+        Significance level of the Hajek interval.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per threshold: threshold, n, n_treated, n_control, ate and
+        se (Hajek), ci_lower, ci_upper, mu1, mu0, ate_ht and se_ht
+        (Horvitz-Thompson over the retained units), ess, ess_treated,
+        ess_control.
+
+    Examples
+    --------
+    >>> sweep = trim_sweep(Y, T, ps, np.linspace(0, 0.1, 21))
+    >>> tradeoff_plot(sweep)
+    """
+    y, arm, w, ps, shift = _inputs(Y, T, ps)
+    distance = _trim_limit(ps)
+    order = np.argsort(-distance, kind="stable")
+    ww = w * w
+    columns = (np.ones(len(y)), w, ww, w * y, ww * y, ww * y * y)
+    prefix = _prefix(_by_arm([c[order] for c in columns], arm[order]))
+
+    if thresholds is None:
+        thresholds = np.unique(distance)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    # Units kept at α: distance ≥ α, a prefix of the descending order
+    kept = np.searchsorted(-distance[order], -thresholds, side="right")
+    table = _estimates(prefix[kept], shift, alpha)
+    table.insert(0, "threshold", thresholds)
+    table.attrs["method"] = "trim"
+    return table
+
+
+def clip_sweep(
+    Y: np.ndarray,
+    T: np.ndarray,
+    ps: np.ndarray,
+    max_weights: Optional[Sequence[float]] = None,
+    percentiles: Optional[Sequence[float]] = None,
+    alpha: float = 0.05,
+) -> pd.DataFrame:
+    """
+    IPTW estimates with weights capped at every threshold.
+
+    Cap ``M`` replaces ``w`` by ``min(w, M)`` and keeps every unit
+    (``iptw_ate_trimmed`` with ``max_weight=M``); a percentile ``q`` caps at
+    ``np.percentile(w, q)`` of the pooled weights (``trim_weights``).
+
+    Parameters
+    ----------
+    Y : np.ndarray
+        Outcome.
+    T : np.ndarray
+        Binary treatment.
+    ps : np.ndarray
+        Propensity scores in (0, 1).
+    max_weights : sequence of float, optional
+        Caps ``M`` (default: every distinct weight).
+    percentiles : sequence of float, optional
+        Percentile caps instead of ``max_weights``; adds a percentile
+        column.
+    alpha : float
+        Significance level of the Hajek interval.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per cap: threshold, n_clipped and the columns of
+        :func:`trim_sweep` (n counts all units).
+    """
+    if max_weights is not None and percentiles is not None:
+        raise ValueError("Pass max_weights or percentiles, not both")
+    y, arm, w, _, shift = _inputs(Y, T, ps)
+    order = np.argsort(w, kind="stable")
+    w_sorted, y, arm = w[order], y[order], arm[order]
+    ww = w_sorted * w_sorted
+    uncapped = _prefix(_by_arm((w_sorted, ww, w_sorted * y, ww * y, ww * y * y), arm))
+    capped = _prefix(_by_arm((np.ones(len(y)), y, y * y), arm)[::-1])[::-1]
+
+    if percentiles is not None:
+        thresholds = np.percentile(w, percentiles)
+    elif max_weights is not None:
+        thresholds = np.asarray(max_weights, dtype=np.float64)
+    else:
+        thresholds = np.unique(w)
+    # Units below the cap: a prefix of the ascending weights
+    split = np.searchsorted(w_sorted, thresholds, side="right")
+    P, C = uncapped[split], capped[split]
+    # Caps above the largest weight change nothing (and keep M·0 finite)
+    M = np.minimum(thresholds, w_sorted[-1])[:, None]
+    n_arm = np.bincount(arm, minlength=2).astype(np.float64)
+    S = np.stack([
+        np.broadcast_to(n_arm, (len(thresholds), 2)),
+        P[..., 0] + M * C[..., 0],
+        P[..., 1] + M ** 2 * C[..., 0],
+        P[..., 2] + M * C[..., 1],
+        P[..., 3] + M ** 2 * C[..., 1],
+        P[..., 4] + M ** 2 * C[..., 2],
+    ], axis=-1)
+    table = _estimates(S, shift, alpha)
+    table.insert(0, "threshold", thresholds)
+    table.insert(1, "n_clipped", (len(w) - split).astype(np.int64))
+    if percentiles is not None:
+        table.insert(0, "percentile", np.asarray(percentiles, dtype=np.float64))
+    table.attrs["method"] = "clip"
+    return table
+
+
+# =============================================================================
+# Tradeoff Plot
+# =============================================================================
+
+
+def tradeoff_plot(
+    sweep: pd.DataFrame,
+    truth: Optional[float] = None,
+    axes: Optional[Sequence[Axes]] = None,
+    title: Optional[str] = None,
+) -> Sequence[Axes]:
+    """
+    Tufte plot of the estimate against effective sample size along a sweep.
+
+    The upper panel shows the Hajek ATE with its interval as a light band
+    and the Horvitz-Thompson ATE as a thin line; the lower panel shows the
+    ESS and the number of retained units. Lines are labelled directly.
+
+    Parameters
+    ----------
+    sweep : pd.DataFrame
+        Output of :func:`trim_sweep` or :func:`clip_sweep`.
+    truth : float, optional
+        Reference effect drawn as a dashed line.
+    axes : pair of matplotlib.axes.Axes, optional
+        Axes to draw on (default: a new two-row Tufte figure).
+    title : str, optional
+        Title of the upper panel.
+
+    Returns
+    -------
+    sequence of matplotlib.axes.Axes
+        The two axes.
+    """
+    method = sweep.attrs.get("method", "trim")
+    x = sweep["threshold"].to_numpy()
+    if axes is None:
+        _, axes = create_tufte_figure(nrows=2, figsize=(8, 6), sharex=True)
+    top, bottom = axes
+
+    top.fill_between(x, sweep["ci_lower"], sweep["ci_upper"], color=COLORS["confidence"],
+                     alpha=0.15, linewidth=0)
+    top.plot(x, sweep["ate_ht"], color=COLORS["gray"], linewidth=0.8)
+    top.plot(x, sweep["ate"], color=COLORS["estimate"], linewidth=1.5)
+    if truth is not None:
+        top.axhline(truth, color=COLORS["true_value"], linestyle="--", linewidth=0.8)
+    for column, label, color in (("ate", "Hajek", COLORS["estimate"]),
+                                 ("ate_ht", "HT", COLORS["gray"])):
+        finite = np.isfinite(sweep[column].to_numpy())
+        if finite.any():
+            direct_label_line(top, x[finite], sweep[column].to_numpy()[finite], label, color=color)
+
+    for column, label, color in (("n", "units", COLORS["gray"]), ("ess", "ESS", COLORS["blue"])):
+        bottom.plot(x, sweep[column], color=color, linewidth=1.5)
+        direct_label_line(bottom, x, sweep[column].to_numpy(), label, color=color)
+
+    if method == "clip":
+        bottom.set_xscale("log")
+        xlabel = "Maximum weight"
+    else:
+        xlabel = "Trimming threshold α (keep α ≤ e ≤ 1 − α)"
+    set_tufte_labels(top, ylabel="ATE")
+    set_tufte_labels(bottom, xlabel, "Sample size")
+    set_tufte_title(top, title or ("Weight clipping tradeoff" if method == "clip" else "Trimming tradeoff"))
+    return axes
@@ -0,0 +1,275 @@
+"""
+Streaming inverse probability weighting from mini-batches.
+
+``iptw_ate``, ``hajek_ate``, ``weighted_mean``, ``stabilized_weights`` and
+``effective_sample_size`` (11_propensity_score, A3_ps_debiasing) need every
+row in memory. All of them are functions of a few sums per treatment arm,
+with ``w = T/e`` for treated and ``(1-T)/(1-e)`` for control rows:
+
+    n, Σw, Σw², Σwy, Σw²y, Σw²y²   (plus Σwx, Σwx² per covariate)
+
+:class:`StreamingIPTW` keeps those sums, so the Horvitz-Thompson and Hajek
+estimates, their sandwich variances, effective sample sizes and weighted
+covariate means are available after any batch. Sums add, so
+:meth:`StreamingIPTW.merge` is associative and shards can be reduced in any
+order across workers.
+
+Stabilized weights ``P(T=t)·w`` rescale each arm by a constant: Hajek
+estimates and per-arm ESS are unchanged, and only the pooled ESS differs
+(reported as ``ess_stabilized``).
+
+Usage
+-----
+    state = StreamingIPTW()
+    for batch in batches:
+        state.update(batch["T"], batch["Y"], batch["ps"])
+        state.estimate()["ate"]
+
+    total = functools.reduce(StreamingIPTW.merge, shard_states)
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+__all__ = [
+    "StreamingIPTW",
+]
+
+# Order of the per-arm sufficient statistics
+_STATS = ("n", "w", "ww", "wy", "wwy", "wwyy")
+
+
+def _as_frame(chunk: Any) -> pd.DataFrame:
+    """Accept pandas frames and Arrow tables/record batches."""
+    if hasattr(chunk, "to_pandas"):
+        return chunk.to_pandas()
+    return chunk
+
+
+class StreamingIPTW:
+    """
+    Running sufficient statistics for IPTW estimates.
+
+    Parameters
+    ----------
+    covariates : sequence of str, optional
+        Names of covariates whose weighted means are tracked (passed as
+        ``X`` columns to :meth:`update`).
+    shift : float, optional
+        Constant subtracted from outcomes before accumulating, to keep the
+        second moments well conditioned. Defaults to the mean outcome of
+        the first batch.
+
+    Attributes
+    ----------
+    stats_ : np.ndarray
+        Array of shape ``(2, 6)``: n, Σw, Σw², Σwy, Σw²y, Σw²y² for the
+        control (row 0) and treated (row 1) arms.
+    x_stats_ : np.ndarray
+        Array of shape ``(2, 2, p)``: Σwx and Σwx² per arm.
+    """
+
+    def __init__(self, covariates: Sequence[str] = (), shift: Optional[float] = None):
+        self.covariates = list(covariates)
+        self.shift = shift
+        self.stats_ = np.zeros((2, len(_STATS)))
+        self.x_stats_ = np.zeros((2, 2, len(self.covariates)))
+
+    @property
+    def n_rows(self) -> int:
+        return int(self.stats_[:, 0].sum())
+
+    def update(self, T, Y, ps, X=None) -> "StreamingIPTW":
+        """
+        Add one batch.
+
+        Parameters
+        ----------
+        T : array-like (b,)
+            Binary treatment.
+        Y : array-like (b,)
+            Outcome.
+        ps : array-like (b,)
+            Propensity scores in (0, 1).
+        X : array-like (b, p), optional
+            Covariates, in the order of ``covariates``.
+
+        Returns
+        -------
+        StreamingIPTW
+            ``self`` (for chaining).
+        """
+        T = np.asarray(T, dtype=np.float64)
+        Y = np.asarray(Y, dtype=np.float64)
+        ps = np.asarray(ps, dtype=np.float64)
+        if len(T) == 0:
+            return self
+        if np.any((ps <= 0) | (ps >= 1)):
+            raise ValueError("Propensity scores must lie strictly between 0 and 1")
+        if self.shift is None:
+            self.shift = float(Y.mean())
+        y = Y - self.shift
+        arm = (T == 1).astype(np.intp)
+        w = np.where(arm == 1, 1 / ps, 1 / (1 - ps))
+        ww = w * w
+
+        columns = (None, w, ww, w * y, ww * y, ww * y * y)
+        for j, weights in enumerate(columns):
+            self.stats_[:, j] += np.bincount(arm, weights=weights, minlength=2)
+        if self.covariates:
+            X = np.asarray(X, dtype=np.float64).reshape(len(T), -1)
+            for a in (0, 1):
+                rows = arm == a
+                wx = w[rows, None] * X[rows]
+                self.x_stats_[a, 0] += wx.sum(axis=0)
+                self.x_stats_[a, 1] += (wx * X[rows]).sum(axis=0)
+        return self
+
+    def merge(self, other: "StreamingIPTW") -> "StreamingIPTW":
+        """
+        Combine with the state of another shard (same covariates).
+
+        Returns
+        -------
+        StreamingIPTW
+            A new state holding the statistics of both.
+        """
+        if self.covariates != other.covariates:
+            raise ValueError("Cannot merge states tracking different covariates")
+        shift = self.shift if self.shift is not None else other.shift
+        merged = StreamingIPTW(self.covariates, shift)
+        merged.stats_ = self._shifted_stats(shift) + other._shifted_stats(shift)
+        merged.x_stats_ = self.x_stats_ + other.x_stats_
+        return merged
+
+    def _shifted_stats(self, shift: Optional[float]) -> np.ndarray:
+        """Re-express the outcome moments around another shift."""
+        if shift is None or self.shift is None or shift == self.shift:
+            return self.stats_
+        d = self.shift - shift
+        n, sw, sww, swy, swwy, swwyy = self.stats_.T
+        return np.column_stack([
+            n,
+            sw,
+            sww,
+            swy + d * sw,
+            swwy + d * sww,
+            swwyy + 2 * d * swwy + d * d * sww,
+        ])
+
+    @classmethod
+    def from_chunks(
+        cls,
+        chunks: Iterable[Any],
+        treatment: str,
+        outcome: str,
+        propensity: str,
+        covariates: Sequence[str] = (),
+    ) -> "StreamingIPTW":
+        """
+        Build a state in a single pass over DataFrame (or Arrow) chunks.
+
+        Parameters
+        ----------
+        chunks : iterable
+            DataFrames, e.g. ``pd.read_csv(..., chunksize=...)``.
+        treatment, outcome, propensity : str
+            Column names.
+        covariates : sequence of str
+            Covariate columns whose weighted means are tracked.
+
+        Returns
+        -------
+        StreamingIPTW
+            The populated state.
+        """
+        state = cls(covariates)
+        for chunk in chunks:
+            df = _as_frame(chunk)
+            state.update(df[treatment], df[outcome], df[propensity],
+                         df[list(covariates)] if covariates else None)
+        return state
+
+    def estimate(self, alpha: float = 0.05) -> Dict[str, float]:
+        """
+        Current estimates from the accumulated statistics.
+
+        Standard errors are the sandwich (influence function) variances
+        ``Σψᵢ²/n²`` with the propensity scores treated as known. For Hajek,
+        ``ψᵢ = wᵢ(yᵢ - μₐ)/mean(w)`` as in
+        :func:`~facure_augment.inference.hajek_influence`.
+
+        Parameters
+        ----------
+        alpha : float
+            Significance level for the Hajek interval.
+
+        Returns
+        -------
+        dict
+            ate and se (Hajek), ci_lower, ci_upper, mu1, mu0, ate_ht and
+            se_ht (Horvitz-Thompson), ess, ess_stabilized, ess_treated,
+            ess_control, n, n_treated, p_treated.
+        """
+        n_arm, sw, sww, swy, swwy, swwyy = self.stats_.T
+        n = n_arm.sum()
+        if np.any(n_arm == 0):
+            raise ValueError("Both treatment arms need at least one row")
+        y0 = self.shift
+
+        mu = swy / sw  # shifted arm means
+        ss = swwyy - 2 * mu * swwy + mu * mu * sww  # Σw²(y - μ)²
+        var_hajek = np.sum(ss / sw ** 2)
+
+        ht = (swy + y0 * sw) / n  # raw Σwy / n
+        sq = swwyy + 2 * y0 * swwy + y0 * y0 * sww  # raw Σw²y²
+        ate_ht = ht[1] - ht[0]
+        var_ht = (sq.sum() - n * ate_ht ** 2) / n ** 2
+
+        p = n_arm[1] / n
+        scale = np.array([1 - p, p])
+        ate = mu[1] - mu[0]
+        se = float(np.sqrt(var_hajek))
+        z = stats.norm.ppf(1 - alpha / 2)
+        return {
+            "ate": float(ate),
+            "se": se,
+            "ci_lower": float(ate - z * se),
+            "ci_upper": float(ate + z * se),
+            "mu1": float(mu[1] + y0),
+            "mu0": float(mu[0] + y0),
+            "ate_ht": float(ate_ht),
+            "se_ht": float(np.sqrt(var_ht)),
+            "ess": float(sw.sum() ** 2 / sww.sum()),
+            "ess_stabilized": float((scale @ sw) ** 2 / (scale ** 2 @ sww)),
+            "ess_treated": float(sw[1] ** 2 / sww[1]),
+            "ess_control": float(sw[0] ** 2 / sww[0]),
+            "n": int(n),
+            "n_treated": int(n_arm[1]),
+            "p_treated": float(p),
+        }
+
+    def weighted_means(self) -> pd.DataFrame:
+        """
+        Weighted covariate means and standard deviations per arm.
+
+        Returns
+        -------
+        pd.DataFrame
+            Indexed by covariate with mean_treated, mean_control,
+            sd_treated and sd_control.
+        """
+        sw = self.stats_[:, 1][:, None]
+        mean = self.x_stats_[:, 0] / sw
+        sd = np.sqrt(np.maximum(self.x_stats_[:, 1] / sw - mean ** 2, 0))
+        return pd.DataFrame({
+            "mean_treated": mean[1],
+            "mean_control": mean[0],
+            "sd_treated": sd[1],
+            "sd_control": sd[0],
+        }, index=pd.Index(self.covariates, name="covariate"))